@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Literal
 
 
 class Settings(BaseSettings):
@@ -8,6 +9,11 @@ class Settings(BaseSettings):
     # fal.ai
     fal_key: str = ""
     fal_model: str = "fal-ai/flux/dev"
+    # In-flight fal.ai calls across ALL workers (Redis-coordinated); 0 = no fleet-wide cap
+    fal_max_concurrency: int = 12
+    # Per-process image concurrency adapts (AIMD) within these bounds
+    image_concurrency_min: int = 1
+    image_concurrency_max: int = 8
 
     # Anthropic
     anthropic_api_key: str = ""
@@ -27,11 +33,48 @@ class Settings(BaseSettings):
     app_env: str = "development"
     cors_origins: str = "http://localhost:5173"
     secret_key: str = "dev-secret-change-in-prod"
+    # Bearer token for GET /metrics (internal scrapers only); empty disables the endpoint
+    metrics_token: str = ""
+
+    # Page output — bilevel print master format ("png" = 1-bit PNG, "g4" = CCITT G4 TIFF)
+    page_format: Literal["png", "g4"] = "png"
+    # PDF assembly — "native" streaming writer, or the original WeasyPrint HTML renderer
+    pdf_backend: Literal["native", "weasyprint"] = "native"
+    # Book generation — "pipelined" uploads each page as soon as it's cleaned while
+    # others still generate; "phased" runs generate → PDF → upload strictly in order;
+    # "fanout" renders each page as its own Celery subtask across the worker pool
+    generation_mode: Literal["pipelined", "phased", "fanout"] = "pipelined"
+
+    # Render cache — raw fal.ai outputs keyed by (model, prompt, arguments, seed)
+    render_cache_enabled: bool = True
+    render_cache_dir: str = "/tmp/tailormade-render-cache"
+    render_cache_max_mb: int = 2048          # local disk LRU tier; 0 disables it
+    render_cache_redis_ttl: int = 7 * 86400  # shared Redis tier; 0 disables it
+
+    # Content filter — extra layer-1 blocklist terms, one per line (merged with built-ins)
+    content_blocklist_path: str = ""
+    # Content filter — layer-2 (Anthropic) verdicts cached by normalized text;
+    # in-process TTL/LRU plus the shared Redis tier when Redis is configured
+    content_verdict_cache_size: int = 10000  # 0 disables the verdict cache
+    content_verdict_cache_ttl: int = 86400   # seconds
+
+    # Book read cache — book detail (immutable) and gallery pages (versioned per user)
+    book_cache_size: int = 2000          # in-process entries per kind; 0 disables the cache
+    book_cache_redis_ttl: int = 86400    # seconds, shared Redis tier
+    book_cache_gallery_ttl: int = 30     # seconds a local gallery page is trusted (needs Redis)
 
     # Rate limits
     free_daily_limit: int = 1
     premium_daily_limit: int = 10
 
+    # Job scheduling — generation jobs admitted to workers at once (match total worker
+    # slots), and the share of admissions each tier gets while both have jobs waiting
+    generation_concurrency: int = 8
+    premium_queue_weight: int = 3
+    free_queue_weight: int = 1
+    # Identical /generate requests from one user collapse into the running job (seconds)
+    generate_dedup_window: int = 600
+
     # Redis
     redis_host: str = ""
     redis_port: int = 6379
@@ -35,13 +35,29 @@ APP_AGE_RANGE = "ages 3-12"
 
 # ── Concurrency Limits ─────────────────────────────────────────────────────────
 
-# Max concurrent fal.ai image generations per request
-# 3 concurrent × ~4MB raw ≈ 12MB vs 12 concurrent × ~4MB ≈ 48MB peak memory
+# Initial concurrent fal.ai image generations per process — adapts (AIMD) within
+# settings.image_concurrency_min/max; ~4MB raw per page in flight
 MAX_CONCURRENT_IMAGES = 3
 
 # Max downloaded image size (10MB) — prevents abnormally large responses
 MAX_IMAGE_BYTES = 10 * 1024 * 1024
 
+# Max concurrent R2 uploads per process — a 12-page book is 25 objects
+# (page + thumbnail each, plus the PDF), so 8 workers publish it in ~3 round-trips
+R2_UPLOAD_CONCURRENCY = 8
+
+# Streamed uploads (the book PDF) switch to multipart above one part, and send up
+# to R2_MULTIPART_CONCURRENCY parts at once. R2 parts must be at least 5MiB.
+R2_MULTIPART_CHUNK_BYTES = 8 * 1024 * 1024
+R2_MULTIPART_CONCURRENCY = 4
+
+# boto3 connection pool size; headroom over upload concurrency for health checks
+R2_MAX_POOL_CONNECTIONS = R2_UPLOAD_CONCURRENCY + R2_MULTIPART_CONCURRENCY + 2
+
+# Dedicated threads for blocking Firestore calls made from async routes, so a slow
+# Firestore round-trip never occupies the event loop or the default executor
+FIRESTORE_EXECUTOR_WORKERS = 16
+
 
 # ── Timeout Defaults (seconds) ─────────────────────────────────────────────────
 
@@ -1,15 +1,19 @@
+import asyncio
 import json
 import logging
+import secrets
 
 import firebase_admin
 import sentry_sdk
 from contextlib import asynccontextmanager
 from firebase_admin import credentials, firestore
-from fastapi import FastAPI, Response
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
+from app.middleware.auth import refresh_certificates
 from app.routers import books, auth, photos
+from app.services import metrics, worker_metrics
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -28,6 +32,15 @@ if settings.sentry_dsn:
     logger.info("sentry_initialized env=%s", settings.app_env)
 
 
+def require_metrics_token(authorization: str | None = Header(default=None)) -> None:
+    """GET /metrics is internal: off unless METRICS_TOKEN is set, then bearer-token only."""
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {settings.metrics_token}".encode()
+    if not secrets.compare_digest((authorization or "").encode(), expected):
+        raise HTTPException(status_code=401, detail="Invalid metrics token.")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # ── Startup ────────────────────────────────────────────────────────────────
@@ -78,8 +91,15 @@ async def lifespan(app: FastAPI):
             logger.warning("redis_connection_failed error=%s", e)
             print(f"⚠️  Redis connection failed: {e}")
 
+    # Keep Firebase token-signing certificates warm for auth verification
+    cert_refresher = None
+    if firebase_admin._apps:
+        cert_refresher = asyncio.create_task(refresh_certificates())
+
     yield
     # ── Shutdown ───────────────────────────────────────────────────────────────
+    if cert_refresher:
+        cert_refresher.cancel()
     print("👋 TailorMade API shutting down")
 
 
@@ -100,6 +120,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],  # gallery pagination
     )
 
     # ── Routers ────────────────────────────────────────────────────────────────
@@ -164,6 +185,12 @@ def create_app() -> FastAPI:
             media_type="application/json",
         )
 
+    # ── Metrics (this process, plus each live worker process) ─────────────────
+    @app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+    async def metrics_snapshot():
+        workers = await asyncio.to_thread(worker_metrics.collect)
+        return {**metrics.snapshot(), "workers": workers}
+
     return app
 
 
@@ -1,13 +1,102 @@
+import asyncio
+import base64
+import hashlib
+import json
 import logging
+import time
+import firebase_admin
+from cachetools import TLRUCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from firebase_admin import auth as firebase_auth
 
 from app.models.user import FirebaseUser
+from app.services import metrics
 
 security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
+# ── Verified-token cache ──────────────────────────────────────────────────────
+# Status polling re-sends the same ID token several times a second. A verified
+# token stays valid until its exp claim, so decoded claims are cached by token
+# hash and each entry expires with its token (capped at Firebase's 1h lifetime).
+_TOKEN_CACHE_MAX_TTL = 3600
+# Google rotates signing certs daily and serves them with max-age of a few hours
+CERT_REFRESH_INTERVAL = 600
+
+
+def _token_ttu(_key: bytes, decoded: dict, now: float) -> float:
+    remaining = decoded.get("exp", 0) - time.time()
+    return now + min(remaining, _TOKEN_CACHE_MAX_TTL)
+
+
+_verified_tokens: TLRUCache = TLRUCache(maxsize=10000, ttu=_token_ttu)
+
+
+async def _verify_token(token: str) -> dict:
+    """
+    Return decoded claims for a Firebase ID token. Cache hits cost a hash;
+    cold verification runs in a thread so the signature check never blocks the loop.
+    Raises the same firebase_auth errors as verify_id_token.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    decoded = _verified_tokens.get(key)
+    if decoded is not None:
+        metrics.incr("auth_token_cache", result="hit")
+        return decoded
+    metrics.incr("auth_token_cache", result="miss")
+    with metrics.timer("auth_verify_seconds"):
+        decoded = await asyncio.to_thread(firebase_auth.verify_id_token, token)
+    _verified_tokens[key] = decoded
+    return decoded
+
+
+def _b64url_json(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+
+def _prefetch_certificates() -> None:
+    """
+    Warm firebase_admin's certificate cache through its public API: a well-formed
+    but unsigned token passes verify_id_token's claim checks, makes it fetch
+    Google's signing certificates, and is then rejected. Only a failed fetch raises.
+    """
+    project_id = firebase_admin.get_app().project_id
+    now = int(time.time())
+    header = {"alg": "RS256", "kid": "cert-prefetch", "typ": "JWT"}
+    claims = {
+        "aud": project_id,
+        "iss": f"https://securetoken.google.com/{project_id}",
+        "sub": "cert-prefetch",
+        "iat": now,
+        "auth_time": now,
+        "exp": now + 300,
+    }
+    token = f"{_b64url_json(header)}.{_b64url_json(claims)}.c2ln"
+    try:
+        firebase_auth.verify_id_token(token)
+    except firebase_auth.InvalidIdTokenError:
+        pass  # expected — the certificates were fetched before the signature check
+
+
+async def refresh_certificates(interval: float = CERT_REFRESH_INTERVAL) -> None:
+    """
+    Background task (started in the API lifespan): prefetch signing certificates
+    now, then keep re-fetching so an expired cache entry is renewed here rather
+    than inside a user's request. If prefetching can't work in this setup (no
+    Firebase app or project id), it stops and verification fetches on demand.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(_prefetch_certificates)
+            logger.debug("auth_certificates_refreshed")
+        except (AttributeError, ValueError) as e:
+            logger.warning("auth_certificate_prefetch_disabled error=%s", e)
+            return
+        except Exception as e:
+            logger.warning("auth_certificate_prefetch_failed error=%s", e)
+        await asyncio.sleep(interval)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -15,7 +104,7 @@ async def get_current_user(
     """Verify Firebase Bearer token. Returns typed FirebaseUser."""
     token = credentials.credentials
     try:
-        decoded = firebase_auth.verify_id_token(token)
+        decoded = await _verify_token(token)
         user = FirebaseUser.from_decoded_token(decoded)
         logger.debug("auth_success uid=%s", user.uid)
         return user
@@ -44,7 +133,7 @@ async def get_optional_user(
     if not credentials:
         return None
     try:
-        decoded = firebase_auth.verify_id_token(credentials.credentials)
+        decoded = await _verify_token(credentials.credentials)
         return FirebaseUser.from_decoded_token(decoded)
     except Exception:
         return None
@@ -1,23 +1,14 @@
 import logging
-from datetime import datetime, timezone
-from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
-from firebase_admin import firestore
 
 from app.config import get_settings
 from app.middleware.auth import get_current_user
 from app.models.user import FirebaseUser
+from app.services import metrics, quota
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Cache tier lookups for 5 minutes — reduces Firestore reads by ~80%
-_tier_cache: TTLCache = TTLCache(maxsize=10000, ttl=300)
-
-
-def _today_key() -> str:
-    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
 
 async def check_rate_limit(user: FirebaseUser = Depends(get_current_user)) -> FirebaseUser:
     """
@@ -25,30 +16,17 @@ async def check_rate_limit(user: FirebaseUser = Depends(get_current_user)) -> Fi
     Free tier  → settings.free_daily_limit   (default: 5/day)
     Premium    → settings.premium_daily_limit (default: 10/day)
     Tier is stored in Firestore users/{uid}.tier, cached for 5 min.
+    Usage is read from the Redis quota counter (see app.services.quota),
+    falling back to Firestore when Redis is unavailable.
 
-    NOTE: This only CHECKS the limit. Call increment_usage() after
-    successful generation to actually consume a slot.
+    NOTE: This only CHECKS the limit. A slot is consumed when the finished book
+    is saved (firebase_db.save_book + quota.record_persisted_usage).
     """
     uid = user.uid
-    db = firestore.client()
-    today = _today_key()
-
-    # Tier lookup with in-memory cache
-    if uid in _tier_cache:
-        tier = _tier_cache[uid]
-    else:
-        user_ref = db.collection("users").document(uid)
-        user_doc = user_ref.get()
-        tier = "free"
-        if user_doc.exists:
-            tier = user_doc.to_dict().get("tier", "free")
-        _tier_cache[uid] = tier
-
-    limit = settings.premium_daily_limit if tier == "premium" else settings.free_daily_limit
-
-    usage_ref = db.collection("usage").document(f"{uid}_{today}")
-    usage_doc = usage_ref.get()
-    count = usage_doc.to_dict().get("count", 0) if usage_doc.exists else 0
+    with metrics.timer("quota_check_seconds"):
+        tier = await quota.get_tier(uid)
+        count = await quota.get_usage(uid)
+    limit = quota.daily_limit(tier)
 
     if count >= limit:
         logger.warning("rate_limit_exceeded uid=%s tier=%s count=%d limit=%d", uid, tier, count, limit)
@@ -61,22 +39,3 @@ async def check_rate_limit(user: FirebaseUser = Depends(get_current_user)) -> Fi
     user.tier = tier
     return user
 
-
-def increment_usage(uid: str) -> None:
-    """
-    Atomically increment the daily usage counter AFTER a successful generation.
-    Uses a Firestore transaction to prevent race conditions.
-    """
-    db = firestore.client()
-    today = _today_key()
-    usage_ref = db.collection("usage").document(f"{uid}_{today}")
-
-    @firestore.transactional
-    def _increment_in_transaction(transaction):
-        snapshot = usage_ref.get(transaction=transaction)
-        current = snapshot.get("count") if snapshot.exists else 0
-        transaction.set(usage_ref, {"count": current + 1, "uid": uid, "date": today}, merge=True)
-
-    transaction = db.transaction()
-    _increment_in_transaction(transaction)
-    logger.info("usage_incremented uid=%s date=%s", uid, today)
@@ -75,4 +75,7 @@ class GenerationStatus(BaseModel):
     status: str                # pending | generating | complete | failed
     progress: int              # 0-100
     message: str
+    pages_done: int = 0        # Pages finished so far
+    pages_total: int = 0       # Pages in the book (0 until scenes are planned)
+    pages: list[PageResult] = Field(default_factory=list)  # Finished pages, in page order
     result: Optional[BookResponse] = None
@@ -1,14 +1,24 @@
+import asyncio
+import json
 import logging
 import uuid
 from celery.result import AsyncResult
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from app.middleware.auth import get_current_user
 from app.middleware.rate_limit import check_rate_limit
-from app.models.book import BookRequest, BookResponse, BookSummary, GenerationStatus
+from app.models.book import (
+    BookRequest,
+    BookResponse,
+    BookSummary,
+    GenerationStatus,
+    PageResult,
+)
 from app.models.user import FirebaseUser
-from app.services.firebase_db import get_user_books, get_book
-from app.tasks import generate_book_task
+from app.services import idempotency, metrics, progress
+from app.services.firebase_db import MAX_PAGE_SIZE, get_book_async, list_user_books_async
+from app.tasks import submit_generation
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -17,27 +27,126 @@ logger = logging.getLogger(__name__)
 @router.post("/generate", response_model=GenerationStatus, status_code=status.HTTP_202_ACCEPTED)
 async def generate_book(
     request: BookRequest,
-    user: FirebaseUser = Depends(check_rate_limit),  # includes auth + rate limit
+    user: FirebaseUser = Depends(get_current_user),
+    idempotency_key: str | None = Header(
+        None, max_length=255, description="Resubmissions with the same key return the same job"
+    ),
 ):
     """
     Start async book generation job.
     Returns job_id to poll status.
+    Duplicates return the existing job instead of starting another: same
+    Idempotency-Key header, or (without one) an identical request while the
+    first is still queued or generating. See app.services.idempotency.
+    The daily limit is only checked when a new job starts, so a resubmission
+    is answered even once the limit is reached.
     """
-    # Dispatch Celery task
+    request_data = request.model_dump(mode="json")
+    key, ttl = idempotency.request_key(user.uid, request_data, idempotency_key)
+    request_fingerprint = idempotency.fingerprint(request_data)
+    job_id = str(uuid.uuid4())
+    existing = await idempotency.claim(key, job_id, ttl, request_fingerprint)
+    if existing is not None:
+        existing_job, existing_fingerprint = existing
+        # (keys claimed before fingerprints were recorded have none)
+        if idempotency_key and existing_fingerprint not in ("", request_fingerprint):
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for a different request.",
+            )
+        current = await get_generation_status(existing_job, user)
+        if idempotency_key or current.status not in progress.TERMINAL_STATUSES:
+            metrics.incr("generate_deduplicated", source="header" if idempotency_key else "request")
+            logger.info("job_deduplicated job_id=%s uid=%s", existing_job, user.uid)
+            return current
+        # Same request after the earlier book finished — a deliberate new one
+        existing = await idempotency.claim(
+            key, job_id, ttl, request_fingerprint, replacing=existing_job
+        )
+        if existing is not None:  # a concurrent resubmission took over first
+            return await get_generation_status(existing[0], user)
+
+    # A new job will start: now it counts against the daily limit
+    try:
+        user = await check_rate_limit(user)
+    except HTTPException:
+        await idempotency.release(key, job_id)
+        raise
+
+    # Queue through the fair scheduler (tier-weighted, round-robin per user);
+    # it dispatches the Celery task once a worker slot is free.
     # We pass Pydantic models as dicts because Celery serializer is JSON
-    task = generate_book_task.delay(
-        request.model_dump(),
-        user.model_dump(),
-    )
-    
-    logger.info("job_dispatched job_id=%s uid=%s", task.id, user.uid)
-    
-    return GenerationStatus(
-        job_id=task.id,
+    try:
+        await asyncio.to_thread(
+            submit_generation,
+            request.model_dump(),
+            user.model_dump(),  # includes the tier check_rate_limit resolved
+            job_id,
+        )
+    except Exception:
+        await idempotency.release(key, job_id)
+        raise
+
+    logger.info("job_queued job_id=%s uid=%s tier=%s", job_id, user.uid, user.tier)
+
+    queued = GenerationStatus(
+        job_id=job_id,
         status="pending",
         progress=0,
         message="Queued for generation...",
     )
+    # Seed the event stream so viewers that connect now see the queued state
+    await asyncio.to_thread(progress.publish, user.uid, queued.model_dump(exclude_none=True))
+    return queued
+
+
+# Bounds the snapshot lookup for a single stream
+MAX_STREAMED_JOBS = 20
+
+
+@router.get("/generate/events")
+async def stream_generation_events(
+    request: Request,
+    jobs: str | None = Query(None, description="Comma-separated job ids; omit for all jobs"),
+    user: FirebaseUser = Depends(get_current_user),
+):
+    """
+    Server-sent events stream of generation progress — replaces polling
+    GET /generate/{job_id}. One connection carries every requested job; each
+    `progress` event's data is a GenerationStatus. The stream closes once all
+    requested jobs are complete or failed — unknown or expired ids count as
+    finished after a short grace — and in any case after progress.STREAM_LIFETIME.
+    Authenticate with the usual Bearer header (fetch-based SSE client).
+    """
+    job_ids = {j for j in jobs.split(",") if j} if jobs else None
+    if job_ids and len(job_ids) > MAX_STREAMED_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STREAMED_JOBS} jobs per stream.")
+
+    async def event_stream():
+        yield "retry: 3000\n\n"
+        async for event in progress.subscribe(user.uid, job_ids):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _job_owner(task_result: AsyncResult) -> str | None:
+    """uid of the job's owner, as recorded in its progress meta or result (None if unknown)."""
+    if task_result.state == "PROGRESS":
+        return (task_result.info or {}).get("uid")
+    if task_result.state == "SUCCESS" and isinstance(task_result.result, dict):
+        result = task_result.result
+        return result.get("uid") or result.get("book", {}).get("user_uid")
+    return None
 
 
 @router.get("/generate/{job_id}", response_model=GenerationStatus)
@@ -45,9 +154,12 @@ async def get_generation_status(job_id: str, user: FirebaseUser = Depends(get_cu
     """
     Poll status of a generation job.
     Returns progress, message, and final result if complete.
+    Another user's job is reported as not found.
     """
     task_result = AsyncResult(job_id)
-    
+    if _job_owner(task_result) not in (None, user.uid):
+        raise HTTPException(status_code=404, detail="Job not found.")
+
     response = GenerationStatus(
         job_id=job_id,
         status=task_result.status.lower(),  # PENDING, STARTED, RETRY, FAILURE, SUCCESS
@@ -61,6 +173,9 @@ async def get_generation_status(job_id: str, user: FirebaseUser = Depends(get_cu
         response.status = "generating"
         response.progress = meta.get("progress", 0)
         response.message = meta.get("message", "Generating...")
+        response.pages_done = meta.get("pages_done", 0)
+        response.pages_total = meta.get("pages_total", 0)
+        response.pages = [PageResult(**page) for page in meta.get("pages", [])]
         
     elif task_result.state == "SUCCESS":
         # Task completed successfully
@@ -76,6 +191,8 @@ async def get_generation_status(job_id: str, user: FirebaseUser = Depends(get_cu
             # Rehydrate BookResponse from dict
             if "book" in result_data:
                 response.result = BookResponse(**result_data["book"])
+                response.pages = response.result.pages
+                response.pages_done = response.pages_total = len(response.pages)
 
     elif task_result.state == "FAILURE":
         # Exception raised
@@ -86,15 +203,30 @@ async def get_generation_status(job_id: str, user: FirebaseUser = Depends(get_cu
 
 
 @router.get("/", response_model=list[BookSummary])
-async def list_books(user: FirebaseUser = Depends(get_current_user)):
-    """Return the authenticated user's book gallery (most recent first)."""
-    return get_user_books(user.uid)
+async def list_books(
+    response: Response,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    user: FirebaseUser = Depends(get_current_user),
+):
+    """
+    Return the authenticated user's book gallery (most recent first).
+    Paginated: when more books exist, the X-Next-Cursor header holds the
+    cursor to pass back for the next page.
+    """
+    try:
+        summaries, next_cursor = await list_user_books_async(user.uid, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return summaries
 
 
 @router.get("/{book_id}", response_model=BookResponse)
 async def get_book_detail(book_id: str, user: FirebaseUser = Depends(get_current_user)):
     """Return full book detail. Enforces ownership."""
-    data = get_book(book_id, user.uid)
+    data = await get_book_async(book_id, user.uid)
     if not data:
         raise HTTPException(status_code=404, detail="Book not found.")
     return BookResponse(**data)
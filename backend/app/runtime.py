@@ -0,0 +1,154 @@
+"""
+Per-process async runtime for Celery workers.
+
+Each worker process owns ONE long-lived event loop running on a background
+thread. Synchronous task code submits coroutines to it with run() instead of
+calling asyncio.run() per job, so anything bound to a loop — HTTP connection
+pools, API clients, asyncio semaphores — survives across jobs.
+
+The loop is started by the worker_process_init signal (see app.worker) and
+lazily on first use, so eager tasks, scripts and tests work without setup.
+A pid check makes a loop inherited across fork() restart cleanly in the child.
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Coroutine, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_loop: asyncio.AbstractEventLoop | None = None
+_thread: threading.Thread | None = None
+_pid: int | None = None
+
+# Coroutine factories run on the loop before it stops (e.g. closing shared clients)
+_shutdown_hooks: list[Callable[[], Awaitable[None]]] = []
+
+
+def start() -> asyncio.AbstractEventLoop:
+    """Start this process's runtime loop if it isn't running yet. Returns the loop."""
+    global _loop, _thread, _pid
+    with _lock:
+        if _loop is not None and _pid == os.getpid() and _loop.is_running():
+            return _loop
+
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        thread = threading.Thread(target=_run, name="async-runtime", daemon=True)
+        thread.start()
+        ready.wait()
+
+        _loop, _thread, _pid = loop, thread, os.getpid()
+        logger.info("async_runtime_started pid=%d", _pid)
+        return loop
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the runtime loop, starting it on first use."""
+    return start()
+
+
+def submit(coro: Coroutine[Any, Any, T]) -> Future[T]:
+    """Schedule a coroutine on the runtime loop without waiting for it."""
+    loop = get_loop()
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("submit() called from the runtime loop itself — await instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop)
+
+
+def run(coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+    """
+    Run a coroutine on the runtime loop and block until it finishes.
+    Drop-in replacement for asyncio.run() in synchronous task code.
+
+    If the wait is interrupted (Celery soft time limit, timeout, KeyboardInterrupt)
+    the coroutine is cancelled so it doesn't keep running on the shared loop.
+    """
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def add_shutdown_hook(hook: Callable[[], Awaitable[None]]) -> None:
+    """Register a coroutine function to await on the loop when the runtime stops."""
+    _shutdown_hooks.append(hook)
+
+
+async def _shutdown() -> None:
+    for hook in _shutdown_hooks:
+        try:
+            await hook()
+        except Exception:
+            logger.exception("async_runtime_shutdown_hook_failed")
+    current = asyncio.current_task()
+    pending = [t for t in asyncio.all_tasks() if t is not current]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+def stop(timeout: float = 10.0) -> None:
+    """Run shutdown hooks, cancel outstanding tasks and stop the loop thread."""
+    global _loop, _thread, _pid
+    with _lock:
+        loop, thread = _loop, _thread
+        if loop is None or _pid != os.getpid() or not loop.is_running():
+            _loop = _thread = _pid = None
+            return
+        _loop = _thread = _pid = None
+
+    try:
+        asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(timeout)
+    except Exception:
+        logger.exception("async_runtime_shutdown_failed")
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout)
+    loop.close()
+    logger.info("async_runtime_stopped pid=%d", os.getpid())
+
+
+atexit.register(stop)
+
+
+class LoopLocal(Generic[T]):
+    """
+    One lazily created object per event loop — for loop-bound resources such as
+    httpx.AsyncClient. On workers that's a single instance living on the runtime
+    loop; the API server's loop gets its own.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._values: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def get(self) -> T:
+        """Return the instance for the running loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        value = self._values.get(loop)
+        if value is None:
+            value = self._values[loop] = self._factory()
+        return value
+
+    def pop(self) -> T | None:
+        """Detach and return the running loop's instance, if any (for closing it)."""
+        return self._values.pop(asyncio.get_running_loop(), None)
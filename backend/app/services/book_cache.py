@@ -0,0 +1,180 @@
+"""
+Read-through cache for book detail and gallery pages (used by firebase_db).
+
+Finished books are immutable, so a book document can be cached indefinitely:
+in-process LRU first, then Redis (book:{id}) when configured. Book entries are
+stored with their owner and callers still enforce ownership on every hit.
+
+Gallery pages change whenever the user saves a book. Each user has a gallery
+version (Redis galleryver:{uid}); cached pages are keyed by it and save_book
+bumps it, so every API process stops serving the old pages immediately. Local
+pages are also capped at settings.book_cache_gallery_ttl seconds, in case a
+bump is lost to a Redis error.
+
+Books are saved by Celery workers, not the API process, so without Redis there
+is no way to tell the API a gallery changed: gallery caching requires Redis
+and is off without it. Book detail stays cached locally — a saved book never
+changes, and misses are not cached.
+"""
+
+import json
+import logging
+
+from cachetools import LRUCache, TTLCache
+from redis.exceptions import RedisError
+
+from app.config import get_settings
+from app.models.book import BookSummary
+from app.services import metrics
+from app.services.redis_client import get_async_redis, get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_enabled = settings.book_cache_size > 0
+_books: LRUCache = LRUCache(maxsize=max(settings.book_cache_size, 1))
+_galleries: TTLCache = TTLCache(
+    maxsize=max(settings.book_cache_size, 1), ttl=settings.book_cache_gallery_ttl
+)
+
+
+def _book_key(book_id: str) -> str:
+    return f"book:{book_id}"
+
+
+def _version_key(uid: str) -> str:
+    return f"galleryver:{uid}"
+
+
+def _gallery_key(uid: str, version: int, limit: int, cursor: str | None) -> str:
+    return f"gallery:{uid}:{version}:{limit}:{cursor or ''}"
+
+
+# ── Book detail ────────────────────────────────────────────────────────────────
+async def get_book(book_id: str) -> dict | None:
+    """Cached book document (any owner), or None on a miss."""
+    if not _enabled:
+        return None
+    data = _books.get(book_id)
+    if data is not None:
+        metrics.incr("book_cache_requests", kind="book", tier="local", result="hit")
+        return data
+
+    redis = get_async_redis()
+    if redis is not None:
+        try:
+            raw = await redis.get(_book_key(book_id))
+        except RedisError as e:
+            logger.warning("book_cache_redis_unavailable error=%s", e)
+            raw = None
+        if raw is not None:
+            metrics.incr("book_cache_requests", kind="book", tier="redis", result="hit")
+            data = _books[book_id] = json.loads(raw)
+            return data
+
+    metrics.incr("book_cache_requests", kind="book", tier="all", result="miss")
+    return None
+
+
+async def put_book(data: dict) -> None:
+    """Cache a book document read from Firestore."""
+    if not _enabled:
+        return
+    _books[data["book_id"]] = data
+    redis = get_async_redis()
+    if redis is not None:
+        try:
+            await redis.set(
+                _book_key(data["book_id"]), json.dumps(data), ex=settings.book_cache_redis_ttl
+            )
+        except RedisError as e:
+            logger.warning("book_cache_redis_unavailable error=%s", e)
+
+
+# ── Gallery pages ──────────────────────────────────────────────────────────────
+async def gallery_version(uid: str) -> int | None:
+    """The user's gallery version, or None when galleries can't be cached (no Redis)."""
+    redis = get_async_redis()
+    if redis is None or not _enabled:
+        return None
+    try:
+        raw = await redis.get(_version_key(uid))
+        return int(raw or 0)
+    except RedisError as e:
+        logger.warning("book_cache_redis_unavailable error=%s", e)
+        return None
+
+
+async def get_gallery(
+    uid: str, version: int | None, limit: int, cursor: str | None
+) -> tuple[list[BookSummary], str | None] | None:
+    """Cached gallery page (summaries, next_cursor) for this version, or None."""
+    redis = get_async_redis()
+    if version is None or redis is None:
+        return None
+    key = _gallery_key(uid, version, limit, cursor)
+    page = _galleries.get(key)
+    if page is not None:
+        metrics.incr("book_cache_requests", kind="gallery", tier="local", result="hit")
+        return page
+
+    try:
+        raw = await redis.get(key)
+    except RedisError as e:
+        logger.warning("book_cache_redis_unavailable error=%s", e)
+        raw = None
+    if raw is not None:
+        metrics.incr("book_cache_requests", kind="gallery", tier="redis", result="hit")
+        cached = json.loads(raw)
+        page = _galleries[key] = (
+            [BookSummary(**item) for item in cached["items"]],
+            cached["next_cursor"],
+        )
+        return page
+
+    metrics.incr("book_cache_requests", kind="gallery", tier="all", result="miss")
+    return None
+
+
+async def put_gallery(
+    uid: str,
+    version: int | None,
+    limit: int,
+    cursor: str | None,
+    page: tuple[list[BookSummary], str | None],
+) -> None:
+    redis = get_async_redis()
+    if version is None or redis is None:
+        return
+    key = _gallery_key(uid, version, limit, cursor)
+    _galleries[key] = page
+    summaries, next_cursor = page
+    payload = {"items": [s.model_dump() for s in summaries], "next_cursor": next_cursor}
+    try:
+        await redis.set(key, json.dumps(payload), ex=settings.book_cache_redis_ttl)
+    except RedisError as e:
+        logger.warning("book_cache_redis_unavailable error=%s", e)
+
+
+# ── Writes ─────────────────────────────────────────────────────────────────────
+def book_saved(data: dict) -> None:
+    """
+    Called by save_book after commit (synchronous — runs in the Celery task):
+    writes the new book through and bumps the owner's gallery version.
+    """
+    uid = data["user_uid"]
+    if _enabled:
+        _books[data["book_id"]] = data
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.incr(_version_key(uid))
+        pipe.expire(_version_key(uid), settings.book_cache_redis_ttl)
+        if _enabled:
+            pipe.set(_book_key(data["book_id"]), json.dumps(data), ex=settings.book_cache_redis_ttl)
+        pipe.execute()
+    except RedisError as e:
+        # Galleries may show stale pages until their entries expire
+        logger.warning("book_cache_redis_unavailable op=book_saved error=%s", e)
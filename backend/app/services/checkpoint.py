@@ -0,0 +1,119 @@
+"""
+Page-level checkpoints for generation jobs.
+
+A job's pages are uploaded to R2 as they finish (pipelined and fan-out modes).
+Each finished page is also recorded in a manifest, so when the job is retried
+— redelivered after a worker crash (acks_late), or retried after a timeout or
+error — only the missing pages are generated again. The job's book_id is
+derived from its job id, so a retry writes to the same R2 keys.
+
+Manifest: Redis hash ckpt:{job_id}, one field per page number holding
+{"page": PageResult, "image_key", "image_format", "thumbnail_key",
+"prompt_hash"}. The cleaned print image itself lives in R2 under image_key.
+prompt_hash ties an entry to the exact render request (model, prompt, seed,
+page format); a page whose scene changed is regenerated.
+
+Without Redis, manifests are kept in-process — enough for eager/dev runs and
+retries on the same worker.
+"""
+
+import hashlib
+import json
+import logging
+import uuid
+
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+
+from app.config import get_settings
+from app.services.redis_client import get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Longer than a job plus its retries; finished and failed jobs clear theirs
+CHECKPOINT_TTL = 86400
+
+_local: TTLCache = TTLCache(maxsize=1000, ttl=CHECKPOINT_TTL)
+
+
+def _manifest_key(job_id: str) -> str:
+    return f"ckpt:{job_id}"
+
+
+def book_id_for(job_id: str | None) -> str:
+    """Stable book id per job, so retries reuse the pages already in R2."""
+    if not job_id:
+        return str(uuid.uuid4())
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"tailormade:job:{job_id}"))
+
+
+def prompt_hash(scene: dict) -> str:
+    """Identity of a page's render request — a checkpoint is reused only if it matches."""
+    material = {
+        "model": settings.fal_model,
+        "prompt": scene["image_prompt"],
+        "seed": scene.get("seed"),
+        "page_format": settings.page_format,
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode()).hexdigest()
+
+
+def save(job_id: str, entry: dict) -> list[dict]:
+    """Record a finished page. Returns every entry of the job so far, in page order."""
+    page_number = entry["page"]["page_number"]
+    client = get_redis()
+    if client is not None:
+        key = _manifest_key(job_id)
+        try:
+            pipe = client.pipeline()
+            pipe.hset(key, str(page_number), json.dumps(entry))
+            pipe.expire(key, CHECKPOINT_TTL)
+            pipe.hvals(key)
+            *_, raws = pipe.execute()
+            return sorted((json.loads(raw) for raw in raws), key=_page_number)
+        except RedisError as e:
+            # The page is still in R2; a retry just regenerates it
+            logger.warning("checkpoint_unavailable op=save job_id=%s error=%s", job_id, e)
+            return [entry]
+
+    pages = _local.setdefault(job_id, {})
+    pages[page_number] = entry
+    return sorted(pages.values(), key=_page_number)
+
+
+def load(job_id: str, scenes: list[dict]) -> dict[int, dict]:
+    """Checkpointed pages of `scenes` (page number → entry) that are still valid."""
+    client = get_redis()
+    if client is not None:
+        try:
+            raws = client.hgetall(_manifest_key(job_id))
+        except RedisError as e:
+            logger.warning("checkpoint_unavailable op=load job_id=%s error=%s", job_id, e)
+            return {}
+        entries = {int(number): json.loads(raw) for number, raw in raws.items()}
+    else:
+        entries = dict(_local.get(job_id, {}))
+
+    valid = {}
+    for scene in scenes:
+        entry = entries.get(scene["page_number"])
+        if entry is not None and entry["prompt_hash"] == prompt_hash(scene):
+            valid[scene["page_number"]] = entry
+    return valid
+
+
+def clear(job_id: str) -> None:
+    """Drop a job's manifest once it has finished (complete or failed for good)."""
+    _local.pop(job_id, None)
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(_manifest_key(job_id))
+    except RedisError as e:
+        logger.warning("checkpoint_unavailable op=clear job_id=%s error=%s", job_id, e)
+
+
+def _page_number(entry: dict) -> int:
+    return entry["page"]["page_number"]
@@ -0,0 +1,269 @@
+"""
+Fleet-wide concurrency limits — e.g. in-flight fal.ai calls across every worker.
+
+An asyncio.Semaphore only bounds one process: with N workers the provider sees
+N × the per-process limit. FleetSemaphore shares one counter through Redis:
+
+- holders are members of a ZSET (sem:{name}) scored by lease expiry; acquiring
+  is one Lua script that drops expired leases, then adds ours if below the limit
+- a holder renews its lease every lease/3 seconds, so a crashed process frees
+  its slot within `lease` seconds instead of leaking it
+- waiters poll with jittered exponential backoff (capped at _POLL_MAX)
+
+Current occupancy is recorded as the semaphore_in_use{limiter} gauge, and time
+spent waiting as semaphore_wait_seconds{limiter}; on workers they reach
+GET /metrics through the worker metrics export (app.services.worker_metrics).
+
+Without Redis (tests, local dev), or when Redis errors, the limit is enforced
+per event loop by an in-process stand-in with the same interface.
+
+AIMDLimiter is a per-process limit that adapts instead of being fixed: +1 per
+window of healthy calls, halved on overload (429s, timeouts, rising p95).
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator
+
+from redis.exceptions import RedisError
+
+from app import runtime
+from app.services import metrics
+from app.services.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 30.0
+_POLL_MIN = 0.05
+_POLL_MAX = 1.0
+
+# ARGV: now, limit, lease expiry, token. Returns holders after acquiring, or 0 when full.
+_ACQUIRE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    return redis.call('ZCARD', KEYS[1])
+end
+return 0
+"""
+
+
+@lru_cache
+def _acquire_script(client):
+    return client.register_script(_ACQUIRE)
+
+
+class _LocalSlots:
+    """In-process stand-in: counts holders on one event loop."""
+
+    def __init__(self):
+        self.in_use = 0
+        self.changed = asyncio.Condition()
+
+
+class FleetSemaphore:
+    """Counting semaphore shared by every process through Redis, with leased slots."""
+
+    def __init__(self, name: str, limit: int, lease: float = DEFAULT_LEASE_SECONDS):
+        self.name = name
+        self.limit = limit  # <= 0 disables the limit
+        self.lease = lease
+        self._key = f"sem:{name}"
+        self._local: runtime.LoopLocal[_LocalSlots] = runtime.LoopLocal(_LocalSlots)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one slot for the duration of the block."""
+        if self.limit <= 0:
+            yield
+            return
+
+        redis = get_async_redis()
+        token = uuid.uuid4().hex
+        start = time.perf_counter()
+        if redis is not None:
+            try:
+                in_use = await self._acquire(redis, token)
+            except RedisError as e:
+                logger.warning("semaphore_redis_unavailable name=%s error=%s", self.name, e)
+                redis = None
+        if redis is None:
+            in_use = await self._acquire_local()
+        metrics.observe("semaphore_wait_seconds", time.perf_counter() - start, limiter=self.name)
+        metrics.set_gauge("semaphore_in_use", in_use, limiter=self.name)
+
+        keeper = asyncio.create_task(self._keep_alive(redis, token)) if redis else None
+        try:
+            yield
+        finally:
+            if keeper is not None:
+                keeper.cancel()
+                await self._release(redis, token)
+            else:
+                await self._release_local()
+
+    # ── Redis ──────────────────────────────────────────────────────────────────
+    async def _acquire(self, redis, token: str) -> int:
+        delay = _POLL_MIN
+        while True:
+            now = time.time()
+            in_use = await _acquire_script(redis)(
+                keys=[self._key], args=[now, self.limit, now + self.lease, token]
+            )
+            if in_use:
+                return in_use
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, _POLL_MAX)
+
+    async def _keep_alive(self, redis, token: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                # XX: never re-add a lease that already expired and was reclaimed
+                renewed = await redis.zadd(
+                    self._key, {token: time.time() + self.lease}, xx=True, ch=True
+                )
+            except RedisError as e:
+                logger.warning("semaphore_redis_unavailable name=%s error=%s", self.name, e)
+                continue
+            if not renewed:
+                logger.warning("semaphore_lease_lost name=%s", self.name)
+                return
+
+    async def _release(self, redis, token: str) -> None:
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.zrem(self._key, token)
+            pipe.zcard(self._key)
+            _, in_use = await pipe.execute()
+            metrics.set_gauge("semaphore_in_use", in_use, limiter=self.name)
+        except RedisError as e:
+            # The slot frees itself when the lease expires
+            logger.warning("semaphore_redis_unavailable name=%s error=%s", self.name, e)
+
+    # ── In-process stand-in ────────────────────────────────────────────────────
+    async def _acquire_local(self) -> int:
+        slots = self._local.get()
+        async with slots.changed:
+            await slots.changed.wait_for(lambda: slots.in_use < self.limit)
+            slots.in_use += 1
+            return slots.in_use
+
+    async def _release_local(self) -> None:
+        slots = self._local.get()
+        async with slots.changed:
+            slots.in_use -= 1
+            slots.changed.notify()
+        metrics.set_gauge("semaphore_in_use", slots.in_use, limiter=self.name)
+
+
+# ── Adaptive limit ─────────────────────────────────────────────────────────────
+class AIMDLimiter:
+    """
+    Concurrency limit for one process, adjusted by additive-increase /
+    multiplicative-decrease between `minimum` and `maximum`:
+
+    - every `window` successful calls, the window's p95 latency is compared with
+      a baseline (a slow moving average of healthy windows): above
+      baseline × `tolerance` the limit is cut by `backoff`; otherwise it grows
+      by 1 — but only if the limit was actually reached during the window
+    - overload() (429, timeout) cuts the limit by `backoff` immediately. Calls
+      that started before the last cut don't cut again, so one burst of
+      failures halves the limit once instead of collapsing it to the minimum
+
+    Callers hold slot() for the work being limited and report each call's
+    outcome with success() / overload(). The current limit is recorded as the
+    concurrency_limit{limiter} gauge (exported from workers with the rest of
+    their registry).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        window: int = 20,
+        tolerance: float = 1.5,
+        backoff: float = 0.5,
+    ):
+        self.name = name
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.window = window
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._baseline: float | None = None
+        self._saturated = False
+        self._last_cut = float("-inf")
+        self._local: runtime.LoopLocal[_LocalSlots] = runtime.LoopLocal(_LocalSlots)
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one slot for the duration of the block."""
+        slots = self._local.get()
+        async with slots.changed:
+            await slots.changed.wait_for(lambda: slots.in_use < self.limit)
+            slots.in_use += 1
+            if slots.in_use >= self.limit:
+                self._saturated = True
+        try:
+            yield
+        finally:
+            async with slots.changed:
+                slots.in_use -= 1
+                slots.changed.notify_all()
+
+    def success(self, latency: float) -> None:
+        """Record a healthy call; adjusts the limit once per full window."""
+        self._latencies.append(latency)
+        if len(self._latencies) < self.window:
+            return
+        p95 = sorted(self._latencies)[math.ceil(0.95 * self.window) - 1]
+        self._latencies.clear()
+        if self._baseline is not None and p95 > self._baseline * self.tolerance:
+            self._cut(f"p95={p95:.1f}s baseline={self._baseline:.1f}s")
+            return
+        self._baseline = p95 if self._baseline is None else 0.9 * self._baseline + 0.1 * p95
+        if self._saturated and self._limit < self.maximum:
+            self._limit = min(self._limit + 1, self.maximum)
+            logger.info("concurrency_increased limiter=%s limit=%d", self.name, self.limit)
+            self._publish()
+        self._saturated = False
+
+    def overload(self, started: float, reason: str) -> None:
+        """
+        Record a call that was throttled or timed out. `started` is its
+        time.monotonic() start — calls already in flight at the last cut are ignored.
+        """
+        if started < self._last_cut:
+            return
+        self._cut(reason)
+
+    def _cut(self, reason: str) -> None:
+        self._limit = max(self._limit * self.backoff, self.minimum)
+        self._last_cut = time.monotonic()
+        self._latencies.clear()
+        self._saturated = False
+        # Holders above the new limit finish normally; new callers wait until below it
+        logger.warning(
+            "concurrency_decreased limiter=%s limit=%d reason=%s", self.name, self.limit, reason
+        )
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.set_gauge("concurrency_limit", self.limit, limiter=self.name)
@@ -1,8 +1,14 @@
+import hashlib
+import json
 import logging
 import re
 import unicodedata
 import anthropic
+from cachetools import TTLCache
+
+from app import runtime
 from app.config import get_settings
+from app.services.redis_client import get_async_redis
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -15,6 +21,30 @@ _BLOCKED_KEYWORDS = {
     "hate", "racist", "slur", "curse", "profanity",
 }
 
+# Standalone special characters that NFKD doesn't decompose
+_TRANSLITERATE = {
+    "ø": "o", "Ø": "O", "ð": "d", "Ð": "D", "þ": "th", "Þ": "TH",
+    "æ": "ae", "Æ": "AE", "œ": "oe", "Œ": "OE", "ß": "ss",
+    "μ": "u", "ł": "l", "Ł": "L", "đ": "d", "Đ": "D",
+}
+
+
+class _FoldTable(dict):
+    """
+    str.translate table for _normalize: drops combining marks and whitespace,
+    transliterates _TRANSLITERATE. Other code points are classified on first
+    sight and memoized, so the table only holds characters actually seen.
+    """
+
+    def __missing__(self, codepoint: int):
+        char = chr(codepoint)
+        value = None if unicodedata.combining(char) or char.isspace() else codepoint
+        self[codepoint] = value
+        return value
+
+
+_FOLD = _FoldTable(str.maketrans(_TRANSLITERATE))
+
 
 def _normalize(text: str) -> str:
     """
@@ -24,34 +54,133 @@ def _normalize(text: str) -> str:
     - gμn     → gun       (NFKD + transliteration)
     """
     # NFKD decomposition: splits composed chars into base + combining marks
-    nfkd = unicodedata.normalize("NFKD", text)
-    # Strip combining characters (diacritics, accents)
-    ascii_approx = "".join(c for c in nfkd if not unicodedata.combining(c))
-    # Transliterate standalone special characters that NFKD doesn't decompose
-    _TRANSLITERATE = {
-        "ø": "o", "Ø": "O", "ð": "d", "Ð": "D", "þ": "th", "Þ": "TH",
-        "æ": "ae", "Æ": "AE", "œ": "oe", "Œ": "OE", "ß": "ss",
-        "μ": "u", "ł": "l", "Ł": "L", "đ": "d", "Đ": "D",
-    }
-    transliterated = "".join(_TRANSLITERATE.get(c, c) for c in ascii_approx)
-    # Collapse all whitespace so "g u n" becomes "gun"
-    collapsed = re.sub(r"\s+", "", transliterated)
-    return collapsed.lower()
+    # (identity for pure ASCII, the common case)
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+    # One pass: strip combining marks, transliterate, remove whitespace
+    return text.translate(_FOLD).lower()
+
+
+def _keyword_pattern(words: set[str]) -> re.Pattern:
+    """
+    Compile keywords into one prefix-trie regex — "war|weapon|wine" becomes
+    "w(?:ar|eapon|ine)" — so a scan costs one pass over the text regardless of
+    list size. Substring semantics match the original `word in text` loop; a
+    keyword that extends a shorter one ("warfare" after "war") is redundant.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True  # end of keyword
+
+    def _build(node: dict) -> str:
+        if "" in node:
+            return ""
+        branches = [re.escape(char) + _build(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    if not trie:
+        return re.compile(r"(?!)")  # empty blocklist never matches
+    return re.compile(_build(trie))
+
+
+def _load_blocklist(path: str) -> set[str]:
+    """Built-in keywords plus settings.content_blocklist_path (one term per line, # comments)."""
+    words = set(_BLOCKED_KEYWORDS)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                term = line.split("#", 1)[0].strip()
+                if term:
+                    words.add(term)
+        logger.info("content_blocklist_loaded path=%s terms=%d", path, len(words))
+    # Keywords are matched against normalized text, so normalize them the same way
+    return {w for w in map(_normalize, words) if w}
+
+
+_BLOCKLIST_RE = _keyword_pattern(_load_blocklist(settings.content_blocklist_path))
 
 
 def _layer1_check(text: str) -> tuple[bool, str]:
     """Fast keyword scan with unicode normalization. Returns (is_safe, reason)."""
-    normalized = _normalize(text)
-    for word in _BLOCKED_KEYWORDS:
-        if word in normalized:
-            logger.info("content_blocked_layer1 keyword=%s", word)
-            return False, f"Content contains inappropriate term: '{word}'"
+    match = _BLOCKLIST_RE.search(_normalize(text))
+    if match:
+        word = match.group()
+        logger.info("content_blocked_layer1 keyword=%s", word)
+        return False, f"Content contains inappropriate term: '{word}'"
     return True, ""
 
 
+# ── Layer 2 client + verdict cache ─────────────────────────────────────────────
+# One client per event loop (its connection pool is loop-bound) — reused across checks
+_clients: runtime.LoopLocal[anthropic.AsyncAnthropic] = runtime.LoopLocal(
+    lambda: anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+)
+
+
+async def _close_client() -> None:
+    client = _clients.pop()
+    if client is not None:
+        await client.close()
+
+
+runtime.add_shutdown_hook(_close_client)
+
+# Families resubmit the same title/theme — remember layer-2 verdicts by normalized text
+_verdicts: TTLCache | None = (
+    TTLCache(maxsize=settings.content_verdict_cache_size, ttl=settings.content_verdict_cache_ttl)
+    if settings.content_verdict_cache_size > 0
+    else None
+)
+_REDIS_PREFIX = "verdict:"
+
+
+def _verdict_key(text: str) -> str:
+    return hashlib.sha256(_normalize(text).encode()).hexdigest()
+
+
+async def _cached_verdict(key: str) -> tuple[bool, str] | None:
+    """Look up a layer-2 verdict: in-process first, then Redis (copied back in-process)."""
+    if _verdicts is None:
+        return None
+    verdict = _verdicts.get(key)
+    if verdict is not None:
+        return verdict
+    redis = get_async_redis()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(_REDIS_PREFIX + key)
+    except Exception as e:
+        logger.warning("verdict_cache_redis_unavailable error=%s", e)
+        return None
+    if raw is None:
+        return None
+    safe, reason = json.loads(raw)
+    verdict = _verdicts[key] = (safe, reason)
+    return verdict
+
+
+async def _store_verdict(key: str, verdict: tuple[bool, str]) -> None:
+    if _verdicts is None:
+        return
+    _verdicts[key] = verdict
+    redis = get_async_redis()
+    if redis is None:
+        return
+    try:
+        await redis.set(
+            _REDIS_PREFIX + key, json.dumps(verdict), ex=settings.content_verdict_cache_ttl
+        )
+    except Exception as e:
+        logger.warning("verdict_cache_redis_unavailable error=%s", e)
+
+
 async def _layer2_check(text: str) -> tuple[bool, str]:
     """Claude Haiku semantic check for edge cases layer 1 misses."""
-    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+    client = _clients.get()
     response = await client.messages.create(
         model="claude-haiku-4-5-20251001",
         max_tokens=100,
@@ -77,15 +206,23 @@ async def is_content_safe(text: str) -> tuple[bool, str]:
     Full two-layer check.
     Returns (is_safe, reason_if_unsafe).
     Layer 1 is instant (keyword + unicode normalization); layer 2 only runs if layer 1 passes.
-    If layer 2 (Anthropic) is unavailable, falls back to layer 1 only.
+    Layer 2 verdicts are cached by normalized text, so repeat checks skip the API call.
+    If layer 2 (Anthropic) is unavailable, falls back to layer 1 only (not cached).
     """
     safe, reason = _layer1_check(text)
     if not safe:
         return False, reason
 
+    key = _verdict_key(text)
+    cached = await _cached_verdict(key)
+    if cached is not None:
+        logger.info("content_verdict_cache_hit safe=%s", cached[0])
+        return cached
+
     # Only hit Anthropic API if layer 1 passed
     try:
         safe, reason = await _layer2_check(text)
+        await _store_verdict(key, (safe, reason))
         return safe, reason
     except Exception as exc:
         # If Anthropic API is unavailable (no credits, network error, etc.),
@@ -1,48 +1,181 @@
+import asyncio
+import base64
+import binascii
+import functools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from firebase_admin import firestore
+from app.constants import FIRESTORE_EXECUTOR_WORKERS
 from app.models.book import BookResponse, BookSummary
+from app.services import book_cache, metrics, quota
 
+# Gallery index: one small document per book (see _summary_fields), so listing a
+# library reads a few hundred bytes per book instead of the full pages array
+SUMMARIES = "book_summaries"
+MAX_PAGE_SIZE = 100
 
-def save_book(book: BookResponse) -> None:
-    """Persist completed book metadata to Firestore."""
+_pool_lock = threading.Lock()
+_db_pool: ThreadPoolExecutor | None = None
+
+
+def _timed(op: str):
+    """Record each call's latency in the firestore_latency_seconds{op} histogram."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.timer("firestore_latency_seconds", op=op):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _get_db_pool() -> ThreadPoolExecutor:
+    """Dedicated Firestore thread pool, created on first use (after fork)."""
+    global _db_pool
+    with _pool_lock:
+        if _db_pool is None:
+            _db_pool = ThreadPoolExecutor(
+                max_workers=FIRESTORE_EXECUTOR_WORKERS, thread_name_prefix="firestore"
+            )
+        return _db_pool
+
+
+async def _in_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_db_pool(), functools.partial(fn, *args))
+
+
+# ── Writes ─────────────────────────────────────────────────────────────────────
+@_timed("save_book")
+def save_book(book: BookResponse, usage_day: str | None = None) -> None:
+    """
+    Persist completed book metadata to Firestore, plus its gallery summary.
+    usage_day: also consume one daily quota slot for the book's owner on that UTC
+    day, committed in the same batch — the book and its usage land together or not
+    at all. Follow with quota.record_persisted_usage() to update the Redis counter.
+    """
     db = firestore.client()
-    db.collection("books").document(book.book_id).set(book.model_dump())
+    batch = db.batch()
+    batch.set(db.collection("books").document(book.book_id), book.model_dump())
+    batch.set(db.collection(SUMMARIES).document(book.book_id), summary_fields(book.model_dump()))
+    if usage_day:
+        usage_ref, fields = quota.usage_increment_write(book.user_uid, usage_day)
+        batch.set(usage_ref, fields, merge=True)
+    batch.commit()
+    # Write the book through to the read cache and invalidate the owner's gallery pages
+    book_cache.book_saved(book.model_dump())
 
 
-def get_user_books(uid: str, limit: int = 20) -> list[BookSummary]:
-    """Fetch lightweight gallery summaries for a user."""
+def summary_fields(data: dict) -> dict:
+    """book_summaries document for a full book document (BookSummary fields + owner)."""
+    cover = data["pages"][0]["thumbnail_url"] if data.get("pages") else ""
+    return {
+        "book_id": data["book_id"],
+        "user_uid": data["user_uid"],
+        "title": data["title"],
+        "cover_thumbnail": cover,
+        "page_count": data["page_count"],
+        "created_at": data["created_at"],
+    }
+
+
+# ── Reads ──────────────────────────────────────────────────────────────────────
+def encode_cursor(created_at: str, book_id: str) -> str:
+    """Opaque pagination cursor: position of the last summary on a page."""
+    raw = json.dumps([created_at, book_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverse of encode_cursor. Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, book_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(created_at, str) or not isinstance(book_id, str):
+        raise ValueError("Invalid cursor")
+    return created_at, book_id
+
+
+@_timed("list_user_books")
+def list_user_books(
+    uid: str, limit: int = 20, cursor: str | None = None
+) -> tuple[list[BookSummary], str | None]:
+    """
+    One page of a user's gallery from the summaries index, most recent first.
+    Returns (summaries, next_cursor); next_cursor is None on the last page.
+    Cost depends on the page size only, not on how many books the user owns.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
     db = firestore.client()
-    docs = (
-        db.collection("books")
+    query = (
+        db.collection(SUMMARIES)
         .where("user_uid", "==", uid)
         .order_by("created_at", direction=firestore.Query.DESCENDING)
-        .limit(limit)
-        .stream()
+        .order_by("book_id", direction=firestore.Query.DESCENDING)
     )
-    summaries = []
-    for doc in docs:
-        data = doc.to_dict()
-        cover = data["pages"][0]["thumbnail_url"] if data.get("pages") else ""
-        summaries.append(
-            BookSummary(
-                book_id=data["book_id"],
-                title=data["title"],
-                cover_thumbnail=cover,
-                page_count=data["page_count"],
-                created_at=data["created_at"],
-            )
-        )
+    if cursor:
+        created_at, book_id = decode_cursor(cursor)
+        query = query.start_after({"created_at": created_at, "book_id": book_id})
+
+    # One extra document tells us whether another page exists
+    docs = [doc.to_dict() for doc in query.limit(limit + 1).stream()]
+    summaries = [BookSummary(**data) for data in docs[:limit]]
+    next_cursor = None
+    if len(docs) > limit:
+        last = docs[limit - 1]
+        next_cursor = encode_cursor(last["created_at"], last["book_id"])
+    return summaries, next_cursor
+
+
+def get_user_books(uid: str, limit: int = 20) -> list[BookSummary]:
+    """Fetch lightweight gallery summaries for a user (first page)."""
+    summaries, _ = list_user_books(uid, limit)
     return summaries
 
 
+@_timed("get_book")
+def _fetch_book(book_id: str) -> dict | None:
+    doc = firestore.client().collection("books").document(book_id).get()
+    return doc.to_dict() if doc.exists else None
+
+
 def get_book(book_id: str, uid: str) -> dict | None:
     """Fetch a single book, enforcing ownership."""
-    db = firestore.client()
-    doc = db.collection("books").document(book_id).get()
-    if not doc.exists:
-        return None
-    data = doc.to_dict()
+    data = _fetch_book(book_id)
     # Ownership check
+    if data is None or data.get("user_uid") != uid:
+        return None
+    return data
+
+
+# ── Async API (for FastAPI routes) ─────────────────────────────────────────────
+# Same operations, run on the dedicated Firestore pool so routes never block the loop.
+# Book detail and gallery pages are read through app.services.book_cache.
+async def list_user_books_async(
+    uid: str, limit: int = 20, cursor: str | None = None
+) -> tuple[list[BookSummary], str | None]:
+    if cursor:
+        decode_cursor(cursor)  # reject garbage before it becomes a cache key
+    version = await book_cache.gallery_version(uid)
+    page = await book_cache.get_gallery(uid, version, limit, cursor)
+    if page is None:
+        page = await _in_pool(list_user_books, uid, limit, cursor)
+        await book_cache.put_gallery(uid, version, limit, cursor, page)
+    return page
+
+
+async def get_book_async(book_id: str, uid: str) -> dict | None:
+    data = await book_cache.get_book(book_id)
+    if data is None:
+        data = await _in_pool(_fetch_book, book_id)
+        if data is None:
+            return None
+        await book_cache.put_book(data)
+    # Ownership check — on cache hits too
     if data.get("user_uid") != uid:
         return None
     return data
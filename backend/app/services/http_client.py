@@ -0,0 +1,66 @@
+"""
+Shared async HTTP client for outbound downloads (fal.ai image results).
+
+One pooled httpx.AsyncClient per event loop — on workers that's the persistent
+app.runtime loop — so consecutive pages and jobs reuse keep-alive connections
+instead of paying a TLS handshake per image.
+"""
+
+import httpx
+
+from app import runtime
+from app.constants import HTTPX_TIMEOUT
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(HTTPX_TIMEOUT),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        follow_redirects=True,
+    )
+
+
+_clients: runtime.LoopLocal[httpx.AsyncClient] = runtime.LoopLocal(_new_client)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the running loop's shared client."""
+    return _clients.get()
+
+
+async def close_http_client() -> None:
+    """Close the running loop's shared client, if one was created."""
+    client = _clients.pop()
+    if client is not None:
+        await client.aclose()
+
+
+runtime.add_shutdown_hook(close_http_client)
+
+
+async def download_capped(
+    url: str,
+    max_bytes: int,
+    client: httpx.AsyncClient | None = None,
+) -> bytes:
+    """
+    Stream a GET response into memory, aborting as soon as it exceeds max_bytes.
+    A Content-Length over the cap is rejected before any body is read.
+    Raises ValueError when the cap is exceeded, httpx.HTTPStatusError on 4xx/5xx.
+    """
+    client = client or get_http_client()
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ValueError(f"Image too large: {declared} bytes (max {max_bytes})")
+
+        buf = bytearray()
+        # Chunks arrive as the network delivers them, so we stop within one read of the cap
+        async for chunk in response.aiter_bytes():
+            buf += chunk
+            if len(buf) > max_bytes:
+                # Leaving the context manager closes the stream without reading the rest
+                raise ValueError(f"Image too large: over {max_bytes} bytes (max {max_bytes})")
+        return bytes(buf)
@@ -0,0 +1,141 @@
+"""
+Idempotent job submission for POST /generate.
+
+Double-clicks and client retries used to enqueue a full generation each. Every
+submission now claims a key first, and a duplicate gets the existing job back:
+
+- Idempotency-Key header: the key is the client's; any resubmission within
+  IDEMPOTENCY_KEY_TTL returns the same job, whatever its state. The key also
+  records a fingerprint of the request body, so reusing it for a different
+  request is detected (and rejected by the API) instead of returning an
+  unrelated job
+- otherwise: the key is a hash of the normalized request, and identical
+  requests are collapsed while the first is still queued or generating (within
+  settings.generate_dedup_window). Once it has finished, the same request
+  starts a new book — that's a deliberate "make it again"
+
+Keys are scoped per user (idem:{uid}:...) and stored in Redis with SET-if-absent
+semantics, so concurrent duplicates across API processes resolve to one job.
+Each holds "{job_id} {fingerprint}". Without Redis they are kept in-process.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+
+from cachetools import TLRUCache
+from redis.exceptions import RedisError
+
+from app.config import get_settings
+from app.services.redis_client import get_async_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Same lifetime clients typically give their own idempotency keys
+IDEMPOTENCY_KEY_TTL = 86400
+
+# Claim KEYS[1] for job ARGV[1] with fingerprint ARGV[4] (ttl ARGV[2]) if free —
+# or if it is still held by job ARGV[3], a finished job being superseded.
+# Returns the value holding the key otherwise.
+_CLAIM = """
+local current = redis.call('GET', KEYS[1])
+if current == false or string.match(current, '^%S+') == ARGV[3] then
+    redis.call('SET', KEYS[1], ARGV[1] .. ' ' .. ARGV[4], 'EX', ARGV[2])
+    return false
+end
+return current
+"""
+
+_RELEASE = """
+local current = redis.call('GET', KEYS[1])
+if current and string.match(current, '^%S+') == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# In-process fallback: key → (job_id, fingerprint, monotonic deadline)
+_local: TLRUCache = TLRUCache(
+    maxsize=10000, ttu=lambda _key, value, _now: value[2], timer=time.monotonic
+)
+
+
+@lru_cache
+def _scripts(client):
+    return client.register_script(_CLAIM), client.register_script(_RELEASE)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip().casefold()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def request_key(
+    uid: str, request_data: dict, idempotency_key: str | None = None
+) -> tuple[str, int]:
+    """(key, ttl seconds) identifying this submission for uid."""
+    if idempotency_key:
+        digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+        return f"idem:{uid}:key:{digest}", IDEMPOTENCY_KEY_TTL
+    canonical = json.dumps(_normalize(request_data), sort_keys=True)
+    digest = hashlib.sha256(canonical.encode()).hexdigest()
+    return f"idem:{uid}:req:{digest}", settings.generate_dedup_window
+
+
+def fingerprint(request_data: dict) -> str:
+    """Hash of the exact request, to tell a resubmission from a reused key."""
+    return hashlib.sha256(json.dumps(request_data, sort_keys=True).encode()).hexdigest()
+
+
+async def claim(
+    key: str, job_id: str, ttl: int, request_fingerprint: str, replacing: str | None = None
+) -> tuple[str, str] | None:
+    """
+    Claim `key` for a new job. Returns None when claimed, or the (job id,
+    request fingerprint) already holding it. `replacing`: take the key over
+    from that (finished) job.
+    """
+    redis = get_async_redis()
+    if redis is not None:
+        try:
+            claim_script, _ = _scripts(redis)
+            current = await claim_script(
+                keys=[key], args=[job_id, ttl, replacing or "", request_fingerprint]
+            )
+        except RedisError as e:
+            # Fail open: a duplicate job is better than refusing the request
+            logger.warning("idempotency_unavailable op=claim error=%s", e)
+            return None
+        if not current:
+            return None
+        holder, _, holder_fingerprint = current.decode().partition(" ")
+        return holder, holder_fingerprint
+
+    current = _local.get(key)
+    if current is None or current[0] == replacing:
+        _local[key] = (job_id, request_fingerprint, time.monotonic() + ttl)
+        return None
+    return current[0], current[1]
+
+
+async def release(key: str, job_id: str) -> None:
+    """Give the key up again — the job it was claimed for was never submitted."""
+    redis = get_async_redis()
+    if redis is not None:
+        try:
+            _, release_script = _scripts(redis)
+            await release_script(keys=[key], args=[job_id])
+        except RedisError as e:
+            logger.warning("idempotency_unavailable op=release error=%s", e)
+        return
+
+    current = _local.get(key)
+    if current is not None and current[0] == job_id:
+        del _local[key]
@@ -2,12 +2,21 @@ import asyncio
 import logging
 import os
 import io
+import time
+from typing import Awaitable, Callable
 import fal_client
+from fal_client import FalClientHTTPError
 import httpx
 from PIL import Image
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from app.config import get_settings
+from app.constants import MAX_CONCURRENT_IMAGES, MAX_IMAGE_BYTES, THUMBNAIL_SIZE
+from app.services.concurrency import AIMDLimiter, FleetSemaphore
+from app.services.http_client import download_capped
+from app.services.render_cache import get_render_cache, render_key
+from app.services.single_flight import SingleFlight
+from app.services.line_art import clean_line_art
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -15,25 +24,45 @@ logger = logging.getLogger(__name__)
 if settings.fal_key:
     os.environ["FAL_KEY"] = settings.fal_key
 
-# ── Constants ──────────────────────────────────────────────────────────────────
-# 300 DPI is professional print standard
-# https://www.printivity.com/insights/image-resolution-for-print/
-PRINT_DPI = 300
-LETTER_WIDTH_PX = int(8.5 * PRINT_DPI)   # 2550px — US Letter width at 300 DPI
-LETTER_HEIGHT_PX = int(11 * PRINT_DPI)    # 3300px — US Letter height at 300 DPI
-THUMBNAIL_SIZE = (400, 518)               # Maintain US Letter aspect ratio
+# ── Limits ─────────────────────────────────────────────────────────────────────
+# Starts at MAX_CONCURRENT_IMAGES pages in flight per process (app.constants).
+# Grows while fal.ai latency stays flat, halves on 429s, timeouts or rising p95.
+# Binds to the worker's persistent loop (app.runtime) on first use — run
+# generate_pages through runtime.run(), never a fresh asyncio.run() loop.
+_limiter = AIMDLimiter(
+    "images",
+    initial=MAX_CONCURRENT_IMAGES,
+    minimum=settings.image_concurrency_min,
+    maximum=settings.image_concurrency_max,
+)
+# Caps fal.ai calls across the whole fleet — per-process limits alone add up to
+# workers × MAX_CONCURRENT_IMAGES and trip the provider's rate limits
+_fal_slots = FleetSemaphore("fal", settings.fal_max_concurrency)
+
+# Identical prompts requested at the same time share one fal.ai call
+_renders = SingleFlight("render")
+
 
-# 128 is 50% gray — optimal threshold for B&W line art conversion
-# Lower = more black (harder to color), Higher = more white (lost detail)
-THRESHOLD_BINARY = 128
+def _generation_arguments(prompt: str, seed: int | None = None) -> dict:
+    """fal.ai arguments for one coloring page. Also part of the render cache key."""
+    arguments = {
+        "prompt": prompt,
+        "image_size": "portrait_4_3",
+        "num_inference_steps": 28,
+        "guidance_scale": 3.5,
+        "num_images": 1,
+        "output_format": "png",
+    }
+    if seed is not None:
+        arguments["seed"] = seed
+    return arguments
 
-# Limit concurrent image generations to control memory usage
-# 3 concurrent × ~4MB raw = ~12MB vs 12 concurrent × ~4MB = ~48MB
-MAX_CONCURRENT_IMAGES = 3
-_semaphore = asyncio.Semaphore(MAX_CONCURRENT_IMAGES)
 
-# Max image download size (10MB) — prevents downloading abnormally large responses
-MAX_IMAGE_BYTES = 10 * 1024 * 1024
+def _is_overload(error: Exception) -> bool:
+    """fal.ai is throttling or saturated — signals for the adaptive limiter."""
+    if isinstance(error, FalClientHTTPError):
+        return error.status_code in (429, 503)
+    return isinstance(error, (TimeoutError, httpx.TimeoutException))
 
 
 @retry(
@@ -42,73 +71,113 @@ MAX_IMAGE_BYTES = 10 * 1024 * 1024
     retry=retry_if_exception_type((httpx.HTTPError, ConnectionError, TimeoutError)),
     reraise=True,
 )
-async def _generate_single(prompt: str) -> bytes:
-    """Call fal.ai and return raw PNG bytes. Retries up to 3x with exponential backoff."""
-    result = await asyncio.to_thread(
-        fal_client.run,
+async def _generate_single(prompt: str, seed: int | None = None) -> bytes:
+    """
+    Call fal.ai and return raw PNG bytes. Retries up to 3x with exponential backoff.
+    Each attempt holds a fleet-wide fal slot only while the call is in flight.
+    """
+    async with _fal_slots.slot():
+        started = time.monotonic()
+        try:
+            result = await asyncio.to_thread(
+                fal_client.run,
+                settings.fal_model,
+                arguments=_generation_arguments(prompt, seed),
+            )
+        except Exception as e:
+            if _is_overload(e):
+                _limiter.overload(started, type(e).__name__)
+            raise
+        _limiter.success(time.monotonic() - started)
+    image_url = result["images"][0]["url"]
+    # Shared pooled client; the size cap is enforced while streaming, not after
+    return await download_capped(image_url, MAX_IMAGE_BYTES)
+
+
+async def _render(scene: dict) -> bytes:
+    """
+    Raw render for a scene: served from the render cache when an identical
+    request was made before, otherwise generated by fal.ai and cached.
+    Identical requests in flight at the same moment (any worker) share one
+    fal.ai call — see _renders. Only the leader calls fal.ai and writes the
+    cache; followers hold no fal slot, but each still holds its generate_pages
+    slot (_limiter) while it waits.
+    """
+    seed = scene.get("seed")
+    key = render_key(
         settings.fal_model,
-        arguments={
-            "prompt": prompt,
-            "image_size": "portrait_4_3",
-            "num_inference_steps": 28,
-            "guidance_scale": 3.5,
-            "num_images": 1,
-            "output_format": "png",
-        },
+        scene["image_prompt"],
+        _generation_arguments(scene["image_prompt"], seed),
+        seed,
     )
-    image_url = result["images"][0]["url"]
-    async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
-        response = await client.get(image_url)
-        response.raise_for_status()
-        # Guard against abnormally large responses
-        if len(response.content) > MAX_IMAGE_BYTES:
-            raise ValueError(f"Image too large: {len(response.content)} bytes (max {MAX_IMAGE_BYTES})")
-        return response.content
+    cache = get_render_cache()
+    if cache is not None:
+        raw = await cache.get(key)
+        if raw is not None:
+            logger.info("render_cache_hit page=%d key=%s", scene["page_number"], key[:12])
+            return raw
+
+    async def generate_and_cache() -> bytes:
+        raw = await _generate_single(scene["image_prompt"], seed)
+        if cache is not None:
+            await cache.put(key, raw)
+        return raw
+
+    return await _renders.do(key, generate_and_cache)
 
 
 def _clean_line_art(image_bytes: bytes) -> bytes:
     """
     Post-process fal.ai output to ensure true B&W for coloring book use.
     - Converts to grayscale
-    - Applies binary threshold so whites are #FFFFFF (required for bucket fill on frontend)
     - Upscales to print resolution (300 DPI, US Letter)
-    Uses only Pillow to avoid OpenCV binary issues in all environments.
+    - Applies binary threshold so whites are #FFFFFF (required for bucket fill on frontend)
+    - Encodes as a bilevel page in settings.page_format (1-bit PNG or CCITT G4 TIFF)
+    See app.services.line_art — single-channel, LUT-based, Pillow only.
     """
-    img = Image.open(io.BytesIO(image_bytes)).convert("L")  # grayscale
-
-    # Binary threshold: pixels < 128 → black (0), >= 128 → white (255)
-    img = img.point(lambda p: 0 if p < THRESHOLD_BINARY else 255, "1")
-    img = img.convert("RGB")
-
-    # Upscale to print resolution with high-quality resampling
-    img = img.resize((LETTER_WIDTH_PX, LETTER_HEIGHT_PX), Image.LANCZOS)
-
-    buf = io.BytesIO()
-    img.save(buf, format="PNG", dpi=(PRINT_DPI, PRINT_DPI))
-    return buf.getvalue()
+    return clean_line_art(image_bytes, settings.page_format)
 
 
 def _make_thumbnail(image_bytes: bytes) -> bytes:
     """Create a small preview thumbnail from the cleaned image."""
     img = Image.open(io.BytesIO(image_bytes))
+    if img.mode == "1":
+        # Bilevel pages only support nearest-neighbour resampling — go through
+        # grayscale so the preview keeps smooth, anti-aliased lines.
+        img = img.convert("L")
     img.thumbnail(THUMBNAIL_SIZE, Image.LANCZOS)
     buf = io.BytesIO()
     img.save(buf, format="JPEG", quality=85)
     return buf.getvalue()
 
 
-async def generate_pages(scenes: list[dict]) -> list[dict]:
+async def generate_pages(
+    scenes: list[dict],
+    on_page: Callable[[dict], Awaitable[None]] | None = None,
+) -> list[dict]:
     """
-    Generate all pages with bounded concurrency via semaphore.
-    Returns scenes with added 'image_bytes' and 'thumbnail_bytes' keys.
+    Generate all pages with bounded, adaptive concurrency (see _limiter).
+    Returns scenes with added 'image_bytes', 'image_format' and 'thumbnail_bytes' keys.
+
+    on_page: optional coroutine called with each processed scene as soon as it is
+    ready (completion order, not page order) — lets callers publish pages while
+    the rest are still generating. Runs after the semaphore slot is released.
     """
     async def process_scene(scene: dict) -> dict:
-        async with _semaphore:  # Only MAX_CONCURRENT_IMAGES at a time
+        async with _limiter.slot():  # Adaptive per-process limit (see _limiter)
             logger.info("generating_page page=%d", scene["page_number"])
-            raw = await _generate_single(scene["image_prompt"])
+            raw = await _render(scene)
             cleaned = await asyncio.to_thread(_clean_line_art, raw)
             thumbnail = await asyncio.to_thread(_make_thumbnail, cleaned)
-            return {**scene, "image_bytes": cleaned, "thumbnail_bytes": thumbnail}
+            processed = {
+                **scene,
+                "image_bytes": cleaned,
+                "image_format": settings.page_format,
+                "thumbnail_bytes": thumbnail,
+            }
+        if on_page:
+            await on_page(processed)
+        return processed
 
     results = await asyncio.gather(*[process_scene(s) for s in scenes])
     return list(results)
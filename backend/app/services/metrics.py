@@ -0,0 +1,117 @@
+"""
+In-process metrics registry: counters, gauges and latency histograms.
+
+Deliberately tiny — no exporter dependency. Each process keeps its own values;
+the API serves its snapshot at GET /metrics, together with the worker processes'
+snapshots they export through Redis (app.services.worker_metrics). Labels are
+plain keyword arguments:
+
+    metrics.incr("render_cache_requests", tier="disk", result="hit")
+    with metrics.timer("firestore_latency_seconds", op="get_book"):
+        ...
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Latency histogram upper bounds in seconds (last bucket is +Inf)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters: dict[tuple, float] = {}
+_gauges: dict[tuple, float] = {}
+_histograms: dict[tuple, dict] = {}
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+
+def incr(name: str, value: float = 1, **labels) -> None:
+    """Increase a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """Set a gauge to its current value."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Record one observation in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {
+                "count": 0,
+                "sum": 0.0,
+                "buckets": [0] * (len(DEFAULT_BUCKETS) + 1),
+            }
+        hist["count"] += 1
+        hist["sum"] += value
+        hist["buckets"][bisect.bisect_left(DEFAULT_BUCKETS, value)] += 1
+
+
+@contextmanager
+def timer(name: str, **labels) -> Iterator[None]:
+    """Observe the wall-clock duration of the block in seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def quantile(name: str, q: float, **labels) -> float | None:
+    """Estimate a quantile (bucket upper bound) for a histogram, or None if empty."""
+    with _lock:
+        hist = _histograms.get(_key(name, labels))
+        if not hist or not hist["count"]:
+            return None
+        rank = q * hist["count"]
+        seen = 0
+        for bound, count in zip(DEFAULT_BUCKETS + (float("inf"),), hist["buckets"]):
+            seen += count
+            if seen >= rank:
+                return bound
+    return float("inf")
+
+
+def _series(key: tuple, value) -> dict:
+    name, labels = key
+    return {"name": name, "labels": dict(labels), "value": value}
+
+
+def snapshot() -> dict:
+    """Return every metric as JSON-friendly data."""
+    with _lock:
+        histograms = []
+        for key, hist in _histograms.items():
+            entry = _series(key, None)
+            del entry["value"]
+            entry.update(
+                count=hist["count"],
+                sum=hist["sum"],
+                buckets=dict(zip([str(b) for b in DEFAULT_BUCKETS] + ["+Inf"], hist["buckets"])),
+            )
+            histograms.append(entry)
+        return {
+            "counters": [_series(k, v) for k, v in _counters.items()],
+            "gauges": [_series(k, v) for k, v in _gauges.items()],
+            "histograms": histograms,
+        }
+
+
+def reset() -> None:
+    """Clear all metrics (tests)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
@@ -2,9 +2,13 @@ import base64
 import html
 import io
 import logging
-import os
-import tempfile
+from typing import BinaryIO
 
+from app.config import get_settings
+from app.services.line_art import PAGE_FORMATS
+from app.services.pdf_writer import PdfBookWriter
+
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 _PAGE_CSS_STRING = """
@@ -54,14 +58,57 @@ _PAGE_CSS_STRING = """
 """
 
 
-def build_pdf(title: str, pages: list[dict]) -> bytes:
+def build_pdf(title: str, pages: list[dict], backend: str | None = None) -> bytes:
     """
     Build a print-ready PDF from a list of pages.
-    Each page dict must have: page_number, description, image_bytes (PNG bytes).
+    Each page dict must have: page_number, and either image_bytes or image_file
+    (a path or binary file object). It may carry image_format (a PAGE_FORMATS
+    key, default "png").
+    backend: "native" (streaming writer) or "weasyprint"; defaults to settings.pdf_backend.
     Returns PDF as bytes.
+    """
+    buf = io.BytesIO()
+    write_pdf(title, pages, buf, backend)
+    return buf.getvalue()
+
+
+def write_pdf(title: str, pages: list[dict], out: BinaryIO, backend: str | None = None) -> int:
+    """
+    Write a book PDF into a binary file object (e.g. a temp file to stream to R2).
+    With the native writer, pages are read and embedded one at a time, so only a
+    single page image is held in memory. Returns the number of bytes written.
+    """
+    backend = backend or settings.pdf_backend
+    if backend == "weasyprint":
+        return _write_pdf_weasyprint(title, pages, out)
+
+    writer = PdfBookWriter(out, title)
+    writer.add_cover(title)
+    for page in pages:
+        writer.add_image_page(_read_page_image(page), f"Page {page['page_number']}")
+    size = writer.close()
+    logger.info("pdf_generated backend=native pages=%d size_bytes=%d", len(pages), size)
+    return size
+
+
+def _read_page_image(page: dict) -> bytes:
+    """Return a page's image bytes, reading from image_file when no bytes are attached."""
+    if "image_bytes" in page:
+        return page["image_bytes"]
+    source = page["image_file"]
+    if hasattr(source, "read"):
+        source.seek(0)
+        return source.read()
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def _write_pdf_weasyprint(title: str, pages: list[dict], out: BinaryIO) -> int:
+    """
+    Render the book through WeasyPrint from an HTML document with base64 images.
 
-    Uses tempfile to reduce peak memory — writes PDF to disk instead of
-    holding the entire PDF in a BytesIO buffer alongside the HTML.
+    The PDF goes straight into `out` — with a temp file, it is never held in
+    memory alongside the HTML.
     """
     from weasyprint import HTML, CSS
 
@@ -82,11 +129,12 @@ def build_pdf(title: str, pages: list[dict]) -> bytes:
     ]
 
     for page in pages:
-        b64 = base64.b64encode(page["image_bytes"]).decode()
+        b64 = base64.b64encode(_read_page_image(page)).decode()
+        mime = PAGE_FORMATS[page.get("image_format", "png")]["content_type"]
         html_parts.append(
             f"""
             <div class="coloring-page">
-                <img src="data:image/png;base64,{b64}" alt="Page {page['page_number']}" />
+                <img src="data:{mime};base64,{b64}" alt="Page {page['page_number']}" />
                 <p class="page-label">Page {page['page_number']}</p>
             </div>
             """
@@ -105,19 +153,8 @@ def build_pdf(title: str, pages: list[dict]) -> bytes:
     </html>
     """
 
-    # Write to tempfile to reduce peak memory usage
-    # (avoids holding HTML + PDF bytes simultaneously in RAM)
-    tmp_fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
-    try:
-        os.close(tmp_fd)
-        HTML(string=full_html).write_pdf(tmp_path, stylesheets=[page_css])
-        with open(tmp_path, "rb") as f:
-            pdf_bytes = f.read()
-        logger.info("pdf_generated pages=%d size_bytes=%d", len(pages), len(pdf_bytes))
-        return pdf_bytes
-    finally:
-        # Always clean up temp file
-        try:
-            os.unlink(tmp_path)
-        except OSError:
-            pass
+    start = out.tell()
+    HTML(string=full_html).write_pdf(out, stylesheets=[page_css])
+    size = out.tell() - start
+    logger.info("pdf_generated backend=weasyprint pages=%d size_bytes=%d", len(pages), size)
+    return size
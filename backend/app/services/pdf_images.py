@@ -0,0 +1,132 @@
+"""
+Image XObject encoding for PDF assembly.
+
+Turns stored page images into PDF image XObjects without re-rasterizing them:
+- 1-bit / 8-bit non-interlaced PNGs pass through as-is — the concatenated IDAT
+  stream is already zlib data with PNG row predictors, which /FlateDecode with
+  /Predictor 15 understands natively.
+- CCITT Group 4 TIFFs pass through as /CCITTFaxDecode streams.
+- Anything else is decoded with Pillow and re-deflated (1-bit pages stay 1-bit).
+
+Each encoder returns (dictionary entries, stream bytes); serializing them into
+the file is the PDF writer's job.
+"""
+
+import io
+import struct
+import zlib
+
+from PIL import Image
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG color type → (PDF color space, number of color components)
+_PNG_COLOR_TYPES = {
+    0: ("/DeviceGray", 1),
+    2: ("/DeviceRGB", 3),
+}
+
+# TIFF tag ids used for G4 passthrough
+_TIFF_PHOTOMETRIC = 262
+_TIFF_STRIP_OFFSETS = 273
+_TIFF_STRIP_BYTE_COUNTS = 279
+_TIFF_FILL_ORDER = 266
+
+
+def encode_image_xobject(image_bytes: bytes) -> tuple[dict, bytes]:
+    """
+    Encode image bytes as a PDF image XObject.
+    Returns (entries, stream) where entries maps PDF dictionary keys to
+    already-serialized values, excluding /Length.
+    """
+    if image_bytes.startswith(_PNG_SIGNATURE):
+        encoded = _encode_png_passthrough(image_bytes)
+        if encoded:
+            return encoded
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        if img.format == "TIFF" and img.info.get("compression") == "group4":
+            encoded = _encode_g4_passthrough(img, image_bytes)
+            if encoded:
+                return encoded
+        return _encode_decoded(img)
+
+
+def _image_entries(width: int, height: int, color_space: str, bits: int) -> dict:
+    return {
+        "/Type": "/XObject",
+        "/Subtype": "/Image",
+        "/Width": str(width),
+        "/Height": str(height),
+        "/ColorSpace": color_space,
+        "/BitsPerComponent": str(bits),
+    }
+
+
+def _encode_png_passthrough(data: bytes) -> tuple[dict, bytes] | None:
+    """Reuse the PNG's own deflate stream. Returns None if the PNG needs decoding."""
+    pos = len(_PNG_SIGNATURE)
+    header = None
+    idat = []
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif chunk_type == b"IDAT":
+            idat.append(body)
+        elif chunk_type in (b"tRNS", b"PLTE"):
+            return None  # transparency/palette need decoding
+        elif chunk_type == b"IEND":
+            break
+        pos += 12 + length
+
+    if header is None or not idat:
+        return None
+    width, height, bits, color_type, _, _, interlace = header
+    if interlace or color_type not in _PNG_COLOR_TYPES or bits not in (1, 8):
+        return None
+
+    color_space, colors = _PNG_COLOR_TYPES[color_type]
+    entries = _image_entries(width, height, color_space, bits)
+    entries["/Filter"] = "/FlateDecode"
+    entries["/DecodeParms"] = (
+        f"<< /Predictor 15 /Colors {colors} /BitsPerComponent {bits} /Columns {width} >>"
+    )
+    return entries, b"".join(idat)
+
+
+def _encode_g4_passthrough(img: Image.Image, data: bytes) -> tuple[dict, bytes] | None:
+    """Copy the single G4 strip straight into a /CCITTFaxDecode stream."""
+    tags = img.tag_v2
+    offsets = tags.get(_TIFF_STRIP_OFFSETS)
+    counts = tags.get(_TIFF_STRIP_BYTE_COUNTS)
+    if not offsets or not counts or len(offsets) != 1 or tags.get(_TIFF_FILL_ORDER, 1) != 1:
+        return None
+
+    width, height = img.size
+    # Coded white runs are rendered white by default; a min-is-black TIFF stores
+    # black pixels as coded "white" runs, so flip the bit meaning.
+    black_is_1 = "true" if tags.get(_TIFF_PHOTOMETRIC) == 1 else "false"
+    entries = _image_entries(width, height, "/DeviceGray", 1)
+    entries["/Filter"] = "/CCITTFaxDecode"
+    entries["/DecodeParms"] = (
+        f"<< /K -1 /Columns {width} /Rows {height} /BlackIs1 {black_is_1} >>"
+    )
+    return entries, data[offsets[0]:offsets[0] + counts[0]]
+
+
+def _encode_decoded(img: Image.Image) -> tuple[dict, bytes]:
+    """Fallback: decode with Pillow and deflate the raw samples."""
+    if img.mode == "1":
+        color_space, bits = "/DeviceGray", 1
+    elif img.mode == "L":
+        color_space, bits = "/DeviceGray", 8
+    else:
+        img = img.convert("RGB")
+        color_space, bits = "/DeviceRGB", 8
+
+    entries = _image_entries(img.width, img.height, color_space, bits)
+    entries["/Filter"] = "/FlateDecode"
+    # Pillow packs mode "1" rows MSB-first with 1 = white, same as 1-bit DeviceGray
+    return entries, zlib.compress(img.tobytes(), 6)
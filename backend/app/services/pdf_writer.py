@@ -0,0 +1,249 @@
+"""
+Native streaming PDF writer for coloring books.
+
+A coloring book is a text-only cover plus full-page images, so there is no need
+for an HTML layout engine. PdfBookWriter writes each object to the output stream
+as soon as it is produced — one page image at a time — and only keeps the byte
+offsets needed for the cross-reference table. Page images are embedded through
+app.services.pdf_images, so bilevel pages stay 1-bit in the PDF.
+
+The layout mirrors the WeasyPrint stylesheet in pdf_builder: US Letter with
+0.5in margins, a vertically centered cover, and 7.5in-wide images with a
+"Page N" label underneath.
+"""
+
+import html
+from typing import BinaryIO
+
+from app.services.pdf_images import encode_image_xobject
+
+# ── Layout (PDF points, 72/in) ─────────────────────────────────────────────────
+PAGE_WIDTH = 612      # 8.5in
+PAGE_HEIGHT = 792     # 11in
+MARGIN = 36           # 0.5in
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN    # 540pt — matches the 7.5in image width
+CONTENT_HEIGHT = PAGE_HEIGHT - 2 * MARGIN
+LINE_HEIGHT = 1.2
+
+# Cover text blocks: (font resource, size, gray level, space above)
+_COVER_TITLE = ("/F2", 48, 0.133, 0)        # h1, #222
+_COVER_SUBTITLE = ("/F1", 18, 0.333, 18)    # p, #555
+_COVER_BRAND = ("/F1", 14, 0.6, 24)         # p, #999
+_LABEL = ("/F1", 12, 0.533, 6)              # .page-label, #888
+
+# Standard 14 font metrics for printable ASCII (32–126), in 1/1000 em.
+# Other characters fall back to a typical lowercase width.
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD_WIDTHS = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+_FONT_WIDTHS = {"/F1": _HELVETICA_WIDTHS, "/F2": _HELVETICA_BOLD_WIDTHS}
+_FONTS = {"/F1": "Helvetica", "/F2": "Helvetica-Bold"}
+
+
+def _text_width(text: str, font: str, size: float) -> float:
+    widths = _FONT_WIDTHS[font]
+    total = sum(widths[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in text)
+    return total * size / 1000
+
+
+def _wrap(text: str, font: str, size: float, max_width: float) -> list[str]:
+    """Greedy word wrap; a single word wider than the line is kept whole."""
+    lines: list[str] = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and _text_width(candidate, font, size) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines or [""]
+
+
+def _pdf_string(text: str) -> bytes:
+    """Encode text as a WinAnsi PDF literal string."""
+    raw = text.encode("cp1252", errors="replace")
+    escaped = raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    return b"(" + escaped + b")"
+
+
+def _text_line(text: str, font: str, size: float, gray: float, top: float) -> bytes:
+    """Content-stream ops drawing one horizontally centered line whose line box starts at top."""
+    x = MARGIN + (CONTENT_WIDTH - _text_width(text, font, size)) / 2
+    # Half-leading (0.1em at 1.2 line height) plus Helvetica's ~0.8em ascent
+    baseline = top - 0.9 * size
+    return (
+        f"BT {gray:.3f} g {font} {size} Tf {x:.2f} {baseline:.2f} Td ".encode()
+        + _pdf_string(text)
+        + b" Tj ET\n"
+    )
+
+
+class PdfBookWriter:
+    """
+    Streams a coloring-book PDF into a binary file object.
+
+    Usage:
+        writer = PdfBookWriter(out, title)
+        writer.add_cover(title)
+        writer.add_image_page(image_bytes, "Page 1")
+        writer.close()
+    """
+
+    # Object numbers reserved up front so pages can reference them before they're written
+    _CATALOG, _PAGES, _FONT_REGULAR, _FONT_BOLD, _INFO = 1, 2, 3, 4, 5
+
+    def __init__(self, out: BinaryIO, title: str = ""):
+        self._out = out
+        self._written = 0
+        self._offsets: dict[int, int] = {}
+        self._next_id = self._INFO + 1
+        self._page_ids: list[int] = []
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_object(self._FONT_REGULAR, self._font_dict("/F1"))
+        self._write_object(self._FONT_BOLD, self._font_dict("/F2"))
+        info_title = _pdf_string(html.unescape(title))
+        self._write_object(
+            self._INFO,
+            b"<< /Title " + info_title + b" /Producer (TailorMade Coloring Book) >>",
+        )
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_ids)
+
+    # ── Low-level object output ────────────────────────────────────────────────
+
+    def _write(self, data: bytes) -> None:
+        self._out.write(data)
+        self._written += len(data)
+
+    def _reserve(self) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id: int, body: bytes) -> None:
+        self._offsets[obj_id] = self._written
+        self._write(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _write_stream(self, obj_id: int, entries: dict, data: bytes) -> None:
+        header = " ".join(f"{k} {v}" for k, v in entries.items())
+        self._offsets[obj_id] = self._written
+        self._write(f"{obj_id} 0 obj\n<< {header} /Length {len(data)} >>\nstream\n".encode())
+        self._write(data)
+        self._write(b"\nendstream\nendobj\n")
+
+    def _font_dict(self, name: str) -> bytes:
+        return (
+            f"<< /Type /Font /Subtype /Type1 /BaseFont /{_FONTS[name]} "
+            f"/Encoding /WinAnsiEncoding >>"
+        ).encode()
+
+    def _write_page(self, content: bytes, xobjects: dict[str, int] | None = None) -> None:
+        content_id = self._reserve()
+        self._write_stream(content_id, {}, content)
+
+        resources = (
+            f"/Font << /F1 {self._FONT_REGULAR} 0 R /F2 {self._FONT_BOLD} 0 R >>"
+        )
+        if xobjects:
+            refs = " ".join(f"/{name} {obj_id} 0 R" for name, obj_id in xobjects.items())
+            resources += f" /XObject << {refs} >>"
+
+        page_id = self._reserve()
+        self._write_object(
+            page_id,
+            (
+                f"<< /Type /Page /Parent {self._PAGES} 0 R "
+                f"/MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << {resources} >> /Contents {content_id} 0 R >>"
+            ).encode(),
+        )
+        self._page_ids.append(page_id)
+
+    # ── Pages ──────────────────────────────────────────────────────────────────
+
+    def add_cover(self, title: str) -> None:
+        """Title page: wrapped bold title with two subtitle lines, vertically centered."""
+        # Titles arrive HTML-escaped from BookRequest sanitization; PDF text is literal
+        title_lines = _wrap(html.unescape(title), _COVER_TITLE[0], _COVER_TITLE[1], CONTENT_WIDTH)
+        blocks = [(line, *_COVER_TITLE[:3], 0) for line in title_lines]
+        blocks.append(("My Personal Coloring Book", *_COVER_SUBTITLE))
+        blocks.append(("TailorMade Coloring Book", *_COVER_BRAND))
+
+        total_height = sum(size * LINE_HEIGHT + space for _, _, size, _, space in blocks)
+        top = MARGIN + (CONTENT_HEIGHT + total_height) / 2
+
+        content = b""
+        for text, font, size, gray, space in blocks:
+            top -= space
+            content += _text_line(text, font, size, gray, top)
+            top -= size * LINE_HEIGHT
+        self._write_page(content)
+
+    def add_image_page(self, image_bytes: bytes, label: str) -> None:
+        """Full-width image anchored to the top margin with a centered label below it."""
+        entries, stream = encode_image_xobject(image_bytes)
+        image_id = self._reserve()
+        self._write_stream(image_id, entries, stream)
+        del stream
+
+        width_px, height_px = int(entries["/Width"]), int(entries["/Height"])
+        font, size, gray, space = _LABEL
+        label_box = size * LINE_HEIGHT
+
+        draw_width = CONTENT_WIDTH
+        draw_height = draw_width * height_px / width_px
+        max_height = CONTENT_HEIGHT - space - label_box
+        if draw_height > max_height:  # taller than Letter — shrink to fit instead of overflowing
+            draw_height = max_height
+            draw_width = draw_height * width_px / height_px
+
+        x = MARGIN + (CONTENT_WIDTH - draw_width) / 2
+        y = PAGE_HEIGHT - MARGIN - draw_height
+        matrix = f"{draw_width:.2f} 0 0 {draw_height:.2f} {x:.2f} {y:.2f}"
+        content = f"q {matrix} cm /Im1 Do Q\n".encode()
+        content += _text_line(label, font, size, gray, y - space)
+        self._write_page(content, {"Im1": image_id})
+
+    # ── Finish ─────────────────────────────────────────────────────────────────
+
+    def close(self) -> int:
+        """Write the page tree, catalog, xref table and trailer. Returns total bytes written."""
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self._write_object(
+            self._PAGES,
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode(),
+        )
+        self._write_object(self._CATALOG, f"<< /Type /Catalog /Pages {self._PAGES} 0 R >>".encode())
+
+        xref_offset = self._written
+        size = self._next_id
+        rows = [b"0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            rows.append(f"{self._offsets[obj_id]:010d} 00000 n \n".encode())
+        self._write(f"xref\n0 {size}\n".encode() + b"".join(rows))
+        self._write(
+            (
+                f"trailer\n<< /Size {size} /Root {self._CATALOG} 0 R /Info {self._INFO} 0 R >>\n"
+                f"startxref\n{xref_offset}\n%%EOF\n"
+            ).encode()
+        )
+        return self._written
@@ -0,0 +1,177 @@
+"""
+Job progress events, pushed to viewers instead of polled.
+
+generate_book_task publishes every progress change with publish(). Events fan
+out over Redis pub/sub on one channel per user (progress:{uid}), so a viewer
+holds a single connection for all of their jobs and can never receive another
+user's events. The latest event per job is also kept for PROGRESS_EVENT_TTL
+(progress:last:{job_id}) so a viewer that connects mid-job starts from the
+current state.
+
+Event payloads match GenerationStatus: job_id, status, progress, message and,
+on completion, result (the book). Without Redis, events are delivered
+in-process only — enough for eager/dev runs where the task shares the API process.
+"""
+
+import asyncio
+import json
+import logging
+from typing import AsyncIterator
+
+from redis.exceptions import RedisError
+
+from app.services.redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Latest-event snapshots outlive the task's soft time limit comfortably
+PROGRESS_EVENT_TTL = 3600
+TERMINAL_STATUSES = {"complete", "failed"}
+
+# Every submitted job has a snapshot from the moment its id is returned, so a
+# requested job with none (unknown id, or expired) is dropped after this wait
+UNKNOWN_JOB_GRACE = 30.0
+# Hard cap on one stream; the client reconnects and resumes from the snapshots
+STREAM_LIFETIME = PROGRESS_EVENT_TTL
+
+# In-process fallback: uid → subscriber queues (with the loop that owns each queue)
+_local_subscribers: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+_local_last: dict[str, dict] = {}
+
+
+def _channel(uid: str) -> str:
+    return f"progress:{uid}"
+
+
+def _last_key(job_id: str) -> str:
+    return f"progress:last:{job_id}"
+
+
+def publish(uid: str, event: dict) -> None:
+    """
+    Publish a progress event for one of uid's jobs (synchronous — called from the
+    Celery task). Never raises: progress delivery must not fail a generation.
+    """
+    payload = json.dumps({**event, "uid": uid})
+    client = get_redis()
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.set(_last_key(event["job_id"]), payload, ex=PROGRESS_EVENT_TTL)
+            pipe.publish(_channel(uid), payload)
+            pipe.execute()
+            return
+        except RedisError as e:
+            logger.warning("progress_publish_failed job_id=%s error=%s", event["job_id"], e)
+            return
+
+    _local_last[event["job_id"]] = {**event, "uid": uid}
+    for loop, queue in list(_local_subscribers.get(uid, ())):
+        loop.call_soon_threadsafe(queue.put_nowait, payload)
+
+
+async def _snapshots(uid: str, job_ids: set[str]) -> list[dict]:
+    """Latest known event for each job that belongs to uid."""
+    redis = get_async_redis()
+    if redis is not None:
+        ids = sorted(job_ids)
+        raws = await redis.mget([_last_key(job_id) for job_id in ids]) if ids else []
+        events = [json.loads(raw) for raw in raws if raw]
+    else:
+        events = [_local_last[job_id] for job_id in job_ids if job_id in _local_last]
+    return [e for e in events if e.get("uid") == uid]
+
+
+async def subscribe(
+    uid: str,
+    job_ids: set[str] | None = None,
+    heartbeat: float = 15.0,
+    unknown_grace: float = UNKNOWN_JOB_GRACE,
+    lifetime: float = STREAM_LIFETIME,
+) -> AsyncIterator[dict | None]:
+    """
+    Yield uid's progress events as they happen — first the current state of each
+    requested job, then live events. None is yielded after `heartbeat` idle
+    seconds so callers can keep the connection alive.
+
+    job_ids: only these jobs; the stream ends once all of them are complete or
+    failed. Requested jobs with no snapshot and no event within `unknown_grace`
+    seconds count as finished. None streams every job of the user. Either way
+    the stream ends after `lifetime` seconds.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    pending = set(job_ids) if job_ids else None
+    unknown: set[str] = set()
+
+    def _wanted(event: dict) -> bool:
+        return event.get("uid") == uid and (job_ids is None or event["job_id"] in job_ids)
+
+    def _public(event: dict) -> dict:
+        unknown.discard(event["job_id"])
+        if pending is not None and event.get("status") in TERMINAL_STATUSES:
+            pending.discard(event["job_id"])
+        return {k: v for k, v in event.items() if k != "uid"}
+
+    def _timeout() -> float:
+        """Seconds to wait for the next event before checking the deadlines again."""
+        elapsed = loop.time() - started
+        deadlines = [heartbeat, lifetime - elapsed]
+        if unknown:
+            deadlines.append(unknown_grace - elapsed)
+        return max(min(deadlines), 0.0)
+
+    def _open() -> bool:
+        elapsed = loop.time() - started
+        if unknown and elapsed >= unknown_grace:
+            logger.info("progress_unknown_jobs uid=%s jobs=%s", uid, ",".join(sorted(unknown)))
+            pending.difference_update(unknown)
+            unknown.clear()
+        return (pending is None or bool(pending)) and elapsed < lifetime
+
+    async def _start() -> list[dict]:
+        snapshots = await _snapshots(uid, job_ids or set())
+        if pending is not None:
+            unknown.update(pending - {event["job_id"] for event in snapshots})
+        return [_public(event) for event in snapshots]
+
+    redis = get_async_redis()
+    if redis is not None:
+        pubsub = redis.pubsub()
+        # Subscribe before reading snapshots so no event falls in between
+        await pubsub.subscribe(_channel(uid))
+        try:
+            for event in await _start():
+                yield event
+            while _open():
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=_timeout()
+                )
+                if message is None:
+                    if _open():
+                        yield None
+                    continue
+                event = json.loads(message["data"])
+                if _wanted(event):
+                    yield _public(event)
+        finally:
+            await pubsub.aclose()
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    entry = (loop, queue)
+    _local_subscribers.setdefault(uid, set()).add(entry)
+    try:
+        for event in await _start():
+            yield event
+        while _open():
+            try:
+                event = json.loads(await asyncio.wait_for(queue.get(), _timeout()))
+            except asyncio.TimeoutError:
+                if _open():
+                    yield None
+                continue
+            if _wanted(event):
+                yield _public(event)
+    finally:
+        _local_subscribers[uid].discard(entry)
@@ -0,0 +1,182 @@
+"""
+Daily generation quota engine.
+
+Counters live in Redis as usage:{uid}:{YYYY-MM-DD}, expiring at the next UTC
+midnight and incremented atomically by a Lua script, so a quota check is a
+single GET instead of two Firestore reads.
+
+Firestore's usage/{uid}_{date} document stays the durable record:
+- a Redis miss (first request of the day, eviction, flush) seeds the counter from it
+- a book is charged in the same Firestore batch that saves it
+  (usage_increment_write, see firebase_db.save_book), then mirrored into the
+  Redis counter with record_persisted_usage — the only way a slot is consumed.
+  If the counter isn't seeded yet, the worker seeds it from Firestore itself
+
+Seeding never lowers the counter (the larger of the stored and seed values
+wins), so a check that read Firestore just before a book was charged can't
+overwrite the worker's up-to-date seed with its stale count.
+
+Without Redis, or when Redis errors, checks fall back to Firestore reads (run
+off the event loop on the API side).
+"""
+
+import asyncio
+import logging
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+
+from cachetools import TTLCache
+from firebase_admin import firestore
+from redis.exceptions import RedisError
+
+from app.config import get_settings
+from app.services import metrics
+from app.services.redis_client import get_async_redis, get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Cache tier lookups for 5 minutes — in-process, then shared through Redis
+TIER_CACHE_TTL = 300
+_tier_cache: TTLCache = TTLCache(maxsize=10000, ttl=TIER_CACHE_TTL)
+
+# INCR only once the day's counter has been seeded from Firestore, so a missing
+# key is never mistaken for zero usage. Returns nil when the caller must seed first.
+_INCR_IF_SEEDED = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCR', KEYS[1])
+end
+return false
+"""
+
+# Seed KEYS[1] with ARGV[1] (expiring at ARGV[2]) unless it already holds at least
+# that much. Returns the counter's value.
+_SEED_MAX = """
+local current = redis.call('GET', KEYS[1])
+if current and tonumber(current) >= tonumber(ARGV[1]) then
+    return tonumber(current)
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EXAT', ARGV[2])
+return tonumber(ARGV[1])
+"""
+
+
+def today_key() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def next_midnight(now: datetime | None = None) -> int:
+    """Unix timestamp of the next UTC midnight — when today's counters expire."""
+    now = now or datetime.now(timezone.utc)
+    midnight = datetime.combine((now + timedelta(days=1)).date(), time.min, tzinfo=timezone.utc)
+    return int(midnight.timestamp())
+
+
+def daily_limit(tier: str) -> int:
+    return settings.premium_daily_limit if tier == "premium" else settings.free_daily_limit
+
+
+def _usage_key(uid: str, day: str) -> str:
+    return f"usage:{uid}:{day}"
+
+
+# ── Firestore (durable record + fallback) ──────────────────────────────────────
+def _usage_doc(uid: str, day: str):
+    return firestore.client().collection("usage").document(f"{uid}_{day}")
+
+
+def _read_tier(uid: str) -> str:
+    user_doc = firestore.client().collection("users").document(uid).get()
+    if user_doc.exists:
+        return user_doc.to_dict().get("tier", "free")
+    return "free"
+
+
+def _read_usage(uid: str, day: str) -> int:
+    usage_doc = _usage_doc(uid, day).get()
+    return usage_doc.to_dict().get("count", 0) if usage_doc.exists else 0
+
+
+def usage_increment_write(uid: str, day: str) -> tuple:
+    """
+    (document, fields) consuming one slot on `day` — for callers that batch it with
+    their own writes (see firebase_db.save_book). Pair with record_persisted_usage().
+    """
+    return _usage_doc(uid, day), {"count": firestore.Increment(1), "uid": uid, "date": day}
+
+
+# ── Public API ─────────────────────────────────────────────────────────────────
+async def get_tier(uid: str) -> str:
+    """User tier from users/{uid}.tier, cached in-process and in Redis for 5 min."""
+    tier = _tier_cache.get(uid)
+    if tier is not None:
+        return tier
+
+    redis = get_async_redis()
+    if redis is not None:
+        try:
+            raw = await redis.get(f"tier:{uid}")
+            tier = raw.decode() if raw else None
+        except RedisError as e:
+            logger.warning("quota_redis_unavailable op=get_tier error=%s", e)
+            redis = None
+
+    if tier is None:
+        tier = await asyncio.to_thread(_read_tier, uid)
+        if redis is not None:
+            try:
+                await redis.set(f"tier:{uid}", tier, ex=TIER_CACHE_TTL)
+            except RedisError as e:
+                logger.warning("quota_redis_unavailable op=set_tier error=%s", e)
+
+    _tier_cache[uid] = tier
+    return tier
+
+
+async def get_usage(uid: str) -> int:
+    """Books generated today (UTC)."""
+    day = today_key()
+    redis = get_async_redis()
+    if redis is not None:
+        key = _usage_key(uid, day)
+        try:
+            raw = await redis.get(key)
+            if raw is None:
+                seed = await asyncio.to_thread(_read_usage, uid, day)
+                # Another process may have seeded (and incremented) meanwhile
+                _, seed_script = _scripts(redis)
+                raw = await seed_script(keys=[key], args=[seed, next_midnight()])
+            metrics.incr("quota_checks", backend="redis")
+            return int(raw)
+        except RedisError as e:
+            logger.warning("quota_redis_unavailable op=get_usage error=%s", e)
+
+    metrics.incr("quota_checks", backend="firestore")
+    return await asyncio.to_thread(_read_usage, uid, day)
+
+
+@lru_cache
+def _scripts(client):
+    return client.register_script(_INCR_IF_SEEDED), client.register_script(_SEED_MAX)
+
+
+def record_persisted_usage(uid: str, day: str) -> None:
+    """
+    Mirror a slot already committed to Firestore (usage_increment_write) into the
+    Redis counter. An unseeded counter is seeded from Firestore, which already
+    includes this slot.
+    """
+    client = get_redis()
+    if client is None:
+        return
+    key = _usage_key(uid, day)
+    try:
+        incr_script, seed_script = _scripts(client)
+        count = incr_script(keys=[key])
+        if count is None:
+            day_start = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            count = seed_script(keys=[key], args=[_read_usage(uid, day), next_midnight(day_start)])
+        logger.info("usage_incremented uid=%s date=%s count=%s", uid, day, count)
+    except RedisError as e:
+        # Counter is now one low until it expires; Firestore remains correct
+        logger.warning("quota_redis_unavailable op=record error=%s", e)
@@ -0,0 +1,63 @@
+"""
+Shared Redis connections for caches, quotas and coordination.
+
+Both accessors return None when Redis isn't configured (settings.redis_url is
+empty, which it is while REDIS_HOST is unset), so every caller must degrade to
+its in-process fallback. Clients are binary-safe (no decode_responses) —
+callers decode what they store.
+"""
+
+from functools import lru_cache
+
+import redis
+import redis.asyncio as aioredis
+
+from app import runtime
+from app.config import get_settings
+
+settings = get_settings()
+
+# Fail fast — Redis sits in front of slower backends, never on the critical path
+_SOCKET_TIMEOUT = 2.0
+
+
+@lru_cache
+def get_redis() -> redis.Redis | None:
+    """Process-wide synchronous client (thread-safe connection pool)."""
+    if not settings.redis_url:
+        return None
+    return redis.Redis.from_url(
+        settings.redis_url,
+        socket_connect_timeout=_SOCKET_TIMEOUT,
+        socket_timeout=_SOCKET_TIMEOUT,
+        health_check_interval=30,
+    )
+
+
+def _new_async_client() -> aioredis.Redis:
+    return aioredis.Redis.from_url(
+        settings.redis_url,
+        socket_connect_timeout=_SOCKET_TIMEOUT,
+        socket_timeout=_SOCKET_TIMEOUT,
+        health_check_interval=30,
+    )
+
+
+_async_clients: runtime.LoopLocal[aioredis.Redis] = runtime.LoopLocal(_new_async_client)
+
+
+def get_async_redis() -> aioredis.Redis | None:
+    """asyncio client bound to the running event loop."""
+    if not settings.redis_url:
+        return None
+    return _async_clients.get()
+
+
+async def close_async_redis() -> None:
+    """Close the running loop's asyncio client, if one was created."""
+    client = _async_clients.pop()
+    if client is not None:
+        await client.aclose()
+
+
+runtime.add_shutdown_hook(close_async_redis)
@@ -0,0 +1,179 @@
+"""
+Content-addressed cache for raw fal.ai renders.
+
+plan_scenes is deterministic and popular themes repeat, so identical prompts
+are common. Renders are keyed by a hash of everything that determines the
+output — model, prompt, generation arguments and seed — and stored in two tiers:
+
+1. Local disk LRU (per worker host): size-bounded, least-recently-read evicted first
+2. Shared Redis tier (optional): visible to every worker, expires after a TTL
+
+A Redis hit is copied down to disk so the next read stays local.
+Hits and misses per tier are counted in metrics as render_cache_requests.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from app.config import get_settings
+from app.services import metrics
+from app.services.redis_client import get_async_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_REDIS_PREFIX = "render:"
+
+
+def render_key(model: str, prompt: str, arguments: dict, seed: int | None = None) -> str:
+    """Stable hex digest identifying one render request."""
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "arguments": arguments, "seed": seed},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DiskLRU:
+    """
+    Size-bounded file cache. Reads bump a file's mtime; when the total size passes
+    max_bytes the oldest files are deleted until it's back under 90% of the cap.
+    Blocking I/O — call from a worker thread.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._size = sum(p.stat().st_size for p in self._files())
+
+    def _files(self):
+        return (p for p in self.directory.glob("*/*") if p.is_file() and p.suffix != ".tmp")
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mark as recently used
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            previous = path.stat().st_size
+        except FileNotFoundError:
+            previous = 0
+        os.replace(tmp, path)
+        with self._lock:
+            self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        target = int(self.max_bytes * 0.9)
+        entries = []
+        for p in self._files():
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if self._size <= target:
+                break
+            p.unlink(missing_ok=True)
+            self._size -= size
+        logger.info("render_cache_evicted size_bytes=%d", self._size)
+
+
+class RenderCache:
+    """
+    Two-tier (disk + optional Redis) cache of raw render bytes.
+    Tier failures are logged and treated as misses — the cache never fails a page.
+    """
+
+    def __init__(self, disk: DiskLRU | None, redis_ttl: int = 0):
+        self.disk = disk
+        self.redis_ttl = redis_ttl
+
+    def _disk_get(self, key: str) -> bytes | None:
+        try:
+            return self.disk.get(key)
+        except OSError as e:
+            logger.warning("render_cache_disk_error error=%s", e)
+            return None
+
+    def _disk_put(self, key: str, data: bytes) -> None:
+        try:
+            self.disk.put(key, data)
+        except OSError as e:
+            logger.warning("render_cache_disk_error error=%s", e)
+
+    async def get(self, key: str) -> bytes | None:
+        if self.disk:
+            data = await asyncio.to_thread(self._disk_get, key)
+            metrics.incr("render_cache_requests", tier="disk", result="hit" if data else "miss")
+            if data:
+                return data
+
+        redis = get_async_redis() if self.redis_ttl else None
+        if redis:
+            try:
+                data = await redis.get(_REDIS_PREFIX + key)
+            except Exception as e:
+                logger.warning("render_cache_redis_unavailable error=%s", e)
+                data = None
+            metrics.incr("render_cache_requests", tier="redis", result="hit" if data else "miss")
+            if data:
+                if self.disk:
+                    await asyncio.to_thread(self._disk_put, key, data)
+                return data
+        return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        if self.disk:
+            await asyncio.to_thread(self._disk_put, key, data)
+        redis = get_async_redis() if self.redis_ttl else None
+        if redis:
+            try:
+                await redis.set(_REDIS_PREFIX + key, data, ex=self.redis_ttl)
+            except Exception as e:
+                logger.warning("render_cache_redis_unavailable error=%s", e)
+
+
+_cache: RenderCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache | None:
+    """Process-wide cache built from settings, or None when caching is disabled."""
+    global _cache
+    if not settings.render_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            disk = None
+            if settings.render_cache_max_mb > 0:
+                max_bytes = settings.render_cache_max_mb * 1024 * 1024
+                disk = DiskLRU(settings.render_cache_dir, max_bytes)
+            _cache = RenderCache(disk, settings.render_cache_redis_ttl)
+        return _cache
@@ -0,0 +1,274 @@
+"""
+Fair admission of generation jobs into Celery.
+
+Jobs used to go straight onto one Celery queue, so whoever submitted first ran
+first: one user's burst of books delayed everyone behind it, premium included.
+
+Now jobs wait in Redis until a worker slot is free, and are admitted in this order:
+- across tiers: smooth weighted round-robin (settings.premium_queue_weight :
+  settings.free_queue_weight, default 3:1), so premium is preferred but free
+  is never starved
+- within a tier: round-robin over users — each user with waiting jobs gets one
+  job admitted per turn, however many they have queued
+
+At most settings.generation_concurrency jobs are admitted at once (match it to
+the total worker slots). Each admitted job holds a lease in sched:inflight,
+renewed by every attempt of the job (renew()) and released when it finishes
+(release()), or after JOB_LEASE_SECONDS if its worker died. Admitted jobs are
+sent to their tier's Celery queue (QUEUES), so premium can also be given
+dedicated workers.
+
+Admission happens on submit(), on release(), and every PUMP_INTERVAL seconds
+from the pump_scheduler beat task (pump()), which also admits into slots freed
+by expired leases. An admitted job stays in sched:admitted until its dispatcher
+confirms it reached Celery (dispatched()); pump() re-dispatches jobs that were
+admitted but never confirmed (a dispatcher crashed, or timed out waiting for
+the admission it had already won).
+
+Redis layout: sched:jobs:{tier} (hash uid → that user's waiting jobs, FIFO),
+sched:ring:{tier} (users with waiting jobs, in turn order), sched:wrr (tier
+round-robin state), sched:inflight (ZSET job_id → lease expiry),
+sched:admitted (hash job_id → job) and sched:undispatched (ZSET job_id →
+admission time).
+
+Without Redis, or when Redis errors before a job is queued, jobs are admitted
+immediately in submission order — still on their tier queue.
+"""
+
+import json
+import logging
+import time
+from functools import lru_cache
+
+from redis.exceptions import RedisError
+
+from app.config import get_settings
+from app.services.redis_client import get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+QUEUES = {"premium": "generation.premium", "free": "generation.free"}
+# Longer than a job can legitimately hold its slot between renewals: an attempt
+# (300s soft limit) plus a crash redelivery (broker visibility timeout, 1h).
+# Every attempt renews the lease, so retries don't add up against it.
+JOB_LEASE_SECONDS = 2 * 3600
+# Admitted jobs not confirmed as dispatched after this long are re-dispatched
+DISPATCH_GRACE_SECONDS = 60
+# How often the beat task admits into expired slots and recovers lost dispatches
+PUMP_INTERVAL = 30
+
+_INFLIGHT_KEY = "sched:inflight"
+_WRR_KEY = "sched:wrr"
+_ADMITTED_KEY = "sched:admitted"
+_UNDISPATCHED_KEY = "sched:undispatched"
+
+# Append a job to the user's FIFO (KEYS[1] field ARGV[2]); a user enters the
+# tier's ring (KEYS[2]) when their list goes from empty to non-empty, so the
+# ring holds exactly the users with waiting jobs.
+_SUBMIT = """
+local raw = redis.call('HGET', KEYS[1], ARGV[2])
+local jobs = raw and cjson.decode(raw) or {}
+table.insert(jobs, ARGV[1])
+if #jobs == 1 then
+    redis.call('RPUSH', KEYS[2], ARGV[2])
+end
+redis.call('HSET', KEYS[1], ARGV[2], cjson.encode(jobs))
+"""
+
+# Admit jobs while slots are free. KEYS: inflight, wrr, admitted, undispatched,
+# then a (ring, jobs) pair per tier. ARGV: now, capacity, lease, then a
+# (tier, weight) pair per tier, in the same order.
+_PUMP = """
+local now, capacity, lease = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local admitted = {}
+while redis.call('ZCARD', KEYS[1]) < capacity do
+    local best, best_score, total = nil, nil, 0
+    for i = 4, #ARGV, 2 do
+        local ring = KEYS[5 + (i - 4)]
+        if redis.call('LLEN', ring) > 0 then
+            local tier, weight = ARGV[i], tonumber(ARGV[i + 1])
+            total = total + weight
+            local score = redis.call('HINCRBY', KEYS[2], tier, weight)
+            if best_score == nil or score > best_score then
+                best, best_score = i, score
+            end
+        end
+    end
+    if best == nil then
+        break
+    end
+    redis.call('HINCRBY', KEYS[2], ARGV[best], -total)
+    local ring, queue = KEYS[5 + (best - 4)], KEYS[6 + (best - 4)]
+    local uid = redis.call('LPOP', ring)
+    local jobs = cjson.decode(redis.call('HGET', queue, uid))
+    local job = table.remove(jobs, 1)
+    if #jobs > 0 then
+        redis.call('HSET', queue, uid, cjson.encode(jobs))
+        redis.call('RPUSH', ring, uid)
+    else
+        redis.call('HDEL', queue, uid)
+    end
+    local job_id = cjson.decode(job)['job_id']
+    redis.call('ZADD', KEYS[1], now + lease, job_id)
+    redis.call('HSET', KEYS[3], job_id, job)
+    redis.call('ZADD', KEYS[4], now, job_id)
+    table.insert(admitted, job)
+end
+return admitted
+"""
+
+# Claim admitted jobs unconfirmed since before ARGV[1]: re-stamp them with
+# ARGV[2] (so they are not claimed again for another grace period) and return them.
+_RECOVER = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local jobs = {}
+for _, job_id in ipairs(ids) do
+    local job = redis.call('HGET', KEYS[2], job_id)
+    if job then
+        redis.call('ZADD', KEYS[1], ARGV[2], job_id)
+        table.insert(jobs, job)
+    else
+        redis.call('ZREM', KEYS[1], job_id)
+    end
+end
+return jobs
+"""
+
+
+def tier_of(tier: str | None) -> str:
+    return tier if tier in QUEUES else "free"
+
+
+def queue_for(tier: str | None) -> str:
+    """Celery queue for a tier's generation tasks."""
+    return QUEUES[tier_of(tier)]
+
+
+def _ring_key(tier: str) -> str:
+    return f"sched:ring:{tier}"
+
+
+def _jobs_key(tier: str) -> str:
+    return f"sched:jobs:{tier}"
+
+
+@lru_cache
+def _scripts(client):
+    return (
+        client.register_script(_SUBMIT),
+        client.register_script(_PUMP),
+        client.register_script(_RECOVER),
+    )
+
+
+def _leased(raws: list[bytes]) -> list[dict]:
+    # leased: the scheduler tracks the job until dispatched() — see submit()
+    return [{**json.loads(raw), "leased": True} for raw in raws]
+
+
+def _pump(client) -> list[dict]:
+    weights = {"premium": settings.premium_queue_weight, "free": settings.free_queue_weight}
+    keys = [_INFLIGHT_KEY, _WRR_KEY, _ADMITTED_KEY, _UNDISPATCHED_KEY]
+    args = [time.time(), settings.generation_concurrency, JOB_LEASE_SECONDS]
+    for tier, weight in weights.items():
+        keys += [_ring_key(tier), _jobs_key(tier)]
+        args += [tier, max(weight, 1)]
+    _, pump_script, _ = _scripts(client)
+    return _leased(pump_script(keys=keys, args=args))
+
+
+def submit(job: dict) -> list[dict]:
+    """
+    Queue a job — a dict with at least job_id, uid and tier. Returns the jobs
+    admitted as a result (possibly this one, possibly others, possibly none):
+    the caller must dispatch every one of them and confirm each with dispatched().
+
+    Jobs marked "leased" are tracked by the scheduler: if their dispatch fails,
+    pump() re-dispatches them. An unleased job (no Redis) is the caller's alone.
+    """
+    tier = job["tier"] = tier_of(job.get("tier"))
+    client = get_redis()
+    if client is None:
+        return [job]
+    submit_script, _, _ = _scripts(client)
+    try:
+        submit_script(
+            keys=[_jobs_key(tier), _ring_key(tier)], args=[json.dumps(job), job["uid"]]
+        )
+    except RedisError as e:
+        logger.warning("scheduler_unavailable op=submit job_id=%s error=%s", job["job_id"], e)
+        return [job]
+    try:
+        return _pump(client)
+    except RedisError as e:
+        # The job is queued; a later pump admits it (and recovers anything this
+        # pump admitted on the server before the error reached us)
+        logger.warning("scheduler_unavailable op=pump job_id=%s error=%s", job["job_id"], e)
+        return []
+
+
+def dispatched(job_id: str) -> None:
+    """Confirm an admitted job reached Celery, so pump() won't re-dispatch it."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline()
+        pipe.zrem(_UNDISPATCHED_KEY, job_id)
+        pipe.hdel(_ADMITTED_KEY, job_id)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning("scheduler_unavailable op=dispatched job_id=%s error=%s", job_id, e)
+
+
+def renew(job_id: str) -> None:
+    """Extend a running job's lease — called at the start of every attempt."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.zadd(_INFLIGHT_KEY, {job_id: time.time() + JOB_LEASE_SECONDS}, xx=True)
+    except RedisError as e:
+        logger.warning("scheduler_unavailable op=renew job_id=%s error=%s", job_id, e)
+
+
+def release(job_id: str) -> list[dict]:
+    """Free a finished job's slot. Returns the jobs admitted in its place."""
+    client = get_redis()
+    if client is None:
+        return []
+    try:
+        pipe = client.pipeline()
+        pipe.zrem(_INFLIGHT_KEY, job_id)
+        pipe.zrem(_UNDISPATCHED_KEY, job_id)
+        pipe.hdel(_ADMITTED_KEY, job_id)
+        pipe.execute()
+        return _pump(client)
+    except RedisError as e:
+        # The slot frees itself when the lease expires
+        logger.warning("scheduler_unavailable op=release job_id=%s error=%s", job_id, e)
+        return []
+
+
+def pump() -> list[dict]:
+    """
+    Periodic admission (beat task): jobs admitted but never confirmed as
+    dispatched, then jobs admitted into free slots. The caller dispatches them all.
+    """
+    client = get_redis()
+    if client is None:
+        return []
+    _, _, recover_script = _scripts(client)
+    now = time.time()
+    try:
+        recovered = _leased(recover_script(
+            keys=[_UNDISPATCHED_KEY, _ADMITTED_KEY], args=[now - DISPATCH_GRACE_SECONDS, now]
+        ))
+        for job in recovered:
+            logger.warning("scheduler_redispatch job_id=%s", job["job_id"])
+        return recovered + _pump(client)
+    except RedisError as e:
+        logger.warning("scheduler_unavailable op=pump error=%s", e)
+        return []
@@ -0,0 +1,153 @@
+"""
+Single-flight coalescing of identical in-flight work (used for fal.ai renders).
+
+The render cache only helps once a render has finished. When many jobs ask for
+the same prompt at the same moment (a popular theme, a classroom session),
+every one of them misses the cache and calls fal.ai. SingleFlight makes them
+share one call:
+
+- in-process: the first caller for a key runs it; later callers await the
+  same future
+- across workers (Redis): the process that wins SET sf:lock:{key} NX runs
+  the call, stores the bytes in sf:result:{key} for a short while and
+  publishes on sf:done:{key}. Other processes subscribe and read the result.
+  If the leader fails or dies (its lock expires), followers run the call themselves
+
+Without Redis, coalescing is in-process only.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable
+
+from redis.exceptions import RedisError
+
+from app import runtime
+from app.services import metrics
+from app.services.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# How often a follower checks that the leader still holds its lock
+_LEADER_CHECK_SECONDS = 5.0
+
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one, in-process and across workers."""
+
+    def __init__(self, name: str, lock_ttl: int = 180, result_ttl: int = 60):
+        self.name = name
+        self.lock_ttl = lock_ttl  # longest a leader's call (with retries) may take
+        self.result_ttl = result_ttl  # how long followers can still pick the result up
+        self._inflight: runtime.LoopLocal[dict[str, asyncio.Future]] = runtime.LoopLocal(dict)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Return call()'s bytes, sharing one call among concurrent callers of `key`."""
+        inflight = self._inflight.get()
+        future = inflight.get(key)
+        if future is not None:
+            metrics.incr("single_flight_requests", flight=self.name, result="shared_local")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this caller was cancelled
+                return await self.do(key, call)  # the leader was — take over
+
+        future = inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self._do_shared(key, call)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # consumed here when no one else is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del inflight[key]
+
+    # ── Across workers ─────────────────────────────────────────────────────────
+    async def _do_shared(self, key: str, call: Callable[[], Awaitable[bytes]]) -> bytes:
+        redis = get_async_redis()
+        if redis is None:
+            metrics.incr("single_flight_requests", flight=self.name, result="leader")
+            return await call()
+
+        lock_key, result_key = f"sf:lock:{self.name}:{key}", f"sf:result:{self.name}:{key}"
+        channel = f"sf:done:{self.name}:{key}"
+        token = uuid.uuid4().hex
+        try:
+            leader = await redis.set(lock_key, token, nx=True, ex=self.lock_ttl)
+        except RedisError as e:
+            logger.warning("single_flight_redis_unavailable flight=%s error=%s", self.name, e)
+            return await call()
+
+        if leader:
+            metrics.incr("single_flight_requests", flight=self.name, result="leader")
+            return await self._lead(redis, lock_key, result_key, channel, token, call)
+
+        try:
+            result = await self._follow(redis, lock_key, result_key, channel)
+        except RedisError as e:
+            logger.warning("single_flight_redis_unavailable flight=%s error=%s", self.name, e)
+            result = None
+        if result is not None:
+            metrics.incr("single_flight_requests", flight=self.name, result="shared_remote")
+            return result
+        # The leader failed or disappeared — don't wait on it any longer
+        metrics.incr("single_flight_requests", flight=self.name, result="fallback")
+        return await call()
+
+    async def _lead(self, redis, lock_key, result_key, channel, token, call) -> bytes:
+        published = False
+        try:
+            result = await call()
+            try:
+                pipe = redis.pipeline(transaction=False)
+                pipe.set(result_key, result, ex=self.result_ttl)
+                pipe.publish(channel, b"1")
+                await pipe.execute()
+                published = True
+            except RedisError as e:
+                logger.warning("single_flight_redis_unavailable flight=%s error=%s", self.name, e)
+            return result
+        finally:
+            try:
+                if not published:
+                    await redis.publish(channel, b"0")  # followers stop waiting
+                await redis.eval(_RELEASE, 1, lock_key, token)
+            except RedisError as e:
+                # Followers fall back once the lock expires
+                logger.warning("single_flight_redis_unavailable flight=%s error=%s", self.name, e)
+
+    async def _follow(self, redis, lock_key, result_key, channel) -> bytes | None:
+        """The leader's result, or None if it failed or went away."""
+        pubsub = redis.pubsub()
+        # Subscribe before checking for a result so the broadcast can't slip in between
+        await pubsub.subscribe(channel)
+        try:
+            while True:
+                result = await redis.get(result_key)
+                if result is not None:
+                    return result
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=_LEADER_CHECK_SECONDS
+                )
+                if message is not None:
+                    return await redis.get(result_key) if message["data"] == b"1" else None
+                if not await redis.exists(lock_key):
+                    return await redis.get(result_key)
+        finally:
+            await pubsub.aclose()
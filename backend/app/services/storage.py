@@ -1,21 +1,63 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import BinaryIO
+
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 from app.config import get_settings
+from app.constants import (
+    R2_MAX_POOL_CONNECTIONS,
+    R2_MULTIPART_CHUNK_BYTES,
+    R2_MULTIPART_CONCURRENCY,
+    R2_UPLOAD_CONCURRENCY,
+)
 
 settings = get_settings()
 
+_transfer_config = TransferConfig(
+    multipart_threshold=R2_MULTIPART_CHUNK_BYTES,
+    multipart_chunksize=R2_MULTIPART_CHUNK_BYTES,
+    max_concurrency=R2_MULTIPART_CONCURRENCY,
+)
+
+_pool_lock = threading.Lock()
+_upload_pool: ThreadPoolExecutor | None = None
+
 
+@lru_cache
 def _get_client():
+    """
+    Process-wide R2 client. boto3 clients are thread-safe, so one client (and its
+    pooled keep-alive connections) is shared by every upload instead of paying
+    credential resolution and a TLS handshake per object.
+    """
     return boto3.client(
         "s3",
         endpoint_url=f"https://{settings.r2_account_id}.r2.cloudflarestorage.com",
         aws_access_key_id=settings.r2_access_key_id,
         aws_secret_access_key=settings.r2_secret_access_key,
-        config=Config(signature_version="s3v4"),
+        config=Config(
+            signature_version="s3v4",
+            max_pool_connections=R2_MAX_POOL_CONNECTIONS,
+            retries={"max_attempts": 3, "mode": "standard"},
+        ),
         region_name="auto",
     )
 
 
+def _get_upload_pool() -> ThreadPoolExecutor:
+    """Bounded thread pool for concurrent uploads, created on first use (after fork)."""
+    global _upload_pool
+    with _pool_lock:
+        if _upload_pool is None:
+            _upload_pool = ThreadPoolExecutor(
+                max_workers=R2_UPLOAD_CONCURRENCY, thread_name_prefix="r2-upload"
+            )
+        return _upload_pool
+
+
 def upload_bytes(
     data: bytes,
     key: str,
@@ -32,6 +74,53 @@ def upload_bytes(
     return f"{settings.r2_public_url}/{key}"
 
 
+def upload_fileobj(
+    fileobj: BinaryIO,
+    key: str,
+    content_type: str = "application/octet-stream",
+) -> str:
+    """
+    Stream a binary file object to R2 from its current position. Above
+    R2_MULTIPART_CHUNK_BYTES it goes up as a multipart upload with parts sent in
+    parallel, so the object is never read into memory whole. Returns the public URL.
+    """
+    client = _get_client()
+    client.upload_fileobj(
+        fileobj,
+        settings.r2_bucket_name,
+        key,
+        ExtraArgs={"ContentType": content_type},
+        Config=_transfer_config,
+    )
+    return f"{settings.r2_public_url}/{key}"
+
+
+def submit_upload(
+    data: bytes | BinaryIO,
+    key: str,
+    content_type: str = "application/octet-stream",
+) -> Future[str]:
+    """
+    Queue an upload on the shared pool. Returns a Future resolving to the public URL.
+    data is bytes, or a binary file object to stream (see upload_fileobj).
+    From async code, await it with asyncio.wrap_future().
+    """
+    upload = upload_bytes if isinstance(data, (bytes, bytearray)) else upload_fileobj
+    return _get_upload_pool().submit(upload, data, key, content_type)
+
+
+def download_bytes(key: str) -> bytes:
+    """Fetch an object from R2 (e.g. a page rendered by another worker)."""
+    response = _get_client().get_object(Bucket=settings.r2_bucket_name, Key=key)
+    return response["Body"].read()
+
+
+def download_many(keys: list[str]) -> list[bytes]:
+    """Download keys concurrently on the shared transfer pool. Returns bytes in input order."""
+    futures = [_get_upload_pool().submit(download_bytes, key) for key in keys]
+    return [future.result() for future in futures]
+
+
 def build_key(uid: str, book_id: str, filename: str) -> str:
     """Consistent key structure: users/{uid}/books/{book_id}/{filename}"""
     return f"users/{uid}/books/{book_id}/{filename}"
@@ -0,0 +1,103 @@
+"""
+Exports Celery workers' metrics to the API's GET /metrics.
+
+Worker processes keep their own registry (app.services.metrics) — render cache,
+single-flight, semaphores, Firestore latency, queue wait. Every EXPORT_INTERVAL
+seconds each process writes its snapshot to Redis under its own key (expiring
+after a few missed intervals, so dead processes drop out), and the API returns
+them next to its own snapshot. Counters and histograms are cumulative per
+process: sum them across processes for fleet totals.
+
+Without Redis the snapshot is logged instead (worker_metrics log line).
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+
+from redis.exceptions import RedisError
+
+from app.services import metrics
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+EXPORT_INTERVAL = 30
+_TTL = 3 * EXPORT_INTERVAL
+_INDEX_KEY = "metrics:workers"
+
+_lock = threading.Lock()
+_stop: threading.Event | None = None
+_thread: threading.Thread | None = None
+
+
+def _process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def publish() -> None:
+    """Export this process's snapshot now."""
+    snapshot = metrics.snapshot()
+    client = get_redis()
+    if client is None:
+        logger.info("worker_metrics process=%s snapshot=%s", _process_id(), json.dumps(snapshot))
+        return
+    process = _process_id()
+    try:
+        pipe = client.pipeline()
+        pipe.set(f"metrics:worker:{process}", json.dumps(snapshot), ex=_TTL)
+        pipe.sadd(_INDEX_KEY, process)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning("worker_metrics_export_failed process=%s error=%s", process, e)
+
+
+def collect() -> dict[str, dict]:
+    """Latest snapshot of every live worker process, keyed by host:pid."""
+    client = get_redis()
+    if client is None:
+        return {}
+    try:
+        processes = sorted(p.decode() for p in client.smembers(_INDEX_KEY))
+        if not processes:
+            return {}
+        raws = client.mget([f"metrics:worker:{p}" for p in processes])
+        gone = [p for p, raw in zip(processes, raws) if raw is None]
+        if gone:
+            client.srem(_INDEX_KEY, *gone)
+    except RedisError as e:
+        logger.warning("worker_metrics_collect_failed error=%s", e)
+        return {}
+    return {p: json.loads(raw) for p, raw in zip(processes, raws) if raw is not None}
+
+
+def _export_loop(stop: threading.Event) -> None:
+    while not stop.wait(EXPORT_INTERVAL):
+        publish()
+
+
+def start() -> None:
+    """Start exporting from this process (worker_process_init)."""
+    global _stop, _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _stop = threading.Event()
+        _thread = threading.Thread(
+            target=_export_loop, args=(_stop,), name="worker-metrics", daemon=True
+        )
+        _thread.start()
+
+
+def stop() -> None:
+    """Stop exporting, publishing a final snapshot (worker_process_shutdown)."""
+    global _stop, _thread
+    with _lock:
+        if _thread is None:
+            return
+        _stop.set()
+        _thread.join(5)
+        _stop = _thread = None
+    publish()
@@ -1,32 +1,392 @@
 import asyncio
+import tempfile
+import time
 import uuid
 import logging
-from celery import shared_task
-from celery.exceptions import SoftTimeLimitExceeded
+from concurrent.futures import wait
+from typing import Callable
+import httpx
+from botocore.exceptions import BotoCoreError, ClientError
+from celery import chord, shared_task
+from celery.exceptions import Ignore, SoftTimeLimitExceeded
+from fal_client import FalClientHTTPError
+from google.api_core.exceptions import ServerError, TooManyRequests
+from redis.exceptions import RedisError
 
+from app import runtime
+from app.config import get_settings
 from app.models.book import BookRequest, BookResponse, PageResult
 from app.models.user import FirebaseUser
 from app.services.content_filter import is_content_safe
 from app.services.scene_planner import plan_scenes
 from app.services.image_gen import generate_pages
-from app.services.pdf_builder import build_pdf
-from app.services.storage import upload_bytes, build_key
+from app.services.line_art import PAGE_FORMATS
+from app.services.pdf_builder import write_pdf
+from app.services.storage import build_key, download_many, submit_upload, upload_fileobj
 from app.services.firebase_db import save_book, now_iso
-from app.middleware.rate_limit import increment_usage
+from app.services import checkpoint, metrics, progress, quota, scheduler
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, soft_time_limit=300, name="generate_book_task")
-def generate_book_task(self, request_data: dict, user_data: dict):
+def _page_key(uid: str, book_id: str, scene: dict) -> str:
+    """R2 key of a page's print image."""
+    extension = PAGE_FORMATS[scene["image_format"]]["extension"]
+    return build_key(uid, book_id, f"page_{scene['page_number']:02d}.{extension}")
+
+
+def _thumbnail_key(uid: str, book_id: str, scene: dict) -> str:
+    return build_key(uid, book_id, f"page_{scene['page_number']:02d}_thumb.jpg")
+
+
+def _page_uploads(uid: str, book_id: str, scene: dict) -> list[tuple[bytes, str, str]]:
+    """R2 upload items (data, key, content_type) for one page: print image, then thumbnail."""
+    return [
+        (
+            scene["image_bytes"],
+            _page_key(uid, book_id, scene),
+            PAGE_FORMATS[scene["image_format"]]["content_type"],
+        ),
+        (
+            scene["thumbnail_bytes"],
+            _thumbnail_key(uid, book_id, scene),
+            "image/jpeg",
+        ),
+    ]
+
+
+def _publish_pdf(uid: str, book_id: str, title: str, pages: list[dict]) -> str:
+    """
+    Build the book PDF into a temp file and stream it to R2 (multipart, parallel
+    parts for large books), so the whole PDF is never held in worker memory.
+    """
+    with tempfile.TemporaryFile(suffix=".pdf") as pdf_file:
+        write_pdf(title, pages, pdf_file)
+        pdf_file.seek(0)
+        return upload_fileobj(pdf_file, build_key(uid, book_id, "book.pdf"), "application/pdf")
+
+
+def _page_result(scene: dict, image_url: str, thumbnail_url: str) -> PageResult:
+    return PageResult(
+        page_number=scene["page_number"],
+        scene_description=scene["description"],
+        image_url=image_url,
+        thumbnail_url=thumbnail_url,
+    )
+
+
+async def _publish_page(uid: str, book_id: str, scene: dict) -> PageResult:
+    """Upload a page's image and thumbnail concurrently on the shared R2 pool."""
+    image_url, thumbnail_url = await asyncio.gather(
+        *(asyncio.wrap_future(submit_upload(*item)) for item in _page_uploads(uid, book_id, scene))
+    )
+    return _page_result(scene, image_url, thumbnail_url)
+
+
+def _checkpoint_entry(uid: str, book_id: str, scene: dict, page: PageResult) -> dict:
+    """Manifest entry for a published page (see app.services.checkpoint)."""
+    return {
+        "page": page.model_dump(),
+        "image_key": _page_key(uid, book_id, scene),
+        "image_format": scene["image_format"],
+        "thumbnail_key": _thumbnail_key(uid, book_id, scene),
+        "prompt_hash": checkpoint.prompt_hash(scene),
+    }
+
+
+def _restore_images(entries: list[dict]) -> list[dict]:
+    """Fetch checkpointed print images back from R2 as PDF-ready pages, in input order."""
+    images = download_many([entry["image_key"] for entry in entries])
+    return [
+        {
+            "page_number": entry["page"]["page_number"],
+            "image_bytes": image,
+            "image_format": entry["image_format"],
+        }
+        for entry, image in zip(entries, images)
+    ]
+
+
+async def _generate_pipelined(
+    uid: str,
+    book_id: str,
+    title: str,
+    scenes: list[dict],
+    on_pages: Callable[[list[PageResult]], None] | None = None,
+    job_id: str | None = None,
+) -> tuple[list[PageResult], str]:
+    """
+    Generate → clean → upload with per-page overlap.
+    Each page starts uploading the moment its thumbnail is ready, while other
+    pages are still generating. PDF assembly starts as soon as the last page
+    lands and runs alongside any uploads still in flight.
+    Returns (page results in page order, pdf_url).
+
+    on_pages: optional blocking callback (run in a thread) with every page
+    published so far, in page order — called once per page as it goes live.
+
+    job_id: checkpoint each published page under this job, and on a retry
+    reuse the pages it already checkpointed — only missing pages are generated.
+    """
+    done = await asyncio.to_thread(checkpoint.load, job_id, scenes) if job_id else {}
+    restored_entries = sorted(done.values(), key=lambda entry: entry["page"]["page_number"])
+    restored_pages = [PageResult(**entry["page"]) for entry in restored_entries]
+    missing = [scene for scene in scenes if scene["page_number"] not in done]
+    if done:
+        logger.info(
+            "job_resumed job_id=%s pages_restored=%d pages_total=%d", job_id, len(done), len(scenes)
+        )
+    # Restored print images are only needed for the PDF — fetch them meanwhile
+    restoring = asyncio.create_task(asyncio.to_thread(_restore_images, restored_entries))
+
+    uploads: list[asyncio.Task] = []
+    published: list[PageResult] = list(restored_pages)
+    report_lock = asyncio.Lock()  # keeps reports in order: each sees one more page
+    if published and on_pages:
+        await asyncio.to_thread(on_pages, list(published))
+
+    async def publish_and_report(scene: dict) -> PageResult:
+        page = await _publish_page(uid, book_id, scene)
+        if job_id:
+            entry = _checkpoint_entry(uid, book_id, scene, page)
+            await asyncio.to_thread(checkpoint.save, job_id, entry)
+        if on_pages:
+            async with report_lock:
+                published.append(page)
+                snapshot = sorted(published, key=lambda p: p.page_number)
+                await asyncio.to_thread(on_pages, snapshot)
+        return page
+
+    async def publish_page(scene: dict) -> None:
+        uploads.append(asyncio.create_task(publish_and_report(scene)))
+
+    generated = await generate_pages(missing, on_page=publish_page)
+    processed_scenes = sorted(
+        generated + await restoring, key=lambda scene: scene["page_number"]
+    )
+
+    pdf_url, *page_results = await asyncio.gather(
+        asyncio.to_thread(_publish_pdf, uid, book_id, title, processed_scenes), *uploads
+    )
+    page_results = sorted(page_results + restored_pages, key=lambda page: page.page_number)
+    return page_results, pdf_url
+
+
+def _page_progress(done: int, total: int) -> int:
+    """Overall percent while pages are drawn: 20 (scenes planned) → 80 (all pages done)."""
+    return 20 + (60 * done) // max(total, 1)
+
+
+def _report(
+    task,
+    uid: str,
+    percent: int,
+    message: str,
+    pages_done: int = 0,
+    pages_total: int = 0,
+    pages: list[PageResult] | None = None,
+    job_id: str | None = None,
+) -> None:
+    """
+    Record progress on the Celery result (for polling) and push it to live viewers.
+    Blocking (Redis round-trips) — from async code, call it via asyncio.to_thread.
+    job_id: the book job being reported on, when that isn't `task` itself
+    (fan-out subtasks report on their parent job).
+    """
+    job_id = job_id or task.request.id
+    meta = {
+        "uid": uid,  # the job's owner — GET /generate/{job_id} checks it
+        "progress": percent,
+        "message": message,
+        "pages_done": pages_done,
+        "pages_total": pages_total,
+        "pages": [page.model_dump() for page in pages or []],
+    }
+    task.update_state(task_id=job_id, state="PROGRESS", meta=meta)
+    if job_id:
+        progress.publish(uid, {"job_id": job_id, "status": "generating", **meta})
+
+
+def _finish(task, uid: str, result: dict, job_id: str | None = None) -> dict:
+    """
+    Push the terminal event (complete or failed) to live viewers; returns result,
+    stamped with the job's owner (uid) for GET /generate/{job_id}.
+    """
+    job_id = job_id or task.request.id
+    result = {**result, "uid": uid}
+    if job_id:
+        if result["status"] == "complete":
+            pages = result["book"]["pages"]
+            event = {
+                "status": "complete",
+                "progress": 100,
+                "message": "Complete!",
+                "pages_done": len(pages),
+                "pages_total": len(pages),
+                "pages": pages,
+                "result": result["book"],
+            }
+        else:
+            event = {"status": "failed", "progress": 0, "message": result["error"]}
+        progress.publish(uid, {"job_id": job_id, **event})
+        checkpoint.clear(job_id)
+        # The job's scheduler slot is free — admit the next waiting jobs
+        _dispatch_all(scheduler.release(job_id))
+    return result
+
+
+# Modes that checkpoint published pages, so a retry resumes instead of starting over
+CHECKPOINTED_MODES = ("pipelined", "fanout")
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Worth another attempt: timeouts, network and Redis errors, provider 429/5xx."""
+    if isinstance(exc, (SoftTimeLimitExceeded, TimeoutError, ConnectionError, RedisError)):
+        return True
+    if isinstance(exc, (httpx.TransportError, BotoCoreError, ServerError, TooManyRequests)):
+        return True
+    if isinstance(exc, FalClientHTTPError):
+        status = exc.status_code
+    elif isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+    elif isinstance(exc, ClientError):
+        status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+    else:
+        return False
+    return status == 429 or status >= 500
+
+
+def _retry_or_fail(task, uid: str, exc: Exception, error: str, job_id: str | None = None) -> dict:
+    """
+    Retry a transient failure while retries remain, in modes that resume from
+    their checkpoints; otherwise fail the job. Call from an except block.
+    """
+    if (
+        settings.generation_mode in CHECKPOINTED_MODES
+        and _is_transient(exc)
+        and task.request.id
+        and task.request.retries < task.max_retries
+    ):
+        logger.warning(
+            "task_retrying task_id=%s attempt=%d error=%s",
+            task.request.id, task.request.retries + 1, error,
+        )
+        raise task.retry(exc=exc)
+    return _finish(task, uid, {"status": "failed", "error": error}, job_id)
+
+
+def _persist_book(
+    uid: str, book_id: str, request: BookRequest, page_results: list[PageResult], pdf_url: str
+) -> BookResponse:
+    """Save the finished book and consume the user's quota slot."""
+    book = BookResponse(
+        book_id=book_id,
+        title=request.title,
+        theme=request.theme,
+        page_count=request.page_count,
+        pages=page_results,
+        pdf_url=pdf_url,
+        created_at=now_iso(),
+        user_uid=uid,
+    )
+    # Book and its quota slot commit in one Firestore batch
+    usage_day = quota.today_key()
+    save_book(book, usage_day=usage_day)
+    quota.record_persisted_usage(uid, usage_day)
+    return book
+
+
+# ── Dispatch ───────────────────────────────────────────────────────────────────
+def submit_generation(request_data: dict, user_data: dict, job_id: str | None = None) -> str:
+    """
+    Queue a book for generation through the fair scheduler (see
+    app.services.scheduler). Returns the job id — the Celery task id once admitted.
+    job_id: use this id (already claimed for idempotency) instead of a new one.
+    """
+    job = {
+        "job_id": job_id or str(uuid.uuid4()),
+        "uid": user_data["uid"],
+        "tier": user_data.get("tier"),
+        "enqueued_at": time.time(),
+        "args": [request_data, user_data],
+    }
+    for failed, exc in _dispatch_all(scheduler.submit(job)):
+        if failed["job_id"] == job["job_id"] and not failed.get("leased"):
+            # Admitted without the scheduler (Redis down): nothing would retry it
+            raise exc
+    return job["job_id"]
+
+
+def dispatch_generation(job: dict) -> None:
+    """Send an admitted job to its tier's queue."""
+    generate_book_task.apply_async(
+        args=job["args"],
+        kwargs={"tier": job["tier"], "enqueued_at": job["enqueued_at"]},
+        task_id=job["job_id"],
+        queue=scheduler.queue_for(job["tier"]),
+    )
+    scheduler.dispatched(job["job_id"])
+
+
+def _dispatch_all(jobs: list[dict]) -> list[tuple[dict, Exception]]:
+    """
+    Dispatch every admitted job, each on its own: one failure doesn't drop the
+    rest. Returns the jobs that failed, with their errors — leased ones are
+    re-dispatched by scheduler.pump().
+    """
+    failed = []
+    for job in jobs:
+        try:
+            dispatch_generation(job)
+        except Exception as e:
+            logger.error("dispatch_failed job_id=%s error=%s", job["job_id"], e)
+            failed.append((job, e))
+    return failed
+
+
+@shared_task(name="pump_scheduler")
+def pump_scheduler():
+    """
+    Beat task (every scheduler.PUMP_INTERVAL seconds): admit jobs into slots
+    freed by expired leases and re-dispatch admitted jobs that never reached Celery.
+    """
+    _dispatch_all(scheduler.pump())
+
+
+@shared_task(
+    bind=True, soft_time_limit=300, max_retries=2, default_retry_delay=10,
+    name="generate_book_task",
+)
+def generate_book_task(
+    self, request_data: dict, user_data: dict, tier: str = "free", enqueued_at: float | None = None
+):
     """
     Background task to generate a book.
     - request_data: dict version of BookRequest
     - user_data: dict version of FirebaseUser
+    - tier, enqueued_at: set by the scheduler, for routing and queue-wait metrics
     """
     uid = user_data["uid"]
-    book_id = str(uuid.uuid4())
-    logger.info("task_started task_id=%s uid=%s", self.request.id, uid)
+    # Captured here: self.request is thread-local, and progress callbacks report
+    # from pool threads (asyncio.to_thread) where it is empty
+    job_id = self.request.id
+    # Keep the scheduler slot for as long as the job is running (or retrying)
+    scheduler.renew(job_id)
+    # Same book (and R2 keys) on every retry, so checkpointed pages are reused
+    book_id = checkpoint.book_id_for(job_id)
+    if self.request.retries:
+        logger.info(
+            "task_started task_id=%s uid=%s tier=%s retry=%d",
+            job_id, uid, tier, self.request.retries,
+        )
+    else:
+        queue_wait = time.time() - enqueued_at if enqueued_at else 0.0
+        metrics.observe("queue_wait_seconds", queue_wait, tier=tier)
+        logger.info(
+            "task_started task_id=%s uid=%s tier=%s queue_wait=%.1fs",
+            job_id, uid, tier, queue_wait,
+        )
 
     try:
         # Rehydrate models
@@ -34,16 +394,16 @@ def generate_book_task(self, request_data: dict, user_data: dict):
         request = BookRequest(**request_data)
         
         # ── Step 1: Content safety ─────────────────────────────────────────────
-        # Async function called synchronously via run()
+        # Async function run on this worker's persistent event loop
         full_text = f"{request.title} {request.theme}"
-        safe, reason = asyncio.run(is_content_safe(full_text))
+        safe, reason = runtime.run(is_content_safe(full_text))
         
         if not safe:
             logger.warning("content_rejected uid=%s reason=%s", uid, reason)
-            return {"status": "failed", "error": f"Content unsafe: {reason}"}
+            return _finish(self, uid, {"status": "failed", "error": f"Content unsafe: {reason}"})
 
         # ── Step 2: Plan scenes ────────────────────────────────────────────────
-        self.update_state(state="PROGRESS", meta={"progress": 10, "message": "Planning scenes..."})
+        _report(self, uid, 10, "Planning scenes...")
         scenes = plan_scenes(
             theme=request.theme,
             page_count=request.page_count,
@@ -52,71 +412,203 @@ def generate_book_task(self, request_data: dict, user_data: dict):
             character_name=request.character_name,
         )
 
-        # ── Steps 3 & 4: Generate images ───────────────────────────────────────
-        self.update_state(state="PROGRESS", meta={"progress": 20, "message": "Drawing pages..."})
-        
-        # generate_pages is async, so we run it in a new event loop
-        processed_scenes = asyncio.run(generate_pages(scenes))
-        
-        # ── Step 5: Build PDF ──────────────────────────────────────────────────
-        self.update_state(state="PROGRESS", meta={"progress": 80, "message": "Assembling book..."})
-        pdf_bytes = build_pdf(request.title, processed_scenes)
-
-        # ── Step 6: Upload to R2 ───────────────────────────────────────────────
-        self.update_state(state="PROGRESS", meta={"progress": 90, "message": "Publishing..."})
-        
-        page_results = []
-        for scene in processed_scenes:
-            page_num = scene["page_number"]
-            
-            # upload_bytes is sync (boto3)
-            image_url = upload_bytes(
-                scene["image_bytes"],
-                build_key(uid, book_id, f"page_{page_num:02d}.png"),
-                "image/png",
+        total = len(scenes)
+        if settings.generation_mode == "fanout":
+            # ── Steps 3–7 across the worker pool: a subtask per page, then assembly ─
+            # The chord inherits this job's id, so polling and the final result
+            # are unchanged for the client.
+            _report(self, uid, 20, "Drawing pages...", pages_total=total)
+            return self.replace(
+                _fanout_chord(job_id, uid, book_id, request_data, scenes, tier)
             )
-            thumbnail_url = upload_bytes(
-                scene["thumbnail_bytes"],
-                build_key(uid, book_id, f"page_{page_num:02d}_thumb.jpg"),
-                "image/jpeg",
-            )
-            page_results.append(
-                PageResult(
-                    page_number=page_num,
-                    scene_description=scene["description"],
-                    image_url=image_url,
-                    thumbnail_url=thumbnail_url,
+
+        if settings.generation_mode == "pipelined":
+            # ── Steps 3–6: Generate, publish pages and assemble, overlapped ────
+            _report(self, uid, 20, "Drawing pages...", pages_total=total)
+
+            def pages_published(pages: list[PageResult]) -> None:
+                # Finished pages go live one by one — the UI can show page 1 immediately
+                done = len(pages)
+                _report(
+                    self, uid, _page_progress(done, total), f"Drew page {done} of {total}...",
+                    pages_done=done, pages_total=total, pages=pages, job_id=job_id,
                 )
+
+            page_results, pdf_url = runtime.run(
+                _generate_pipelined(uid, book_id, request.title, scenes, pages_published, job_id)
             )
+        else:
+            # ── Steps 3 & 4: Generate images ───────────────────────────────────
+            _report(self, uid, 20, "Drawing pages...", pages_total=total)
+            drawn = 0
+            report_lock = asyncio.Lock()
 
-        pdf_url = upload_bytes(
-            pdf_bytes,
-            build_key(uid, book_id, "book.pdf"),
-            "application/pdf",
-        )
+            async def page_drawn(scene: dict) -> None:
+                # Phased mode uploads at the end, so only counts are available here
+                nonlocal drawn
+                async with report_lock:
+                    drawn += 1
+                    await asyncio.to_thread(
+                        _report, self, uid, _page_progress(drawn, total),
+                        f"Drew page {drawn} of {total}...", drawn, total, job_id=job_id,
+                    )
+
+            # generate_pages is async, so we run it on the worker's event loop
+            processed_scenes = runtime.run(generate_pages(scenes, on_page=page_drawn))
+
+            # ── Step 5-6: Build PDF & upload to R2 ─────────────────────────────
+            _report(self, uid, 80, "Assembling book...", total, total)
+            # Pages and thumbnails go up on the pooled client while the PDF is
+            # written to a temp file and streamed to R2
+            page_uploads = [
+                submit_upload(*item)
+                for scene in processed_scenes
+                for item in _page_uploads(uid, book_id, scene)
+            ]
+            try:
+                pdf_url = _publish_pdf(uid, book_id, request.title, processed_scenes)
+            except Exception:
+                # Settle the page uploads before failing (or retrying) the job
+                for future in page_uploads:
+                    future.cancel()
+                wait(page_uploads)
+                raise
+            _report(self, uid, 90, "Publishing...", total, total)
+            urls = [future.result() for future in page_uploads]
+            page_results = [
+                _page_result(scene, *urls[2 * i:2 * i + 2])
+                for i, scene in enumerate(processed_scenes)
+            ]
 
         # ── Step 7: Persist & Credit ───────────────────────────────────────────
-        book = BookResponse(
-            book_id=book_id,
-            title=request.title,
-            theme=request.theme,
-            page_count=request.page_count,
-            pages=page_results,
-            pdf_url=pdf_url,
-            created_at=now_iso(),
-            user_uid=uid,
-        )
-        save_book(book)
-        increment_usage(uid)
+        book = _persist_book(uid, book_id, request, page_results, pdf_url)
 
-        logger.info("task_complete task_id=%s book_id=%s", self.request.id, book_id)
+        logger.info("task_complete task_id=%s book_id=%s", job_id, book_id)
         
         # Return dict serialization of the result
-        return {"status": "complete", "book": book.model_dump()}
+        return _finish(self, uid, {"status": "complete", "book": book.model_dump()})
+
+    except Ignore:
+        raise  # replaced by the fan-out chord
+    except SoftTimeLimitExceeded as e:
+        logger.error("task_timeout uid=%s", uid)
+        return _retry_or_fail(self, uid, e, "Generation timed out.", job_id)
+    except Exception as e:
+        logger.exception("task_failed uid=%s", uid)
+        return _retry_or_fail(self, uid, e, str(e), job_id)
+
+
+# ── Fan-out mode ───────────────────────────────────────────────────────────────
+# Each page renders as its own render_page_task on whichever worker is free, so a
+# book's latency shrinks as workers are added instead of being fixed at
+# page_count / MAX_CONCURRENT_IMAGES waves on one worker. assemble_book_task is
+# the chord callback: it builds the PDF from the uploaded pages and saves the book.
+# Pages are checkpointed, so a retried job re-renders only the missing ones.
+
+
+def _fanout_chord(
+    job_id: str, uid: str, book_id: str, request_data: dict, scenes: list[dict], tier: str
+):
+    """Page subtasks and assembly stay on the job's tier queue."""
+    queue = scheduler.queue_for(tier)
+    header = [
+        render_page_task.s(job_id, uid, book_id, scene, len(scenes)).set(queue=queue)
+        for scene in scenes
+    ]
+    return chord(header, assemble_book_task.s(job_id, uid, book_id, request_data).set(queue=queue))
+
+
+async def _render_and_publish(uid: str, book_id: str, scene: dict) -> tuple[dict, PageResult]:
+    [processed] = await generate_pages([scene])
+    return processed, await _publish_page(uid, book_id, processed)
+
+
+def _report_fanout_pages(task, job_id: str, uid: str, entries: list[dict], total: int) -> None:
+    """Report every page of the job checkpointed so far, across all workers."""
+    pages = [PageResult(**entry["page"]) for entry in entries]
+    done = len(pages)
+    _report(
+        task, uid, _page_progress(done, total), f"Drew page {done} of {total}...",
+        pages_done=done, pages_total=total, pages=pages, job_id=job_id,
+    )
+
+
+@shared_task(
+    bind=True, soft_time_limit=180, max_retries=2, default_retry_delay=10,
+    name="render_page_task",
+)
+def render_page_task(
+    self, job_id: str, uid: str, book_id: str, scene: dict, pages_total: int
+) -> dict:
+    """
+    Fan-out subtask: generate, clean and upload one page — or reuse its checkpoint.
+    Returns the page's checkpoint entry, or {"page_number", "error"} once retries
+    are exhausted. Failures are returned rather than raised so the chord still
+    reaches assemble_book_task, which fails the job with a readable message.
+    """
+    page_number = scene["page_number"]
+    try:
+        entry = checkpoint.load(job_id, [scene]).get(page_number)
+        if entry is not None:
+            logger.info("page_restored job_id=%s page=%d", job_id, page_number)
+        else:
+            processed, page = runtime.run(_render_and_publish(uid, book_id, scene))
+            entry = _checkpoint_entry(uid, book_id, processed, page)
+    except SoftTimeLimitExceeded as e:
+        logger.error("page_timeout job_id=%s page=%d", job_id, page_number)
+        return _retry_page_or_fail(self, e, page_number, "Page generation timed out.")
+    except Exception as e:
+        logger.exception("page_failed job_id=%s page=%d", job_id, page_number)
+        return _retry_page_or_fail(self, e, page_number, str(e))
+
+    _report_fanout_pages(self, job_id, uid, checkpoint.save(job_id, entry), pages_total)
+    return entry
+
+
+def _retry_page_or_fail(task, exc: Exception, page_number: int, error: str) -> dict:
+    if _is_transient(exc) and task.request.id and task.request.retries < task.max_retries:
+        raise task.retry(exc=exc)
+    return {"page_number": page_number, "error": error}
+
+
+@shared_task(bind=True, soft_time_limit=120, name="assemble_book_task")
+def assemble_book_task(
+    self, rendered: list[dict], job_id: str, uid: str, book_id: str, request_data: dict
+) -> dict:
+    """
+    Fan-out chord callback: build the PDF from the rendered pages, upload it and
+    save the book. Runs under the original job id, so its return value is the job's result.
+    """
+    try:
+        failed = sorted((r for r in rendered if "error" in r), key=lambda r: r["page_number"])
+        if failed:
+            first = failed[0]
+            return _finish(self, uid, {
+                "status": "failed",
+                "error": f"Page {first['page_number']} failed: {first['error']}",
+            }, job_id)
+
+        request = BookRequest(**request_data)
+        rendered = sorted(rendered, key=lambda r: r["page"]["page_number"])
+        page_results = [PageResult(**r["page"]) for r in rendered]
+        total = len(page_results)
+
+        # ── Step 5: Build PDF from the uploaded print images ───────────────────
+        _report(self, uid, 80, "Assembling book...", total, total, page_results, job_id)
+        pages = _restore_images(rendered)
+
+        # ── Step 6: Upload PDF ─────────────────────────────────────────────────
+        _report(self, uid, 90, "Publishing...", total, total, page_results, job_id)
+        pdf_url = _publish_pdf(uid, book_id, request.title, pages)
+
+        # ── Step 7: Persist & Credit ───────────────────────────────────────────
+        book = _persist_book(uid, book_id, request, page_results, pdf_url)
+        logger.info("task_complete task_id=%s book_id=%s", job_id, book_id)
+        return _finish(self, uid, {"status": "complete", "book": book.model_dump()}, job_id)
 
     except SoftTimeLimitExceeded:
         logger.error("task_timeout uid=%s", uid)
-        return {"status": "failed", "error": "Generation timed out."}
+        return _finish(self, uid, {"status": "failed", "error": "Generation timed out."}, job_id)
     except Exception as e:
         logger.exception("task_failed uid=%s", uid)
-        return {"status": "failed", "error": str(e)}
+        return _finish(self, uid, {"status": "failed", "error": str(e)}, job_id)
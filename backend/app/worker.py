@@ -1,6 +1,11 @@
 import os
 from celery import Celery
+from kombu import Exchange, Queue
+from celery.signals import worker_process_init, worker_process_shutdown
+from app import runtime
 from app.config import get_settings
+from app.services import worker_metrics
+from app.services.scheduler import PUMP_INTERVAL, QUEUES
 
 settings = get_settings()
 
@@ -28,4 +33,41 @@ celery_app.conf.update(
     # Worker resiliency
     task_acks_late=True,
     worker_prefetch_multiplier=1,
+    # Generation jobs are routed per tier by app.services.scheduler, which also
+    # decides their order; workers consume every tier queue unless started with -Q
+    # (e.g. `-Q generation.premium` for capacity reserved for premium)
+    task_queues=[Queue(name, Exchange(name), routing_key=name) for name in QUEUES.values()],
+    task_default_queue=QUEUES["free"],
+    # Run `celery -A app.worker beat` alongside the workers: the scheduler pump
+    # admits jobs into slots whose lease expired and re-dispatches lost admissions
+    beat_schedule={
+        "pump-scheduler": {"task": "pump_scheduler", "schedule": float(PUMP_INTERVAL)},
+    },
 )
+
+
+# ── Per-process async runtime ─────────────────────────────────────────────────
+# Each pool process gets one long-lived event loop (see app.runtime) so clients,
+# connection pools and semaphores are reused across jobs instead of rebuilt per
+# asyncio.run() call.
+@worker_process_init.connect
+def _start_async_runtime(**_):
+    runtime.start()
+
+
+@worker_process_shutdown.connect
+def _stop_async_runtime(**_):
+    runtime.stop()
+
+
+# ── Per-process metrics export ────────────────────────────────────────────────
+# Each pool process exports its registry for the API's GET /metrics
+# (see app.services.worker_metrics).
+@worker_process_init.connect
+def _start_metrics_export(**_):
+    worker_metrics.start()
+
+
+@worker_process_shutdown.connect
+def _stop_metrics_export(**_):
+    worker_metrics.stop()
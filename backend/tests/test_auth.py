@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import firebase_admin
+import google.oauth2.id_token
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from firebase_admin import auth as firebase_auth
+from firebase_admin import credentials
+from google.auth.credentials import AnonymousCredentials
+
+from app.middleware import auth
+
+
+def _bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    calls = []
+
+    def _verify(token):
+        calls.append(token)
+        if token == "bad":
+            raise firebase_auth.InvalidIdTokenError("bad token")
+        exp = time.time() + (-1 if token == "stale" else 3600)
+        return {"uid": f"uid-{token}", "email": "a@example.com", "exp": exp}
+
+    monkeypatch.setattr(firebase_auth, "verify_id_token", _verify)
+    auth._verified_tokens.clear()
+    return calls
+
+
+async def test_verified_token_is_cached(verify_calls):
+    first = await auth.get_current_user(_bearer("tok"))
+    second = await auth.get_current_user(_bearer("tok"))
+    assert first.uid == second.uid == "uid-tok"
+    assert verify_calls == ["tok"]
+
+
+async def test_token_past_exp_is_not_cached(verify_calls):
+    await auth._verify_token("stale")
+    await auth._verify_token("stale")
+    assert verify_calls == ["stale", "stale"]
+
+
+async def test_invalid_token_is_rejected_and_not_cached(verify_calls):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            await auth.get_current_user(_bearer("bad"))
+        assert exc.value.status_code == 401
+    assert verify_calls == ["bad", "bad"]
+
+
+async def test_optional_user_shares_the_cache(verify_calls):
+    await auth.get_current_user(_bearer("tok"))
+    user = await auth.get_optional_user(_bearer("tok"))
+    assert user.uid == "uid-tok"
+    assert verify_calls == ["tok"]
+
+
+@pytest.fixture
+def firebase_app():
+    class _Anonymous(credentials.Base):
+        def get_credential(self):
+            return AnonymousCredentials()
+
+    app = firebase_admin.initialize_app(_Anonymous(), {"projectId": "demo"})
+    try:
+        yield app
+    finally:
+        firebase_admin.delete_app(app)
+
+
+def test_prefetch_fetches_signing_certificates(firebase_app, monkeypatch):
+    fetched = []
+    monkeypatch.setattr(
+        google.oauth2.id_token, "_fetch_certs", lambda request, url: fetched.append(url) or {}
+    )
+
+    auth._prefetch_certificates()
+
+    assert fetched and "securetoken" in fetched[0]
+
+
+async def test_refresher_stops_when_prefetch_is_unavailable(monkeypatch):
+    def no_app():
+        raise ValueError("The default Firebase app does not exist.")
+
+    monkeypatch.setattr(auth, "_prefetch_certificates", no_app)
+
+    await asyncio.wait_for(auth.refresh_certificates(interval=0), timeout=1)
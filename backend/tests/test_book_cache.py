@@ -0,0 +1,105 @@
+import pytest
+
+from app.models.book import BookResponse, BookSummary
+from app.services import book_cache, firebase_db
+
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    monkeypatch.setattr(book_cache, "get_redis", lambda: None)
+    monkeypatch.setattr(book_cache, "get_async_redis", lambda: None)
+    book_cache._books.clear()
+    book_cache._galleries.clear()
+
+
+@pytest.fixture
+def firestore_reads(monkeypatch):
+    reads = []
+
+    def _fetch_book(book_id):
+        reads.append(("book", book_id))
+        return {"book_id": book_id, "user_uid": "u1"}
+
+    def _list_user_books(uid, limit, cursor):
+        reads.append(("gallery", uid))
+        summary = BookSummary(
+            book_id="b1", title="T", cover_thumbnail="", page_count=6, created_at="2026"
+        )
+        return [summary], None
+
+    monkeypatch.setattr(firebase_db, "_fetch_book", _fetch_book)
+    monkeypatch.setattr(firebase_db, "list_user_books", _list_user_books)
+    return reads
+
+
+async def test_book_detail_is_read_through(firestore_reads):
+    assert (await firebase_db.get_book_async("b1", "u1"))["book_id"] == "b1"
+    assert (await firebase_db.get_book_async("b1", "u1"))["book_id"] == "b1"
+    assert firestore_reads == [("book", "b1")]
+
+
+async def test_cache_hit_still_enforces_ownership(firestore_reads):
+    await firebase_db.get_book_async("b1", "u1")
+    assert await firebase_db.get_book_async("b1", "intruder") is None
+
+
+class _FakeRedis:
+    """One store behind both the async (API) and sync (worker) clients."""
+
+    def __init__(self):
+        self.values: dict[str, bytes] = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def incr(self, key):
+                redis.values[key] = str(int(redis.values.get(key, 0)) + 1).encode()
+
+            def expire(self, key, ttl):
+                pass
+
+            def set(self, key, value, ex=None):
+                redis.values[key] = value.encode()
+
+            def execute(self):
+                pass
+
+        return Pipeline()
+
+
+def _saved_book(book_id: str) -> dict:
+    return BookResponse(
+        book_id=book_id, title="T", theme="A bunny picnic", page_count=2, pages=[],
+        pdf_url="", created_at="2026", user_uid="u1",
+    ).model_dump()
+
+
+async def test_gallery_is_not_cached_without_redis(firestore_reads):
+    # A worker's save_book can't reach this process's cache without Redis
+    await firebase_db.list_user_books_async("u1")
+    await firebase_db.list_user_books_async("u1")
+    assert firestore_reads == [("gallery", "u1"), ("gallery", "u1")]
+
+
+async def test_gallery_page_is_cached_until_a_book_is_saved(monkeypatch, firestore_reads):
+    redis = _FakeRedis()
+    monkeypatch.setattr(book_cache, "get_redis", lambda: redis)
+    monkeypatch.setattr(book_cache, "get_async_redis", lambda: redis)
+
+    await firebase_db.list_user_books_async("u1")
+    await firebase_db.list_user_books_async("u1")
+    assert firestore_reads == [("gallery", "u1")]
+
+    book_cache.book_saved(_saved_book("b2"))
+    await firebase_db.list_user_books_async("u1")
+    assert firestore_reads == [("gallery", "u1"), ("gallery", "u1")]
+    # The saved book was written through — no Firestore read for its detail page
+    assert (await firebase_db.get_book_async("b2", "u1"))["book_id"] == "b2"
+    assert ("book", "b2") not in firestore_reads
@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.middleware.auth import get_current_user
+from app.models.user import FirebaseUser
+from app.routers import books
+
+PAGE = {
+    "page_number": 1,
+    "scene_description": "A bunny picnic",
+    "image_url": "https://cdn/p1.png",
+    "thumbnail_url": "https://cdn/t1.jpg",
+}
+
+
+class _FakeResult:
+    """Stands in for celery's AsyncResult: one job, in progress with a page drawn."""
+
+    def __init__(self, job_id):
+        self.state = "PROGRESS"
+        self.status = "PROGRESS"
+        self.info = {
+            "uid": "owner", "progress": 40, "message": "Drew page 1 of 2...",
+            "pages_done": 1, "pages_total": 2, "pages": [PAGE],
+        }
+
+
+@pytest.fixture
+def status_as(monkeypatch):
+    monkeypatch.setattr(books, "AsyncResult", _FakeResult)
+
+    def get(uid: str):
+        app.dependency_overrides[get_current_user] = lambda: FirebaseUser(uid=uid)
+        with TestClient(app) as client:
+            return client.get("/api/v1/books/generate/job-1")
+
+    try:
+        yield get
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_owner_sees_partial_pages(status_as):
+    response = status_as("owner")
+
+    assert response.status_code == 200
+    assert response.json()["pages"][0]["image_url"] == PAGE["image_url"]
+
+
+def test_other_users_job_is_not_found(status_as):
+    assert status_as("someone-else").status_code == 404
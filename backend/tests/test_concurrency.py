@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+import pytest
+from redis.exceptions import RedisError
+
+from app.services import concurrency, metrics, worker_metrics
+
+
+def _gauge(metric: str, limiter: str = "test") -> float:
+    [gauge] = [
+        g for g in metrics.snapshot()["gauges"]
+        if g["name"] == metric and g["labels"] == {"limiter": limiter}
+    ]
+    return gauge["value"]
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    monkeypatch.setattr(concurrency, "get_async_redis", lambda: None)
+    metrics.reset()
+
+
+def _exported_gauge(monkeypatch, metric: str) -> float:
+    """Value of a gauge as GET /metrics sees it from this (worker) process."""
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(worker_metrics, "get_redis", lambda: redis)
+    worker_metrics.publish()
+    [snapshot] = worker_metrics.collect().values()
+    [gauge] = [
+        g for g in snapshot["gauges"]
+        if g["name"] == metric and g["labels"] == {"limiter": "test"}
+    ]
+    return gauge["value"]
+
+
+async def _run_holders(semaphore, count: int) -> int:
+    """Run `count` holders that each pause inside the slot; return peak concurrency."""
+    active = peak = 0
+
+    async def hold():
+        nonlocal active, peak
+        async with semaphore.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*[hold() for _ in range(count)])
+    return peak
+
+
+async def test_local_stand_in_caps_holders():
+    semaphore = concurrency.FleetSemaphore("test", limit=2)
+
+    assert await _run_holders(semaphore, 6) == 2
+    assert _gauge("semaphore_in_use") == 0
+
+
+async def test_gauge_reports_occupancy_while_held():
+    semaphore = concurrency.FleetSemaphore("test", limit=3)
+
+    async with semaphore.slot():
+        async with semaphore.slot():
+            assert _gauge("semaphore_in_use") == 2
+
+
+async def test_occupancy_is_exported_with_worker_metrics(monkeypatch):
+    semaphore = concurrency.FleetSemaphore("test", limit=3)
+
+    async with semaphore.slot():
+        assert _exported_gauge(monkeypatch, "semaphore_in_use") == 1
+
+
+async def test_zero_limit_disables_the_cap():
+    semaphore = concurrency.FleetSemaphore("test", limit=0)
+
+    assert await _run_holders(semaphore, 5) == 5
+
+
+async def test_redis_errors_fall_back_to_local_limit(monkeypatch):
+    class BrokenRedis:
+        def register_script(self, source):
+            async def script(keys, args):
+                raise RedisError("connection refused")
+
+            return script
+
+    monkeypatch.setattr(concurrency, "get_async_redis", BrokenRedis)
+    semaphore = concurrency.FleetSemaphore("test", limit=1)
+
+    assert await _run_holders(semaphore, 3) == 1
+
+
+# ── AIMD limiter ───────────────────────────────────────────────────────────────
+def _limiter(**overrides) -> concurrency.AIMDLimiter:
+    options = {"initial": 4, "minimum": 1, "maximum": 6, "window": 5}
+    return concurrency.AIMDLimiter("test", **{**options, **overrides})
+
+
+def test_limit_grows_by_one_per_saturated_healthy_window():
+    limiter = _limiter()
+    for _ in range(3):
+        limiter._saturated = True
+        for _ in range(5):
+            limiter.success(1.0)
+
+    # 4 → 5 → 6, then held at the maximum
+    assert limiter.limit == 6
+
+
+def test_limit_does_not_grow_when_unused():
+    limiter = _limiter()
+    for _ in range(10):
+        limiter.success(1.0)
+
+    assert limiter.limit == 4
+
+
+def test_rising_p95_halves_the_limit():
+    limiter = _limiter()
+    for _ in range(5):
+        limiter.success(1.0)  # baseline window
+    for _ in range(5):
+        limiter.success(3.0)
+
+    assert limiter.limit == 2
+
+
+def test_burst_of_overloads_cuts_once():
+    limiter = _limiter(initial=6)
+    started = time.monotonic()
+    for _ in range(4):  # calls in flight together all get throttled
+        limiter.overload(started, "429")
+
+    assert limiter.limit == 3
+    # A call started after the cut that is throttled again cuts further, down to the minimum
+    for _ in range(3):
+        limiter.overload(time.monotonic(), "429")
+    assert limiter.limit == 1
+
+
+def test_limit_is_exported_with_worker_metrics(monkeypatch):
+    limiter = _limiter(initial=6)
+    limiter.overload(time.monotonic(), "429")
+
+    assert _exported_gauge(monkeypatch, "concurrency_limit") == 3
+
+
+async def test_slot_enforces_current_limit():
+    limiter = _limiter(initial=2)
+
+    assert await _run_holders(limiter, 6) == 2
+    assert _gauge("concurrency_limit") == 2
@@ -1,4 +1,5 @@
 import pytest
+from app.services import content_filter
 from app.services.content_filter import _layer1_check
 
 
@@ -37,3 +38,70 @@ def test_blocked_drugs():
 def test_case_insensitive():
     safe, reason = _layer1_check("A scene with VIOLENCE and chaos")
     assert safe is False
+
+
+# ── Layer 2 verdict cache ─────────────────────────────────────────────────────
+
+@pytest.fixture
+def fake_layer2(monkeypatch):
+    calls = []
+
+    async def _check(text):
+        calls.append(text)
+        return (False, "scary") if "haunted" in text else (True, "")
+
+    monkeypatch.setattr(content_filter, "_layer2_check", _check)
+    if content_filter._verdicts is not None:
+        content_filter._verdicts.clear()
+    return calls
+
+
+async def test_layer2_verdict_is_cached_by_normalized_text(fake_layer2):
+    assert await content_filter.is_content_safe("A Bunny Picnic") == (True, "")
+    assert await content_filter.is_content_safe("a  bunny   picnic") == (True, "")
+    assert len(fake_layer2) == 1
+
+
+async def test_unsafe_layer2_verdict_is_cached(fake_layer2):
+    assert await content_filter.is_content_safe("A haunted house") == (False, "scary")
+    assert await content_filter.is_content_safe("A haunted house") == (False, "scary")
+    assert len(fake_layer2) == 1
+
+
+async def test_layer2_failure_is_not_cached(monkeypatch, fake_layer2):
+    async def _down(text):
+        raise ConnectionError("anthropic unreachable")
+
+    monkeypatch.setattr(content_filter, "_layer2_check", _down)
+    assert await content_filter.is_content_safe("A rainy day") == (True, "")
+    assert content_filter._verdicts.get(content_filter._verdict_key("A rainy day")) is None
+
+
+# ── Layer 1 matcher ───────────────────────────────────────────────────────────
+def test_normalize_folds_evasion_tricks():
+    assert content_filter._normalize("Vïø lence\tGμN ß") == "violencegunss"
+
+
+def test_keyword_pattern_matches_substrings_like_original_loop():
+    pattern = content_filter._keyword_pattern({"war", "warfare", "wine", "gun"})
+    assert pattern.search("asoftwarepackage").group() == "war"
+    assert pattern.search("sparklingwine").group() == "wine"
+    assert pattern.search("bunnypicnic") is None
+
+
+def test_keyword_pattern_handles_large_lists():
+    words = {f"term{i:05d}x" for i in range(5000)}
+    pattern = content_filter._keyword_pattern(words)
+    assert pattern.search("prefix-term04999x-suffix")
+    assert pattern.search("term05000x") is None
+
+
+def test_empty_keyword_pattern_never_matches():
+    assert content_filter._keyword_pattern(set()).search("anything") is None
+
+
+def test_blocklist_file_is_merged_and_normalized(tmp_path):
+    path = tmp_path / "blocklist.txt"
+    path.write_text("# extra terms\nZombie  \nscary clown  # spaces are ignored\n\n")
+    words = content_filter._load_blocklist(str(path))
+    assert {"zombie", "scaryclown", "gun"} <= words
@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.book import BookResponse
+from app.services import firebase_db, metrics
+
+
+class _FakeDB:
+    """Just enough of the Firestore client for firebase_db: documents, queries, batches."""
+
+    def __init__(self, docs: dict[str, dict]):
+        self.docs = docs
+        self.commits = []
+
+    def collection(self, name):
+        def document(doc_id):
+            path = f"{name}/{doc_id}"
+            data = self.docs.get(path)
+            snapshot = SimpleNamespace(id=doc_id, exists=data is not None, to_dict=lambda: data)
+            return SimpleNamespace(id=doc_id, path=path, get=lambda: snapshot)
+
+        rows = [d for path, d in self.docs.items() if path.startswith(f"{name}/")]
+        return _FakeQuery(rows, document)
+
+    def batch(self):
+        writes = []
+        db = self
+        return SimpleNamespace(
+            set=lambda ref, data, merge=False: writes.append((ref.path, data)),
+            commit=lambda: db.commits.append(writes),
+        )
+
+
+class _FakeQuery:
+    """where(==) / order_by(DESC) / start_after / limit over in-memory rows."""
+
+    def __init__(self, rows, document=None):
+        self.rows, self.document = rows, document
+        self._order, self._after, self._limit = [], None, None
+
+    def where(self, field, op, value):
+        return _FakeQuery([r for r in self.rows if r.get(field) == value], self.document)
+
+    def order_by(self, field, direction=None):
+        self._order.append(field)
+        return self
+
+    def start_after(self, values):
+        self._after = tuple(values[f] for f in self._order)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def stream(self):
+        rows = sorted(self.rows, key=lambda r: tuple(r[f] for f in self._order), reverse=True)
+        if self._after:
+            rows = [r for r in rows if tuple(r[f] for f in self._order) < self._after]
+        return [SimpleNamespace(to_dict=lambda r=r: r) for r in rows[: self._limit]]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = _FakeDB({
+        "books/a": {"book_id": "a", "user_uid": "u1"},
+        "books/b": {"book_id": "b", "user_uid": "someone-else"},
+        "books/c": {"book_id": "c", "user_uid": "u1"},
+    })
+    monkeypatch.setattr(firebase_db.firestore, "client", lambda: db)
+    return db
+
+
+def _book() -> BookResponse:
+    return BookResponse(
+        book_id="new", title="T", theme="A bunny picnic", page_count=2, pages=[],
+        pdf_url="https://cdn/x.pdf", created_at="2026-01-01T00:00:00+00:00", user_uid="u1",
+    )
+
+
+def test_save_book_commits_book_and_usage_in_one_batch(fake_db):
+    firebase_db.save_book(_book(), usage_day="2026-01-01")
+    assert len(fake_db.commits) == 1
+    paths = [path for path, _ in fake_db.commits[0]]
+    assert paths == ["books/new", "book_summaries/new", "usage/u1_2026-01-01"]
+
+
+def test_save_book_without_usage(fake_db):
+    firebase_db.save_book(_book())
+    assert [path for path, _ in fake_db.commits[0]] == ["books/new", "book_summaries/new"]
+
+
+def test_operations_record_latency(fake_db):
+    metrics.reset()
+    assert firebase_db.get_book("a", "u1")["book_id"] == "a"
+    assert firebase_db.get_book("b", "u1") is None  # someone else's
+    assert metrics.quantile("firestore_latency_seconds", 0.5, op="get_book") is not None
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    cursor = firebase_db.encode_cursor("2026-01-01T00:00:00+00:00", "abc")
+    assert firebase_db.decode_cursor(cursor) == ("2026-01-01T00:00:00+00:00", "abc")
+    with pytest.raises(ValueError):
+        firebase_db.decode_cursor("not-a-cursor")
+
+
+def test_list_user_books_paginates_summaries(monkeypatch):
+    summaries = {
+        f"book_summaries/{i}": {
+            "book_id": str(i), "user_uid": "u1", "title": f"Book {i}", "cover_thumbnail": "",
+            "page_count": 6, "created_at": f"2026-01-0{i}T00:00:00+00:00",
+        }
+        for i in range(1, 6)
+    }
+    other_user = {**summaries["book_summaries/5"], "book_id": "x", "user_uid": "u2"}
+    summaries["book_summaries/x"] = other_user
+    monkeypatch.setattr(firebase_db.firestore, "client", lambda: _FakeDB(summaries))
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = firebase_db.list_user_books("u1", limit=2, cursor=cursor)
+        seen += [s.book_id for s in page]
+        if cursor is None:
+            break
+    assert seen == ["5", "4", "3", "2", "1"]
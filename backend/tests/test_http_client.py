@@ -0,0 +1,63 @@
+import httpx
+import pytest
+
+from app.services.http_client import download_capped, get_http_client
+
+
+class _StreamingTransport(httpx.AsyncBaseTransport):
+    """Like httpx.MockTransport, but leaves the response body unread so streaming is real."""
+
+    def __init__(self, handler):
+        self._handler = handler
+
+    async def handle_async_request(self, request):
+        return self._handler(request)
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=_StreamingTransport(handler))
+
+
+async def test_download_returns_body():
+    async with _client(lambda request: httpx.Response(200, content=b"png-bytes")) as client:
+        assert await download_capped("https://fal.media/x.png", 100, client) == b"png-bytes"
+
+
+async def test_download_rejects_declared_oversize_without_reading():
+    pulled = []
+
+    async def body():
+        pulled.append(1)
+        yield b"x" * 10
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-length": "500"}, content=body())
+
+    async with _client(handler) as client:
+        with pytest.raises(ValueError, match="too large"):
+            await download_capped("https://fal.media/x.png", 100, client)
+    assert pulled == []
+
+
+async def test_download_stops_streaming_past_cap():
+    pulled = []
+
+    async def body():
+        for _ in range(1000):
+            pulled.append(1)
+            yield b"x" * 64
+
+    async with _client(lambda request: httpx.Response(200, content=body())) as client:
+        with pytest.raises(ValueError, match="too large"):
+            await download_capped("https://fal.media/x.png", 256, client)
+    assert len(pulled) < 10
+
+
+async def test_download_raises_on_http_error():
+    async with _client(lambda request: httpx.Response(404)) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await download_capped("https://fal.media/x.png", 100, client)
+
+
+async def test_shared_client_reused_within_loop():
+    assert get_http_client() is get_http_client()
@@ -0,0 +1,168 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.middleware.auth import get_current_user
+from app.models.user import FirebaseUser
+from app.routers import books
+from app.services import idempotency, progress
+
+REQUEST = {"title": "Dino Day", "theme": "a friendly dinosaur picnic", "page_count": 4}
+
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    monkeypatch.setattr(idempotency, "get_async_redis", lambda: None)
+    monkeypatch.setattr(progress, "get_redis", lambda: None)
+    idempotency._local.clear()
+
+
+def test_request_key_ignores_case_and_whitespace():
+    key, _ = idempotency.request_key("u1", {"title": "Dino  Day ", "theme": "Picnic"})
+
+    assert key == idempotency.request_key("u1", {"title": "dino day", "theme": "picnic"})[0]
+    assert key != idempotency.request_key("u2", {"title": "dino day", "theme": "picnic"})[0]
+
+
+def test_header_key_outranks_request_hash():
+    key, ttl = idempotency.request_key("u1", REQUEST, "client-key-1")
+
+    assert key.startswith("idem:u1:key:")
+    assert ttl == idempotency.IDEMPOTENCY_KEY_TTL
+
+
+async def test_claim_returns_holder_until_released_or_replaced():
+    assert await idempotency.claim("k", "job-1", 60, "body-1") is None
+    assert await idempotency.claim("k", "job-2", 60, "body-2") == ("job-1", "body-1")
+    # Taking over from a finished job only works while it still holds the key
+    assert await idempotency.claim("k", "job-2", 60, "body-2", replacing="job-1") is None
+    assert await idempotency.claim("k", "job-3", 60, "body-3", replacing="job-1") == (
+        "job-2", "body-2"
+    )
+
+    await idempotency.release("k", "job-2")
+    assert await idempotency.claim("k", "job-3", 60, "body-3") is None
+
+
+async def test_claim_in_redis_returns_holder_and_fingerprint(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(idempotency, "get_async_redis", lambda: redis)
+
+    assert await idempotency.claim("k", "job-1", 60, "body-1") is None
+    assert await idempotency.claim("k", "job-2", 60, "body-2") == ("job-1", "body-1")
+    assert await idempotency.claim("k", "job-2", 60, "body-2", replacing="job-1") is None
+
+    await idempotency.release("k", "job-1")  # no longer the holder
+    assert await redis.get("k") == b"job-2 body-2"
+    await idempotency.release("k", "job-2")
+    assert await redis.get("k") is None
+
+
+class _FakeResult:
+    """Stands in for celery's AsyncResult: every job is still queued or finished."""
+
+    finished: set[str] = set()
+
+    def __init__(self, job_id):
+        done = job_id in self.finished
+        self.state = self.status = "SUCCESS" if done else "PENDING"
+        self.result = {"status": "failed", "error": "boom"} if done else None
+
+
+@pytest.fixture
+def limit_reached(monkeypatch):
+    """Whether check_rate_limit refuses new jobs."""
+    reached = {"value": False}
+
+    async def check_rate_limit(user):
+        if reached["value"]:
+            raise HTTPException(status_code=429, detail="Daily limit reached.")
+        return user
+
+    monkeypatch.setattr(books, "check_rate_limit", check_rate_limit)
+    return reached
+
+
+@pytest.fixture
+def client(monkeypatch, limit_reached):
+    submitted = []
+    monkeypatch.setattr(
+        books, "submit_generation",
+        lambda request_data, user_data, job_id: submitted.append(job_id) or job_id,
+    )
+    monkeypatch.setattr(books, "AsyncResult", _FakeResult)
+    _FakeResult.finished = set()
+    app.dependency_overrides[get_current_user] = lambda: FirebaseUser(uid="u1")
+    try:
+        with TestClient(app) as test_client:
+            yield test_client, submitted
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_duplicate_request_returns_running_job(client):
+    test_client, submitted = client
+
+    first = test_client.post("/api/v1/books/generate", json=REQUEST).json()
+    second = test_client.post("/api/v1/books/generate", json=REQUEST).json()
+
+    assert second["job_id"] == first["job_id"]
+    assert submitted == [first["job_id"]]
+
+
+def test_same_request_after_finished_job_starts_new_one(client):
+    test_client, submitted = client
+
+    first = test_client.post("/api/v1/books/generate", json=REQUEST).json()
+    _FakeResult.finished.add(first["job_id"])
+    second = test_client.post("/api/v1/books/generate", json=REQUEST).json()
+
+    assert second["job_id"] != first["job_id"]
+    assert len(submitted) == 2
+
+
+def test_idempotency_key_returns_same_job_even_when_finished(client):
+    test_client, submitted = client
+    headers = {"Idempotency-Key": "retry-safe-1"}
+
+    first = test_client.post("/api/v1/books/generate", json=REQUEST, headers=headers).json()
+    _FakeResult.finished.add(first["job_id"])
+    second = test_client.post("/api/v1/books/generate", json=REQUEST, headers=headers).json()
+
+    assert second["job_id"] == first["job_id"]
+    assert second["status"] == "failed"
+    assert submitted == [first["job_id"]]
+
+
+def test_idempotency_key_reused_for_another_request_is_rejected(client):
+    test_client, submitted = client
+    headers = {"Idempotency-Key": "retry-safe-1"}
+
+    first = test_client.post("/api/v1/books/generate", json=REQUEST, headers=headers)
+    other = {**REQUEST, "title": "Space Cats"}
+    second = test_client.post("/api/v1/books/generate", json=other, headers=headers)
+
+    assert first.status_code == 202
+    assert second.status_code == 422
+    assert submitted == [first.json()["job_id"]]
+
+
+def test_resubmission_is_answered_after_the_limit_is_reached(client, limit_reached):
+    test_client, submitted = client
+    headers = {"Idempotency-Key": "retry-safe-1"}
+
+    first = test_client.post("/api/v1/books/generate", json=REQUEST, headers=headers).json()
+    limit_reached["value"] = True
+    retry = test_client.post("/api/v1/books/generate", json=REQUEST, headers=headers)
+    new = test_client.post("/api/v1/books/generate", json={**REQUEST, "title": "Space Cats"})
+
+    assert retry.status_code == 202
+    assert retry.json()["job_id"] == first["job_id"]
+    assert new.status_code == 429
+    assert submitted == [first["job_id"]]
+    # The refused request's key was released, so it can be retried tomorrow
+    limit_reached["value"] = False
+    again = test_client.post("/api/v1/books/generate", json={**REQUEST, "title": "Space Cats"})
+    assert again.status_code == 202
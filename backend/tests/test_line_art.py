@@ -0,0 +1,51 @@
+import io
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.constants import LETTER_HEIGHT_PX, LETTER_WIDTH_PX
+from app.services.line_art import clean_line_art
+
+
+def _sample_png(mode: str = "RGB") -> bytes:
+    img = Image.new(mode, (192, 256), "white")
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((20, 30, 170, 220), outline="black", width=3)
+    img = img.filter(ImageFilter.GaussianBlur(1))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_clean_line_art_print_size():
+    img = Image.open(io.BytesIO(clean_line_art(_sample_png())))
+    assert img.size == (LETTER_WIDTH_PX, LETTER_HEIGHT_PX)
+    assert round(img.info["dpi"][0]) == 300
+
+
+def test_clean_line_art_single_channel():
+    img = Image.open(io.BytesIO(clean_line_art(_sample_png())))
+    assert len(img.getbands()) == 1
+
+
+def test_clean_line_art_is_pure_black_and_white():
+    img = Image.open(io.BytesIO(clean_line_art(_sample_png()))).convert("L")
+    levels = {value for value, count in enumerate(img.histogram()) if count}
+    assert levels == {0, 255}
+
+
+def test_clean_line_art_accepts_grayscale_input():
+    img = Image.open(io.BytesIO(clean_line_art(_sample_png("L"))))
+    assert img.size == (LETTER_WIDTH_PX, LETTER_HEIGHT_PX)
+
+
+def test_clean_line_art_png_is_one_bit():
+    img = Image.open(io.BytesIO(clean_line_art(_sample_png(), "png")))
+    assert img.format == "PNG"
+    assert img.mode == "1"
+
+
+def test_clean_line_art_g4_tiff():
+    img = Image.open(io.BytesIO(clean_line_art(_sample_png(), "g4")))
+    assert img.format == "TIFF"
+    assert img.info["compression"] == "group4"
+    assert img.size == (LETTER_WIDTH_PX, LETTER_HEIGHT_PX)
@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.services import metrics, worker_metrics
+
+
+@pytest.fixture
+def client():
+    metrics.reset()
+    return TestClient(main.app)
+
+
+def test_metrics_endpoint_is_off_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "metrics_token", "")
+
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_endpoint_requires_the_bearer_token(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "metrics_token", "scrape-secret")
+    metrics.incr("generate_deduplicated", source="header")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    counter = {"name": "generate_deduplicated", "labels": {"source": "header"}, "value": 1}
+    assert counter in response.json()["counters"]
+
+
+def test_metrics_endpoint_includes_worker_processes(client, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(worker_metrics, "get_redis", lambda: redis)
+    monkeypatch.setattr(main.settings, "metrics_token", "scrape-secret")
+    # A worker process exports its registry...
+    metrics.observe("queue_wait_seconds", 4.0, tier="premium")
+    worker_metrics.publish()
+    metrics.reset()
+    # ...and a process that stopped exporting drops out
+    redis.sadd("metrics:workers", "gone:1")
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+
+    [(process, snapshot)] = response.json()["workers"].items()
+    assert process == worker_metrics._process_id()
+    [histogram] = snapshot["histograms"]
+    assert histogram["name"] == "queue_wait_seconds"
+    assert histogram["labels"] == {"tier": "premium"}
+    assert redis.smembers("metrics:workers") == {process.encode()}
@@ -0,0 +1,41 @@
+import io
+import zlib
+
+from PIL import Image, ImageDraw
+
+from app.services.pdf_images import encode_image_xobject
+
+
+def _bilevel(fmt: str, **save_args) -> bytes:
+    img = Image.new("1", (300, 200), 1)
+    ImageDraw.Draw(img).rectangle((0, 0, 99, 199), fill=0)
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **save_args)
+    return buf.getvalue()
+
+
+def test_one_bit_png_passes_through_with_predictor():
+    entries, stream = encode_image_xobject(_bilevel("PNG"))
+    assert entries["/BitsPerComponent"] == "1"
+    assert entries["/ColorSpace"] == "/DeviceGray"
+    assert "/Predictor 15" in entries["/DecodeParms"]
+    # One filter-type byte plus ceil(300 / 8) packed bytes per row
+    assert len(zlib.decompress(stream)) == 200 * (1 + 38)
+
+
+def test_g4_tiff_passes_through_as_ccitt():
+    data = _bilevel("TIFF", compression="group4")
+    entries, stream = encode_image_xobject(data)
+    assert entries["/Filter"] == "/CCITTFaxDecode"
+    assert entries["/BitsPerComponent"] == "1"
+    assert "/K -1" in entries["/DecodeParms"]
+    assert stream in data
+
+
+def test_jpeg_falls_back_to_decoded_rgb():
+    img = Image.new("RGB", (40, 30), "white")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG")
+    entries, stream = encode_image_xobject(buf.getvalue())
+    assert entries["/ColorSpace"] == "/DeviceRGB"
+    assert len(zlib.decompress(stream)) == 40 * 30 * 3
@@ -0,0 +1,53 @@
+import io
+import re
+
+from PIL import Image
+
+from app.services.line_art import clean_line_art
+from app.services.pdf_builder import build_pdf, write_pdf
+
+
+def _page(page_number: int, page_format: str = "png") -> dict:
+    buf = io.BytesIO()
+    Image.new("L", (96, 128), 255).save(buf, format="PNG")
+    return {
+        "page_number": page_number,
+        "description": f"Page {page_number}",
+        "image_bytes": clean_line_art(buf.getvalue(), page_format),
+        "image_format": page_format,
+    }
+
+
+def _xref_offsets(pdf: bytes) -> dict[int, int]:
+    start = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    header, *rows = pdf[start:].split(b"trailer")[0].strip().split(b"\n")[1:]
+    first, _ = map(int, header.split())
+    return {first + i: int(row[:10]) for i, row in enumerate(rows) if row.endswith(b"n ")}
+
+
+def test_native_pdf_has_cover_plus_pages():
+    pdf = build_pdf("Luna's Adventure", [_page(1), _page(2, "g4")], backend="native")
+    assert pdf.startswith(b"%PDF-1.4")
+    assert pdf.rstrip().endswith(b"%%EOF")
+    assert b"/Count 3" in pdf
+
+
+def test_native_pdf_xref_points_at_objects():
+    pdf = build_pdf("Test Book", [_page(1), _page(2)], backend="native")
+    for obj_id, offset in _xref_offsets(pdf).items():
+        assert pdf[offset:].startswith(f"{obj_id} 0 obj".encode())
+
+
+def test_native_pdf_keeps_pages_one_bit():
+    pdf = build_pdf("Test Book", [_page(1), _page(2, "g4")], backend="native")
+    assert pdf.count(b"/BitsPerComponent 1") >= 2
+    assert b"/CCITTFaxDecode" in pdf
+
+
+def test_write_pdf_streams_from_file_handles():
+    page = _page(1)
+    page["image_file"] = io.BytesIO(page.pop("image_bytes"))
+    out = io.BytesIO()
+    size = write_pdf("Test Book", [page], out)
+    assert size == len(out.getvalue())
+    assert b"/Count 2" in out.getvalue()
@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.middleware.auth import get_current_user
+from app.models.user import FirebaseUser
+from app.services import progress
+
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    monkeypatch.setattr(progress, "get_redis", lambda: None)
+    monkeypatch.setattr(progress, "get_async_redis", lambda: None)
+    progress._local_last.clear()
+    progress._local_subscribers.clear()
+
+
+def _event(job_id: str, status: str, percent: int) -> dict:
+    return {"job_id": job_id, "status": status, "progress": percent, "message": status}
+
+
+async def _collect(uid: str, job_ids: set[str] | None, count: int | None = None) -> list[dict]:
+    events = []
+    async for event in progress.subscribe(uid, job_ids, heartbeat=0.05):
+        if event is not None:
+            events.append(event)
+        if count is not None and len(events) == count:
+            break
+    return events
+
+
+async def _drain(stream) -> list[dict]:
+    return [event async for event in stream if event is not None]
+
+
+async def test_stream_starts_from_snapshot_and_ends_when_jobs_finish():
+    progress.publish("u1", _event("job-1", "generating", 20))
+    consumer = asyncio.create_task(_collect("u1", {"job-1", "job-2"}))
+    await asyncio.sleep(0.01)
+
+    progress.publish("u2", _event("job-1", "complete", 100))  # someone else's job
+    progress.publish("u1", _event("job-2", "failed", 0))
+    progress.publish("u1", _event("job-1", "complete", 100))
+
+    events = await asyncio.wait_for(consumer, 1)
+    assert [(e["job_id"], e["status"]) for e in events] == [
+        ("job-1", "generating"),
+        ("job-2", "failed"),
+        ("job-1", "complete"),
+    ]
+    assert all("uid" not in e for e in events)
+
+
+async def test_stream_without_job_filter_multiplexes_all_user_jobs():
+    consumer = asyncio.create_task(_collect("u1", None, count=2))
+    await asyncio.sleep(0.01)
+    progress.publish("u1", _event("job-a", "generating", 10))
+    progress.publish("u1", _event("job-b", "generating", 10))
+    events = await asyncio.wait_for(consumer, 1)
+    assert {e["job_id"] for e in events} == {"job-a", "job-b"}
+
+
+async def test_unknown_job_is_dropped_after_grace():
+    progress.publish("u1", _event("job-1", "generating", 20))
+    stream = progress.subscribe("u1", {"job-1", "expired"}, heartbeat=0.05, unknown_grace=0.1)
+    consumer = asyncio.create_task(_drain(stream))
+    await asyncio.sleep(0.2)  # past the grace: only job-1 keeps the stream open
+    assert not consumer.done()
+
+    progress.publish("u1", _event("job-1", "complete", 100))
+    events = await asyncio.wait_for(consumer, 1)
+    assert [(e["job_id"], e["status"]) for e in events] == [
+        ("job-1", "generating"), ("job-1", "complete"),
+    ]
+
+
+async def test_stream_of_only_unknown_jobs_closes():
+    stream = progress.subscribe("u1", {"never-submitted"}, heartbeat=0.05, unknown_grace=0.1)
+    assert await asyncio.wait_for(_drain(stream), 1) == []
+
+
+async def test_open_ended_stream_closes_after_its_lifetime():
+    stream = progress.subscribe("u1", None, heartbeat=0.05, lifetime=0.1)
+    assert await asyncio.wait_for(_drain(stream), 1) == []
+
+
+def test_sse_endpoint_streams_progress_events():
+    progress.publish("u1", _event("job-1", "complete", 100))
+    app.dependency_overrides[get_current_user] = lambda: FirebaseUser(uid="u1")
+    try:
+        with TestClient(app) as client:
+            response = client.get("/api/v1/books/generate/events", params={"jobs": "job-1"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    data_lines = [line for line in response.text.splitlines() if line.startswith("data: ")]
+    assert json.loads(data_lines[0][len("data: "):])["status"] == "complete"
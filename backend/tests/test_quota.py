@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import quota
+
+
+@pytest.fixture
+def no_redis(monkeypatch):
+    monkeypatch.setattr(quota, "get_redis", lambda: None)
+    monkeypatch.setattr(quota, "get_async_redis", lambda: None)
+    quota._tier_cache.clear()
+
+
+def test_next_midnight_is_start_of_next_utc_day():
+    now = datetime(2026, 3, 31, 23, 59, 59, tzinfo=timezone.utc)
+    midnight = datetime.fromtimestamp(quota.next_midnight(now), timezone.utc)
+    assert midnight == datetime(2026, 4, 1, tzinfo=timezone.utc)
+
+
+def test_daily_limit_by_tier():
+    assert quota.daily_limit("premium") == quota.settings.premium_daily_limit
+    assert quota.daily_limit("free") == quota.settings.free_daily_limit
+    assert quota.daily_limit("unknown") == quota.settings.free_daily_limit
+
+
+async def test_tier_is_cached_in_process(monkeypatch, no_redis):
+    reads = []
+    monkeypatch.setattr(quota, "_read_tier", lambda uid: reads.append(uid) or "premium")
+    assert await quota.get_tier("u1") == "premium"
+    assert await quota.get_tier("u1") == "premium"
+    assert reads == ["u1"]
+
+
+async def test_usage_falls_back_to_firestore_without_redis(monkeypatch, no_redis):
+    monkeypatch.setattr(quota, "_read_usage", lambda uid, day: 3)
+    assert await quota.get_usage("u1") == 3
+
+
+def test_usage_increment_write_charges_one_slot(monkeypatch):
+    monkeypatch.setattr(quota, "_usage_doc", lambda uid, day: f"usage/{uid}_{day}")
+
+    ref, fields = quota.usage_increment_write("u1", "2026-03-31")
+
+    assert ref == "usage/u1_2026-03-31"
+    assert (fields["uid"], fields["date"]) == ("u1", "2026-03-31")
+    assert isinstance(fields["count"], quota.firestore.Increment)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(quota, "get_redis", lambda: client)
+    monkeypatch.setattr(quota, "get_async_redis", lambda: fakeredis.FakeAsyncRedis(server=server))
+    return client
+
+
+async def test_stale_seed_does_not_lower_the_counter(monkeypatch, redis):
+    day = quota.today_key()
+    reads = []
+
+    def read_usage(uid, day):
+        reads.append(uid)
+        if len(reads) == 1:
+            # While this check's Firestore read is in flight, a book is charged:
+            # Firestore now says 3, and the worker mirrors it into Redis
+            quota.record_persisted_usage(uid, day)
+            return 2
+        return 3
+
+    monkeypatch.setattr(quota, "_read_usage", read_usage)
+
+    assert await quota.get_usage("u1") == 3
+    assert int(redis.get(f"usage:u1:{day}")) == 3
+
+
+async def test_charged_books_increment_a_seeded_counter(monkeypatch, redis):
+    monkeypatch.setattr(quota, "_read_usage", lambda uid, day: 1)
+    assert await quota.get_usage("u1") == 1
+
+    quota.record_persisted_usage("u1", quota.today_key())
+
+    assert await quota.get_usage("u1") == 2
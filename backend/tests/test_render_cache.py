@@ -0,0 +1,76 @@
+import asyncio
+import os
+
+from app.services import image_gen, single_flight
+from app.services.render_cache import DiskLRU, RenderCache, render_key
+
+
+def test_render_key_is_stable_and_order_independent():
+    a = render_key("fal-ai/flux/dev", "a bunny", {"steps": 28, "guidance": 3.5}, 7)
+    b = render_key("fal-ai/flux/dev", "a bunny", {"guidance": 3.5, "steps": 28}, 7)
+    assert a == b
+
+
+def test_render_key_changes_with_inputs():
+    base = render_key("fal-ai/flux/dev", "a bunny", {"steps": 28}, None)
+    assert base != render_key("fal-ai/flux/dev", "a bunny", {"steps": 28}, 1)
+    assert base != render_key("fal-ai/flux/dev", "a kitten", {"steps": 28}, None)
+    assert base != render_key("fal-ai/flux/schnell", "a bunny", {"steps": 28}, None)
+
+
+def test_disk_lru_round_trip(tmp_path):
+    disk = DiskLRU(tmp_path, max_bytes=1024)
+    disk.put("ab" * 32, b"render")
+    assert disk.get("ab" * 32) == b"render"
+    assert disk.get("cd" * 32) is None
+
+
+def test_disk_lru_evicts_least_recently_used(tmp_path):
+    disk = DiskLRU(tmp_path, max_bytes=350)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    for i, key in enumerate(keys):
+        disk.put(key, b"x" * 100)
+        os.utime(disk._path(key), (i, i))  # deterministic recency
+    disk.get(keys[0])  # touch the oldest so it survives
+    disk.put("ff" * 32, b"x" * 100)
+    assert disk.get(keys[0]) is not None
+    assert disk.get(keys[1]) is None
+
+
+def test_disk_lru_recovers_size_from_existing_files(tmp_path):
+    DiskLRU(tmp_path, max_bytes=1024).put("ab" * 32, b"x" * 100)
+    assert DiskLRU(tmp_path, max_bytes=1024)._size == 100
+
+
+async def test_render_cache_disk_only(tmp_path):
+    cache = RenderCache(DiskLRU(tmp_path, max_bytes=1024), redis_ttl=0)
+    assert await cache.get("ab" * 32) is None
+    await cache.put("ab" * 32, b"render")
+    assert await cache.get("ab" * 32) == b"render"
+
+
+async def test_identical_renders_generate_and_cache_once(tmp_path, monkeypatch):
+    cache = RenderCache(DiskLRU(tmp_path, max_bytes=1024), redis_ttl=0)
+    puts, generated = [], []
+    real_put = cache.put
+
+    async def counting_put(key, data):
+        puts.append(key)
+        await real_put(key, data)
+
+    async def fake_generate_single(prompt, seed=None):
+        generated.append(prompt)
+        await asyncio.sleep(0.02)
+        return b"render"
+
+    monkeypatch.setattr(cache, "put", counting_put)
+    monkeypatch.setattr(image_gen, "get_render_cache", lambda: cache)
+    monkeypatch.setattr(image_gen, "_generate_single", fake_generate_single)
+    monkeypatch.setattr(single_flight, "get_async_redis", lambda: None)
+    scene = {"page_number": 1, "image_prompt": "a bunny picnic"}
+
+    results = await asyncio.gather(*[image_gen._render(scene) for _ in range(4)])
+
+    assert results == [b"render"] * 4
+    assert len(generated) == 1
+    assert len(puts) == 1
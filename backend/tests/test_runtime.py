@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app import runtime
+
+
+async def _current_loop():
+    return asyncio.get_running_loop()
+
+
+def test_run_returns_result():
+    async def add(a, b):
+        await asyncio.sleep(0)
+        return a + b
+
+    assert runtime.run(add(2, 3)) == 5
+
+
+def test_loop_persists_across_runs():
+    assert runtime.run(_current_loop()) is runtime.run(_current_loop())
+
+
+def test_semaphore_reused_across_runs():
+    semaphore = asyncio.Semaphore(1)
+
+    async def hold():
+        async with semaphore:
+            await asyncio.sleep(0.01)
+
+    async def contend():
+        await asyncio.gather(hold(), hold())
+
+    runtime.run(contend())
+    runtime.run(contend())  # would fail if bound to a different loop
+
+
+def test_exceptions_propagate():
+    async def boom():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        runtime.run(boom())
+
+
+def test_timeout_cancels_coroutine():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        runtime.run(slow(), timeout=0.05)
+    runtime.run(asyncio.wait_for(cancelled.wait(), 1))
@@ -0,0 +1,186 @@
+import pytest
+
+from app import tasks
+from app.services import scheduler
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    monkeypatch.setattr(scheduler, "get_redis", lambda: None)
+
+
+def test_queue_for_routes_by_tier():
+    assert scheduler.queue_for("premium") == "generation.premium"
+    assert scheduler.queue_for("free") == "generation.free"
+    # Unknown or missing tiers are treated as free
+    assert scheduler.queue_for("enterprise") == "generation.free"
+    assert scheduler.queue_for(None) == "generation.free"
+
+
+def test_submit_without_redis_admits_immediately():
+    job = {"job_id": "j1", "uid": "u1", "tier": "gold"}
+
+    assert scheduler.submit(job) == [{"job_id": "j1", "uid": "u1", "tier": "free"}]
+    assert scheduler.release("j1") == []
+
+
+def test_submit_generation_dispatches_to_tier_queue(monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        tasks.generate_book_task, "apply_async", lambda **options: sent.append(options)
+    )
+
+    job_id = tasks.submit_generation({"title": "Dino Day"}, {"uid": "u1", "tier": "premium"})
+
+    [options] = sent
+    assert options["task_id"] == job_id
+    assert options["queue"] == "generation.premium"
+    assert options["args"] == [{"title": "Dino Day"}, {"uid": "u1", "tier": "premium"}]
+    assert options["kwargs"]["tier"] == "premium"
+    assert options["kwargs"]["enqueued_at"] > 0
+
+
+def test_finished_job_dispatches_the_jobs_admitted_in_its_place(monkeypatch):
+    admitted = {"job_id": "j2", "uid": "u2", "tier": "free", "enqueued_at": 1.0, "args": []}
+    dispatched = []
+    monkeypatch.setattr(tasks.progress, "publish", lambda uid, event: None)
+    monkeypatch.setattr(scheduler, "release", lambda job_id: [admitted] if job_id == "j1" else [])
+    monkeypatch.setattr(tasks, "dispatch_generation", dispatched.append)
+
+    tasks._finish(tasks.generate_book_task, "u1", {"status": "failed", "error": "x"}, "j1")
+
+    assert dispatched == [admitted]
+
+
+# ── Admission order, against the real Lua scripts ──────────────────────────────
+@pytest.fixture
+def redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(scheduler, "get_redis", lambda: client)
+    return client
+
+
+def _job(job_id, uid, tier="free"):
+    return {"job_id": job_id, "uid": uid, "tier": tier}
+
+
+def _admitted(jobs):
+    return [job["job_id"] for job in jobs]
+
+
+def test_submit_admits_while_slots_are_free(redis, monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "generation_concurrency", 1)
+
+    [admitted] = scheduler.submit(_job("a1", "alice"))
+    assert admitted == {**_job("a1", "alice"), "leased": True}
+    assert scheduler.submit(_job("a2", "alice")) == []
+    # Finishing a1 frees its slot for a2
+    assert _admitted(scheduler.release("a1")) == ["a2"]
+
+
+def test_users_take_turns_within_a_tier(redis, monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "generation_concurrency", 0)
+    for job in [_job("a1", "alice"), _job("a2", "alice"), _job("a3", "alice"),
+                _job("b1", "bob"), _job("c1", "carol"), _job("b2", "bob")]:
+        assert scheduler.submit(job) == []
+
+    monkeypatch.setattr(scheduler.settings, "generation_concurrency", 6)
+    # Alice's burst doesn't hold back Bob and Carol; each user's jobs stay in order
+    assert _admitted(scheduler.pump()) == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_tiers_are_weighted_three_to_one(redis, monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "generation_concurrency", 0)
+    for n in range(8):
+        scheduler.submit(_job(f"p{n}", f"premium-{n}", "premium"))
+        scheduler.submit(_job(f"f{n}", f"free-{n}"))
+
+    monkeypatch.setattr(scheduler.settings, "generation_concurrency", 8)
+    assert _admitted(scheduler.pump()) == ["p0", "p1", "f0", "p2", "p3", "p4", "f1", "p5"]
+
+
+def test_expired_leases_free_their_slots(redis, monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "generation_concurrency", 1)
+    scheduler.submit(_job("a1", "alice"))
+    scheduler.submit(_job("b1", "bob"))
+    assert scheduler.pump() == []
+
+    # a1's worker died: nothing renews its lease
+    redis.zadd("sched:inflight", {"a1": 0})
+    assert _admitted(scheduler.pump()) == ["b1"]
+
+
+def test_renew_only_extends_running_jobs(redis):
+    scheduler.submit(_job("a1", "alice"))
+    redis.zadd("sched:inflight", {"a1": 0})
+
+    scheduler.renew("a1")
+    scheduler.renew("gone")
+
+    assert redis.zscore("sched:inflight", "a1") > 0
+    assert redis.zscore("sched:inflight", "gone") is None
+
+
+def test_pump_failure_leaves_the_job_queued(redis, monkeypatch):
+    def unavailable(client):
+        raise scheduler.RedisError("connection reset")
+
+    monkeypatch.setattr(scheduler, "_pump", unavailable)
+    # Queued, so not admitted a second time outside the scheduler
+    assert scheduler.submit(_job("a1", "alice")) == []
+
+    monkeypatch.undo()
+    monkeypatch.setattr(scheduler, "get_redis", lambda: redis)
+    assert _admitted(scheduler.pump()) == ["a1"]
+
+
+def test_enqueue_failure_admits_the_job_unleased(monkeypatch):
+    class Down:
+        def register_script(self, script):
+            def call(**_):
+                raise scheduler.RedisError("connection refused")
+            return call
+
+    monkeypatch.setattr(scheduler, "get_redis", lambda: Down())
+
+    assert scheduler.submit(_job("a1", "alice")) == [_job("a1", "alice")]
+
+
+def test_pump_redispatches_admissions_never_confirmed(redis, monkeypatch):
+    [first, second] = [_job("a1", "alice"), _job("b1", "bob")]
+    scheduler.submit(first)
+    scheduler.submit(second)
+    scheduler.dispatched("b1")
+    # Within the grace period a dispatch may still be on its way
+    assert scheduler.pump() == []
+
+    monkeypatch.setattr(scheduler, "DISPATCH_GRACE_SECONDS", -1)
+    assert scheduler.pump() == [{**first, "leased": True}]
+    # Finished jobs are forgotten
+    scheduler.release("a1")
+    assert scheduler.pump() == []
+
+
+def test_one_failed_dispatch_does_not_drop_the_others(redis, monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "generation_concurrency", 0)
+    for job in [_job("a1", "alice"), _job("b1", "bob")]:
+        scheduler.submit({**job, "enqueued_at": 1.0, "args": [{}, {"uid": job["uid"]}]})
+    monkeypatch.setattr(scheduler.settings, "generation_concurrency", 8)
+    sent = []
+
+    def apply_async(**options):
+        if options["task_id"] == "a1":
+            raise ConnectionError("broker unavailable")
+        sent.append(options["task_id"])
+
+    monkeypatch.setattr(tasks.generate_book_task, "apply_async", apply_async)
+
+    # The submitted job was leased, so the caller still gets its id
+    job_id = tasks.submit_generation({}, {"uid": "carol", "tier": "free"}, job_id="c1")
+
+    assert job_id == "c1"
+    assert sent == ["b1", "c1"]
+    # a1 stays admitted-but-undispatched until pump_scheduler retries it
+    assert redis.hexists("sched:admitted", "a1")
+    assert not redis.hexists("sched:admitted", "b1")
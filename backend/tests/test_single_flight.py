@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from app.services import single_flight
+from app.services.single_flight import SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    monkeypatch.setattr(single_flight, "get_async_redis", lambda: None)
+
+
+def _counting_call(result: bytes = b"png", delay: float = 0.02):
+    calls = []
+
+    async def call() -> bytes:
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+
+    return call, calls
+
+
+async def test_concurrent_identical_keys_share_one_call():
+    flight = SingleFlight("test")
+    call, calls = _counting_call()
+
+    results = await asyncio.gather(*[flight.do("k", call) for _ in range(5)])
+
+    assert results == [b"png"] * 5
+    assert len(calls) == 1
+
+
+async def test_different_keys_and_later_calls_are_not_coalesced():
+    flight = SingleFlight("test")
+    call, calls = _counting_call()
+
+    await asyncio.gather(flight.do("a", call), flight.do("b", call))
+    await flight.do("a", call)
+
+    assert len(calls) == 3
+
+
+async def test_failure_reaches_every_waiter_and_is_not_remembered():
+    flight = SingleFlight("test")
+
+    async def failing() -> bytes:
+        await asyncio.sleep(0.01)
+        raise TimeoutError("fal.ai timed out")
+
+    results = await asyncio.gather(
+        *[flight.do("k", failing) for _ in range(3)], return_exceptions=True
+    )
+    assert all(isinstance(r, TimeoutError) for r in results)
+
+    call, _ = _counting_call(b"retry")
+    assert await flight.do("k", call) == b"retry"
+
+
+async def test_waiter_takes_over_when_leader_is_cancelled():
+    flight = SingleFlight("test")
+    call, calls = _counting_call(delay=0.05)
+
+    leader = asyncio.create_task(flight.do("k", call))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("k", call))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == b"png"
+    assert len(calls) == 2
+
+
+class _FakeRedis:
+    """Just enough of redis.asyncio for SingleFlight — shared by two 'workers'."""
+
+    def __init__(self):
+        self.values: dict[str, bytes] = {}
+        self.channels: dict[str, list[asyncio.Queue]] = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def exists(self, key):
+        return int(key in self.values)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.values.get(key) == token.encode():
+            del self.values[key]
+
+    async def publish(self, channel, message):
+        for queue in self.channels.get(channel, []):
+            queue.put_nowait({"data": message})
+
+    def pipeline(self, transaction=True):
+        redis, ops = self, []
+
+        class Pipeline:
+            def set(self, *args, **kwargs):
+                ops.append(redis.set(*args, **kwargs))
+
+            def publish(self, *args):
+                ops.append(redis.publish(*args))
+
+            async def execute(self):
+                return [await op for op in ops]
+
+        return Pipeline()
+
+    def pubsub(self):
+        redis, queue = self, asyncio.Queue()
+
+        class PubSub:
+            async def subscribe(self, channel):
+                redis.channels.setdefault(channel, []).append(queue)
+
+            async def get_message(self, ignore_subscribe_messages, timeout):
+                try:
+                    return await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+
+            async def aclose(self):
+                pass
+
+        return PubSub()
+
+
+async def test_workers_share_one_call_through_redis(monkeypatch):
+    redis = _FakeRedis()
+    monkeypatch.setattr(single_flight, "get_async_redis", lambda: redis)
+    worker_a, worker_b = SingleFlight("test"), SingleFlight("test")
+    call, calls = _counting_call(delay=0.05)
+
+    results = await asyncio.gather(worker_a.do("k", call), worker_b.do("k", call))
+
+    assert results == [b"png", b"png"]
+    assert len(calls) == 1
+    assert "sf:lock:test:k" not in redis.values  # leader released its lock
+
+
+async def test_follower_runs_call_itself_when_leader_fails(monkeypatch):
+    redis = _FakeRedis()
+    monkeypatch.setattr(single_flight, "get_async_redis", lambda: redis)
+    worker_a, worker_b = SingleFlight("test"), SingleFlight("test")
+
+    async def failing() -> bytes:
+        await asyncio.sleep(0.02)
+        raise TimeoutError("fal.ai timed out")
+
+    call, calls = _counting_call()
+    leader = asyncio.create_task(worker_a.do("k", failing))
+    await asyncio.sleep(0)
+
+    assert await worker_b.do("k", call) == b"png"
+    assert len(calls) == 1
+    with pytest.raises(TimeoutError):
+        await leader
@@ -0,0 +1,48 @@
+import io
+
+import pytest
+
+from app.services import storage
+
+
+class _FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def put_object(self, **kwargs):
+        self.calls.append(("put_object", kwargs))
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self.calls.append(("upload_fileobj", {
+            "body": fileobj.read(), "Key": key, "ExtraArgs": ExtraArgs, "Config": Config,
+        }))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = _FakeClient()
+    monkeypatch.setattr(storage, "_get_client", lambda: fake)
+    monkeypatch.setattr(storage.settings, "r2_public_url", "https://cdn")
+    return fake
+
+
+def test_file_objects_stream_through_multipart_transfer(client):
+    url = storage.submit_upload(io.BytesIO(b"%PDF"), "b/book.pdf", "application/pdf").result()
+
+    assert url == "https://cdn/b/book.pdf"
+    [(method, call)] = client.calls
+    assert method == "upload_fileobj"
+    assert call["body"] == b"%PDF"
+    assert call["ExtraArgs"] == {"ContentType": "application/pdf"}
+    assert call["Config"] is storage._transfer_config
+    assert storage._transfer_config.multipart_chunksize == storage.R2_MULTIPART_CHUNK_BYTES
+
+
+def test_bytes_still_go_up_in_one_put(client):
+    url = storage.submit_upload(b"png", "b/page_01.png", "image/png").result()
+
+    assert url == "https://cdn/b/page_01.png"
+    [(method, call)] = client.calls
+    assert method == "put_object"
+    assert call["Body"] == b"png"
+    assert (call["Key"], call["ContentType"]) == ("b/page_01.png", "image/png")
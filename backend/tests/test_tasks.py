@@ -0,0 +1,436 @@
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from app import tasks
+from app.models.book import PageResult
+from app.services import checkpoint, metrics
+
+
+@pytest.fixture(autouse=True)
+def in_process_checkpoints(monkeypatch):
+    monkeypatch.setattr(checkpoint, "get_redis", lambda: None)
+    checkpoint._local.clear()
+
+
+async def test_pipelined_generation_reports_each_published_page(monkeypatch):
+    scenes = [{"page_number": n, "description": f"scene {n}"} for n in (1, 2, 3)]
+
+    async def fake_generate_pages(scenes, on_page=None):
+        for scene in reversed(scenes):  # completion order differs from page order
+            await on_page(scene)
+            await asyncio.sleep(0)
+        return scenes
+
+    async def fake_publish_page(uid, book_id, scene):
+        n = scene["page_number"]
+        return PageResult(
+            page_number=n, scene_description=scene["description"],
+            image_url=f"https://cdn/{n}.png", thumbnail_url=f"https://cdn/{n}_thumb.jpg",
+        )
+
+    monkeypatch.setattr(tasks, "generate_pages", fake_generate_pages)
+    monkeypatch.setattr(tasks, "_publish_page", fake_publish_page)
+    monkeypatch.setattr(tasks, "write_pdf", lambda title, pages, out: out.write(b"%PDF"))
+    monkeypatch.setattr(tasks, "upload_fileobj", lambda *item: "https://cdn/book.pdf")
+
+    reports = []
+    pages, pdf_url = await tasks._generate_pipelined(
+        "u1", "b1", "Title", scenes, on_pages=lambda done: reports.append(done)
+    )
+
+    assert pdf_url == "https://cdn/book.pdf"
+    assert [p.page_number for p in pages] == [1, 2, 3]
+    # One report per page, each with one more page, always in page order
+    assert [[p.page_number for p in report] for report in reports] == [[3], [2, 3], [1, 2, 3]]
+
+
+def _done(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_publish_pdf_streams_book_from_temp_file(monkeypatch):
+    uploads = []
+
+    def fake_upload_fileobj(fileobj, key, content_type):
+        uploads.append((fileobj.read(), key, content_type))
+        return f"https://cdn/{key}"
+
+    monkeypatch.setattr(
+        tasks, "write_pdf",
+        lambda title, pages, out: out.write(b"|".join(p["image_bytes"] for p in pages)),
+    )
+    monkeypatch.setattr(tasks, "upload_fileobj", fake_upload_fileobj)
+
+    url = tasks._publish_pdf("u1", "b1", "Title", [{"image_bytes": b"p1"}, {"image_bytes": b"p2"}])
+
+    key = "users/u1/books/b1/book.pdf"
+    assert url == f"https://cdn/{key}"
+    assert uploads == [(b"p1|p2", key, "application/pdf")]
+
+
+def _fake_job(monkeypatch, mode: str, page_count: int = 2) -> list:
+    """Stub a generate_book_task run's services; returns the task ids progress is stored under."""
+    stored_under = []
+
+    def update_state(task_id=None, state=None, meta=None):
+        if not task_id:  # what the Redis result backend does
+            raise ValueError("task_id must not be empty. Got None instead.")
+        stored_under.append(task_id)
+
+    async def content_safe(text):
+        return True, ""
+
+    async def fake_generate_pages(scenes, on_page=None):
+        processed = [
+            {**s, "image_bytes": b"new", "image_format": "png", "thumbnail_bytes": b"jpg"}
+            for s in scenes
+        ]
+        for scene in processed:
+            await on_page(scene)
+        return processed
+
+    async def fake_publish_page(uid, book_id, scene):
+        return _page(scene["page_number"])
+
+    monkeypatch.setattr(tasks.settings, "generation_mode", mode)
+    monkeypatch.setattr(tasks.generate_book_task, "update_state", update_state)
+    monkeypatch.setattr(tasks, "is_content_safe", content_safe)
+    monkeypatch.setattr(tasks, "plan_scenes", lambda **kwargs: _scenes(page_count))
+    monkeypatch.setattr(tasks, "generate_pages", fake_generate_pages)
+    monkeypatch.setattr(tasks, "_publish_page", fake_publish_page)
+    monkeypatch.setattr(tasks, "submit_upload", lambda *item: _done("https://cdn/page.png"))
+    monkeypatch.setattr(tasks, "download_many", lambda keys: [b"old"] * len(keys))
+    monkeypatch.setattr(tasks, "write_pdf", lambda title, pages, out: out.write(b"%PDF"))
+    monkeypatch.setattr(tasks, "upload_fileobj", lambda *item: "https://cdn/book.pdf")
+    monkeypatch.setattr(tasks, "save_book", lambda book, usage_day=None: None)
+    monkeypatch.setattr(tasks.quota, "record_persisted_usage", lambda uid, day: None)
+    monkeypatch.setattr(tasks.scheduler, "release", lambda job_id: [])
+    monkeypatch.setattr(tasks.progress, "publish", lambda uid, event: None)
+    return stored_under
+
+
+@pytest.mark.parametrize("mode", ["pipelined", "phased"])
+def test_page_reports_from_worker_threads_use_the_job_id(monkeypatch, mode):
+    # Page callbacks report via asyncio.to_thread, where Celery's thread-local
+    # request is empty — the job id must be passed along explicitly
+    stored_under = _fake_job(monkeypatch, mode)
+
+    result = tasks.generate_book_task.apply(
+        args=[REQUEST, {"uid": "u1"}], task_id="job1"
+    ).get()
+
+    assert result["status"] == "complete"
+    assert len(stored_under) >= 4  # planning, drawing, then one per page
+    assert set(stored_under) == {"job1"}
+
+
+def test_first_attempt_records_queue_wait_per_tier(monkeypatch):
+    # Exported with the worker's registry (app.services.worker_metrics)
+    _fake_job(monkeypatch, "pipelined")
+    metrics.reset()
+
+    tasks.generate_book_task.apply(
+        args=[REQUEST, {"uid": "u1"}],
+        kwargs={"tier": "premium", "enqueued_at": time.time() - 3},
+        task_id="job1",
+    ).get()
+
+    [histogram] = [h for h in metrics.snapshot()["histograms"] if h["name"] == "queue_wait_seconds"]
+    assert histogram["labels"] == {"tier": "premium"}
+    assert histogram["count"] == 1 and histogram["sum"] >= 3
+
+
+def test_phased_job_settles_page_uploads_when_pdf_fails(monkeypatch):
+    _fake_job(monkeypatch, "phased")
+    pool = ThreadPoolExecutor(max_workers=1)
+    page_uploads = []
+
+    def slow_upload(*item):
+        page_uploads.append(pool.submit(time.sleep, 0.05))
+        return page_uploads[-1]
+
+    def failing_publish_pdf(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(tasks, "submit_upload", slow_upload)
+    monkeypatch.setattr(tasks, "_publish_pdf", failing_publish_pdf)
+
+    try:
+        result = tasks.generate_book_task.apply(
+            args=[REQUEST, {"uid": "u1"}], task_id="job1"
+        ).get()
+
+        assert result == {"status": "failed", "error": "disk full", "uid": "u1"}
+        # None still running or queued behind the failed job: cancelled or waited for
+        assert page_uploads and all(future.done() for future in page_uploads)
+        assert any(future.cancelled() for future in page_uploads)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _flaky_generate_pages(monkeypatch, error: Exception) -> list:
+    """generate_pages fails with `error` on its first call; returns the call log."""
+    calls = []
+    real_generate = tasks.generate_pages
+
+    async def flaky(scenes, on_page=None):
+        calls.append(len(scenes))
+        if len(calls) == 1:
+            raise error
+        return await real_generate(scenes, on_page)
+
+    monkeypatch.setattr(tasks, "generate_pages", flaky)
+    return calls
+
+
+@pytest.mark.parametrize(
+    "mode, error, attempts, status",
+    [
+        ("pipelined", ConnectionError("connection reset"), 2, "complete"),
+        ("pipelined", ValueError("bad prompt"), 1, "failed"),
+        # Nothing checkpointed to resume from: a retry would redo the whole book
+        ("phased", ConnectionError("connection reset"), 1, "failed"),
+    ],
+)
+def test_only_transient_errors_in_checkpointed_modes_are_retried(
+    monkeypatch, mode, error, attempts, status
+):
+    _fake_job(monkeypatch, mode)
+    calls = _flaky_generate_pages(monkeypatch, error)
+
+    result = tasks.generate_book_task.apply(
+        args=[REQUEST, {"uid": "u1"}], task_id="job1"
+    ).get()
+
+    assert len(calls) == attempts
+    assert result["status"] == status
+
+
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (tasks.SoftTimeLimitExceeded(), True),
+        (tasks.RedisError("timeout"), True),
+        (tasks.FalClientHTTPError("busy", 503, {}, None), True),
+        (tasks.FalClientHTTPError("throttled", 429, {}, None), True),
+        (tasks.FalClientHTTPError("invalid prompt", 422, {}, None), False),
+        (ValueError("bad request"), False),
+    ],
+)
+def test_transient_errors(error, transient):
+    assert tasks._is_transient(error) is transient
+
+
+def test_page_progress_spans_drawing_phase():
+    assert tasks._page_progress(0, 12) == 20
+    assert tasks._page_progress(6, 12) == 50
+    assert tasks._page_progress(12, 12) == 80
+
+
+def _page(n: int) -> PageResult:
+    return PageResult(
+        page_number=n, scene_description=f"scene {n}",
+        image_url=f"https://cdn/{n}.png", thumbnail_url=f"https://cdn/{n}_thumb.jpg",
+    )
+
+
+def test_render_page_task_returns_page_and_image_key(monkeypatch):
+    async def fake_generate_pages(scenes, on_page=None):
+        return [{**scenes[0], "image_bytes": b"img", "image_format": "png"}]
+
+    async def fake_publish_page(uid, book_id, scene):
+        return _page(scene["page_number"])
+
+    monkeypatch.setattr(tasks, "generate_pages", fake_generate_pages)
+    monkeypatch.setattr(tasks, "_publish_page", fake_publish_page)
+    monkeypatch.setattr(tasks, "_report", lambda *args, **kwargs: None)
+    scene = {"page_number": 3, "image_prompt": "a dinosaur"}
+
+    result = tasks.render_page_task.run("job1", "u1", "b1", scene, 6)
+
+    assert result["page"]["page_number"] == 3
+    assert result["image_key"] == tasks._page_key(
+        "u1", "b1", {"page_number": 3, "image_format": "png"}
+    )
+    assert result["image_format"] == "png"
+    assert result["prompt_hash"] == checkpoint.prompt_hash(scene)
+
+
+def test_render_page_task_returns_failure_instead_of_raising(monkeypatch):
+    async def failing_generate_pages(scenes, on_page=None):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(tasks, "generate_pages", failing_generate_pages)
+
+    scene = {"page_number": 2, "image_prompt": "a dinosaur"}
+
+    result = tasks.render_page_task.run("job1", "u1", "b1", scene, 6)
+
+    assert result == {"page_number": 2, "error": "model unavailable"}
+
+
+def _assemble_fakes(monkeypatch):
+    saved, published = [], []
+    monkeypatch.setattr(tasks, "_report", lambda *args, **kwargs: None)
+    monkeypatch.setattr(tasks.progress, "publish", lambda uid, event: published.append(event))
+    monkeypatch.setattr(tasks, "download_many", lambda keys: [k.encode() for k in keys])
+    monkeypatch.setattr(
+        tasks, "write_pdf",
+        lambda title, pages, out: out.write(b"|".join(p["image_bytes"] for p in pages)),
+    )
+    monkeypatch.setattr(tasks, "upload_fileobj", lambda *item: "https://cdn/book.pdf")
+    monkeypatch.setattr(tasks, "save_book", lambda book, usage_day=None: saved.append(book))
+    monkeypatch.setattr(tasks.quota, "record_persisted_usage", lambda uid, day: None)
+    return saved, published
+
+
+REQUEST = {"title": "Dino Day", "theme": "a friendly dinosaur picnic", "page_count": 2}
+
+
+def test_assemble_book_task_builds_pdf_in_page_order(monkeypatch):
+    saved, published = _assemble_fakes(monkeypatch)
+    rendered = [
+        {"page": _page(n).model_dump(), "image_key": f"k{n}", "image_format": "png"}
+        for n in (2, 1)  # chord results arrive in header order, not page order
+    ]
+
+    result = tasks.assemble_book_task.run(rendered, "job1", "u1", "b1", REQUEST)
+
+    assert result["status"] == "complete"
+    assert [p["page_number"] for p in result["book"]["pages"]] == [1, 2]
+    assert result["book"]["pdf_url"] == "https://cdn/book.pdf"
+    assert saved[0].book_id == "b1"
+    assert published[-1]["job_id"] == "job1" and published[-1]["status"] == "complete"
+
+
+def test_assemble_book_task_fails_job_on_failed_page(monkeypatch):
+    saved, published = _assemble_fakes(monkeypatch)
+    rendered = [
+        {"page": _page(1).model_dump(), "image_key": "k1", "image_format": "png"},
+        {"page_number": 2, "error": "model unavailable"},
+    ]
+
+    result = tasks.assemble_book_task.run(rendered, "job1", "u1", "b1", REQUEST)
+
+    assert result == {
+        "status": "failed", "error": "Page 2 failed: model unavailable", "uid": "u1"
+    }
+    assert saved == []
+    assert published[-1]["status"] == "failed"
+
+
+# ── Checkpoints ────────────────────────────────────────────────────────────────
+def _scenes(count: int) -> list[dict]:
+    return [
+        {"page_number": n, "description": f"scene {n}", "image_prompt": f"prompt {n}"}
+        for n in range(1, count + 1)
+    ]
+
+
+def _checkpoint(scene: dict) -> dict:
+    n = scene["page_number"]
+    return {
+        "page": _page(n).model_dump(),
+        "image_key": f"k{n}",
+        "image_format": "png",
+        "thumbnail_key": f"t{n}",
+        "prompt_hash": checkpoint.prompt_hash(scene),
+    }
+
+
+def test_book_id_is_stable_per_job():
+    assert checkpoint.book_id_for("job1") == checkpoint.book_id_for("job1")
+    assert checkpoint.book_id_for("job1") != checkpoint.book_id_for("job2")
+
+
+async def test_retried_pipelined_job_generates_only_missing_pages(monkeypatch):
+    scenes = _scenes(3)
+    for scene in scenes[:2]:  # pages 1 and 2 finished before the crash
+        checkpoint.save("job1", _checkpoint(scene))
+    # A checkpoint whose prompt no longer matches is not reused
+    checkpoint.save("job1", {**_checkpoint(scenes[2]), "prompt_hash": "stale"})
+
+    generated = []
+
+    async def fake_generate_pages(scenes, on_page=None):
+        processed = [{**s, "image_bytes": b"new", "image_format": "png"} for s in scenes]
+        for scene in processed:
+            generated.append(scene["page_number"])
+            await on_page(scene)
+        return processed
+
+    async def fake_publish_page(uid, book_id, scene):
+        return _page(scene["page_number"])
+
+    pdf_pages = []
+    monkeypatch.setattr(tasks, "generate_pages", fake_generate_pages)
+    monkeypatch.setattr(tasks, "_publish_page", fake_publish_page)
+    monkeypatch.setattr(tasks, "download_many", lambda keys: [b"old"] * len(keys))
+    monkeypatch.setattr(tasks, "write_pdf", lambda title, pages, out: pdf_pages.extend(pages))
+    monkeypatch.setattr(tasks, "upload_fileobj", lambda *item: "https://cdn/book.pdf")
+
+    reports = []
+    pages, _ = await tasks._generate_pipelined(
+        "u1", "b1", "Title", scenes, lambda done: reports.append(done), job_id="job1"
+    )
+
+    assert generated == [3]
+    assert [p.page_number for p in pages] == [1, 2, 3]
+    assert [(p["page_number"], p["image_bytes"]) for p in pdf_pages] == [
+        (1, b"old"), (2, b"old"), (3, b"new"),
+    ]
+    # Restored pages are reported up front, then the regenerated one
+    assert [len(report) for report in reports] == [2, 3]
+    assert set(checkpoint.load("job1", scenes)) == {1, 2, 3}
+
+
+def test_retried_job_reports_restored_pages_and_completes(monkeypatch):
+    # Restored pages are reported from a pool thread before any page is drawn
+    stored_under = _fake_job(monkeypatch, "pipelined", page_count=3)
+    generated = []
+    real_generate = tasks.generate_pages
+
+    async def tracking_generate(scenes, on_page=None):
+        generated.extend(scene["page_number"] for scene in scenes)
+        return await real_generate(scenes, on_page)
+
+    monkeypatch.setattr(tasks, "generate_pages", tracking_generate)
+    for scene in _scenes(2):
+        checkpoint.save("job1", _checkpoint(scene))
+
+    result = tasks.generate_book_task.apply(
+        args=[REQUEST, {"uid": "u1"}], task_id="job1"
+    ).get()
+
+    assert result["status"] == "complete"
+    assert [p["page_number"] for p in result["book"]["pages"]] == [1, 2, 3]
+    assert generated == [3]
+    assert set(stored_under) == {"job1"}
+
+
+def test_render_page_task_reuses_checkpoint(monkeypatch):
+    [scene] = _scenes(1)
+    checkpoint.save("job1", _checkpoint(scene))
+
+    async def unexpected_generate(scenes, on_page=None):
+        raise AssertionError("checkpointed page was regenerated")
+
+    monkeypatch.setattr(tasks, "generate_pages", unexpected_generate)
+    monkeypatch.setattr(tasks, "_report", lambda *args, **kwargs: None)
+
+    assert tasks.render_page_task.run("job1", "u1", "b1", scene, 1) == _checkpoint(scene)
+
+
+def test_finished_job_clears_its_checkpoints(monkeypatch):
+    [scene] = _scenes(1)
+    checkpoint.save("job1", _checkpoint(scene))
+    monkeypatch.setattr(tasks.progress, "publish", lambda uid, event: None)
+
+    tasks._finish(tasks.generate_book_task, "u1", {"status": "failed", "error": "x"}, "job1")
+
+    assert checkpoint.load("job1", [scene]) == {}
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Book Summaries Backfill
+
+The gallery reads from the `book_summaries` index, which save_book maintains for
+new books. Run this once after deploying to create summaries for books saved
+before the index existed. Idempotent — existing summaries are simply rewritten.
+
+Usage:
+    python tools/backfill_book_summaries.py [--dry-run]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add backend to path for imports
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+from app.config import get_settings
+from app.services.firebase_db import SUMMARIES, summary_fields
+
+# Firestore allows 500 writes per batch
+BATCH_SIZE = 400
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count books without writing")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(settings.firebase_service_account_path))
+    db = firestore.client()
+
+    print("📚 Backfilling book summaries...")
+    batch, pending, total, skipped = db.batch(), 0, 0, 0
+    for doc in db.collection("books").stream():
+        data = doc.to_dict()
+        try:
+            fields = summary_fields(data)
+        except KeyError as e:
+            print(f"  ⚠️  Skipping {doc.id}: missing field {e}")
+            skipped += 1
+            continue
+        total += 1
+        if args.dry_run:
+            continue
+        batch.set(db.collection(SUMMARIES).document(doc.id), fields)
+        pending += 1
+        if pending == BATCH_SIZE:
+            batch.commit()
+            print(f"  ✅ {total} summaries written")
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+
+    verb = "would write" if args.dry_run else "wrote"
+    print(f"✅ Done — {verb} {total} summaries, skipped {skipped}")
+
+
+if __name__ == "__main__":
+    main()
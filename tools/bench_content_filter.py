@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Content Filter Layer-1 Benchmark
+
+Compares the legacy `_layer1_check` (three-pass `_normalize`, then one
+`word in text` scan per keyword) against the compiled matcher in
+`app.services.content_filter` (`str.translate` normalization + one prefix-trie regex).
+
+Runs every combination of input length and blocklist size. Inputs are clean
+text (the common case — every keyword must be ruled out) plus a few accented
+characters so the NFKD path is exercised. No API keys or network needed.
+
+Usage:
+    python tools/bench_content_filter.py [--iterations N]
+"""
+
+import argparse
+import random
+import re
+import string
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+# Add backend to path for imports
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+TEXT_LENGTHS = (80, 800, 8000)
+LIST_SIZES = (27, 1000, 5000)
+
+SAFE_WORDS = (
+    "bunny", "forest", "dragon", "castle", "picnic", "rainbow", "garden", "puppy",
+    "treasure", "adventure", "butterfly", "ocean", "princess", "rocket", "café", "naïve",
+)
+
+
+def make_text(length: int, rng: random.Random) -> str:
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(SAFE_WORDS))
+    return " ".join(words)[:length]
+
+
+def make_blocklist(size: int, rng: random.Random) -> set[str]:
+    """Built-in keywords padded with synthetic terms that never occur in SAFE_WORDS."""
+    from app.services.content_filter import _BLOCKED_KEYWORDS
+
+    words = set(_BLOCKED_KEYWORDS)
+    while len(words) < size:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10))))
+    return words
+
+
+# ── Legacy implementation, kept verbatim for comparison ───────────────────────
+def legacy_normalize(text: str) -> str:
+    nfkd = unicodedata.normalize("NFKD", text)
+    ascii_approx = "".join(c for c in nfkd if not unicodedata.combining(c))
+    _TRANSLITERATE = {
+        "ø": "o", "Ø": "O", "ð": "d", "Ð": "D", "þ": "th", "Þ": "TH",
+        "æ": "ae", "Æ": "AE", "œ": "oe", "Œ": "OE", "ß": "ss",
+        "μ": "u", "ł": "l", "Ł": "L", "đ": "d", "Đ": "D",
+    }
+    transliterated = "".join(_TRANSLITERATE.get(c, c) for c in ascii_approx)
+    collapsed = re.sub(r"\s+", "", transliterated)
+    return collapsed.lower()
+
+
+def make_legacy_check(words: set[str]):
+    def check(text: str) -> bool:
+        normalized = legacy_normalize(text)
+        for word in words:
+            if word in normalized:
+                return False
+        return True
+
+    return check
+
+
+def make_compiled_check(words: set[str]):
+    from app.services.content_filter import _keyword_pattern, _normalize
+
+    pattern = _keyword_pattern(words)
+
+    def check(text: str) -> bool:
+        return pattern.search(_normalize(text)) is None
+
+    return check
+
+
+def time_per_call(check, text: str, iterations: int) -> float:
+    """Best-of-5 microseconds per call."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            check(text)
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200, help="calls per timing round")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print("🔍 Content filter layer-1 benchmark")
+    print(f"{'terms':>6} {'chars':>6} {'legacy µs':>11} {'compiled µs':>12} {'speedup':>8}")
+
+    for size in LIST_SIZES:
+        words = make_blocklist(size, rng)
+        legacy = make_legacy_check(words)
+        start = time.perf_counter()
+        compiled = make_compiled_check(words)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        for length in TEXT_LENGTHS:
+            text = make_text(length, rng)
+            assert legacy(text) == compiled(text)
+            legacy_us = time_per_call(legacy, text, args.iterations)
+            compiled_us = time_per_call(compiled, text, args.iterations)
+            print(
+                f"{len(words):>6} {length:>6} {legacy_us:>11.1f} {compiled_us:>12.1f} "
+                f"{legacy_us / compiled_us:>7.1f}x"
+            )
+        print(f"       (pattern for {len(words)} terms compiled in {build_ms:.0f} ms)")
+
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Line-Art Post-Processing Benchmark
+
+Compares the legacy `_clean_line_art` pipeline (threshold → RGB → LANCZOS resize)
+against the single-channel engine in `app.services.line_art`
+(grayscale → LANCZOS resize → LUT binarize).
+
+Reports per-page CPU time and peak memory. Each variant's memory is measured in a
+fresh process so Pillow's C allocations (invisible to tracemalloc) are captured via
+the process high-water mark.
+
+Usage:
+    python tools/bench_line_art.py [--iterations N]
+"""
+
+import argparse
+import io
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path for imports
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# fal.ai "portrait_4_3" output size
+SOURCE_SIZE = (768, 1024)
+
+
+def make_sample_page() -> bytes:
+    """Synthesize an anti-aliased RGB line drawing similar to fal.ai output."""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    img = Image.new("RGB", SOURCE_SIZE, "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(40):
+        x0, y0 = (i * 37) % 700, (i * 53) % 950
+        draw.ellipse((x0, y0, x0 + 60 + i, y0 + 40 + i), outline="black", width=3)
+        draw.line((0, y0, SOURCE_SIZE[0], (y0 * 7) % 1024), fill=(40, 40, 40), width=2)
+    img = img.filter(ImageFilter.GaussianBlur(0.8))  # soft, gray edges like a diffusion model
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def legacy_clean_line_art(image_bytes: bytes) -> bytes:
+    """The original implementation, kept verbatim for comparison."""
+    from PIL import Image
+
+    from app.constants import LETTER_HEIGHT_PX, LETTER_WIDTH_PX, PRINT_DPI, THRESHOLD_BINARY
+
+    img = Image.open(io.BytesIO(image_bytes)).convert("L")
+    img = img.point(lambda p: 0 if p < THRESHOLD_BINARY else 255, "1")
+    img = img.convert("RGB")
+    img = img.resize((LETTER_WIDTH_PX, LETTER_HEIGHT_PX), Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", dpi=(PRINT_DPI, PRINT_DPI))
+    return buf.getvalue()
+
+
+def engine_clean_line_art(image_bytes: bytes) -> bytes:
+    from app.services.line_art import clean_line_art
+
+    return clean_line_art(image_bytes)
+
+
+VARIANTS = {
+    "legacy": legacy_clean_line_art,
+    "engine": engine_clean_line_art,
+}
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _run_variant(name: str, sample: bytes, iterations: int, out: multiprocessing.Queue) -> None:
+    from PIL import Image
+
+    import app.constants  # noqa: F401 — import everything before taking the baseline
+    import app.services.line_art  # noqa: F401
+
+    fn = VARIANTS[name]
+    Image.open(io.BytesIO(sample)).load()
+    baseline = _max_rss_mb()
+
+    cpu_times = []
+    output = b""
+    for _ in range(iterations):
+        start = time.process_time()
+        output = fn(sample)
+        cpu_times.append(time.process_time() - start)
+
+    result = Image.open(io.BytesIO(output))
+    gray_levels = len([c for c in result.convert("L").histogram() if c])
+    out.put({
+        "name": name,
+        "cpu_ms": statistics.median(cpu_times) * 1000,
+        "peak_mb": _max_rss_mb() - baseline,
+        "mode": result.mode,
+        "gray_levels": gray_levels,
+        "png_kb": len(output) / 1024,
+    })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    sample = make_sample_page()
+    print(f"\n🖍️  Line-art benchmark — source {SOURCE_SIZE[0]}×{SOURCE_SIZE[1]}, "
+          f"{args.iterations} iterations per variant\n")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for name in VARIANTS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_variant, args=(name, sample, args.iterations, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    print(f"  {'variant':<8} {'cpu/page':>10} {'peak Δ RSS':>11} {'mode':>5} "
+          f"{'levels':>7} {'png':>9}")
+    for r in results:
+        print(f"  {r['name']:<8} {r['cpu_ms']:>8.1f}ms {r['peak_mb']:>9.1f}MB {r['mode']:>5} "
+              f"{r['gray_levels']:>7} {r['png_kb']:>7.0f}KB")
+
+    legacy, engine = results
+    print(f"\n  ✅ CPU speedup: {legacy['cpu_ms'] / engine['cpu_ms']:.2f}×")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
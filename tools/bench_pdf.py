@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+PDF Assembly Benchmark
+
+Compares the two `build_pdf` backends on the same book:
+- weasyprint: base64 HTML → layout engine → tempfile → bytes
+- native:     streaming writer in `app.services.pdf_writer`, one page at a time
+
+Reports wall time, CPU time, peak memory and output size. Each backend runs in a
+fresh process so the peak-RSS numbers don't leak between runs. WeasyPrint needs
+Pango installed; if it can't load, that row is reported as skipped.
+
+Usage:
+    python tools/bench_pdf.py [--pages N] [--format png|g4]
+"""
+
+import argparse
+import io
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path for imports
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from bench_line_art import _max_rss_mb, make_sample_page  # noqa: E402
+
+BACKENDS = ("weasyprint", "native")
+
+
+def make_pages(count: int, page_format: str) -> list[dict]:
+    from app.services.line_art import clean_line_art
+
+    image = clean_line_art(make_sample_page(), page_format)
+    return [
+        {
+            "page_number": i,
+            "description": f"Page {i}",
+            "image_bytes": image,
+            "image_format": page_format,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def _run_backend(backend: str, pages: list[dict], out: multiprocessing.Queue) -> None:
+    try:
+        from app.services.pdf_builder import build_pdf
+
+        if backend == "weasyprint":
+            import weasyprint  # noqa: F401 — load native libs before the baseline
+    except (ImportError, OSError) as e:
+        out.put({"name": backend, "error": type(e).__name__})
+        return
+
+    baseline = _max_rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    pdf = build_pdf("Benchmark Book", pages, backend=backend)
+    out.put({
+        "name": backend,
+        "wall_ms": (time.perf_counter() - wall_start) * 1000,
+        "cpu_ms": (time.process_time() - cpu_start) * 1000,
+        "peak_mb": _max_rss_mb() - baseline,
+        "pdf_kb": len(pdf) / 1024,
+    })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--format", choices=("png", "g4"), default="png")
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.format)
+    input_kb = sum(len(p["image_bytes"]) for p in pages) / 1024
+    print(f"\n📄 PDF benchmark — cover + {args.pages} pages ({args.format}), "
+          f"{input_kb:.0f}KB of page images\n")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in BACKENDS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_backend, args=(backend, pages, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    print(f"  {'backend':<11} {'wall':>10} {'cpu':>10} {'peak Δ RSS':>11} {'pdf':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"  {r['name']:<11} ⚠️  skipped ({r['error']})")
+            continue
+        print(f"  {r['name']:<11} {r['wall_ms']:>8.0f}ms {r['cpu_ms']:>8.0f}ms "
+              f"{r['peak_mb']:>9.1f}MB {r['pdf_kb']:>8.0f}KB")
+
+    timed = {r["name"]: r for r in results if "error" not in r}
+    if len(timed) == len(BACKENDS):
+        speedup = timed["weasyprint"]["wall_ms"] / timed["native"]["wall_ms"]
+        print(f"\n  ✅ Native speedup: {speedup:.1f}×")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())